@@ -0,0 +1,61 @@
+import hashlib
+from functools import wraps
+from django.db.models import Count, IntegerField, Max, QuerySet, Value
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
+
+# GET condicional (ETag / Last-Modified) a partir de BaseModel.updated_at.
+# Los validadores se calculan con una sola consulta de agregados, antes de
+# cualquier serialización, y se responde 304 si el cliente ya tiene la versión.
+
+def _agregado(queryset):
+    return queryset.order_by().annotate(
+        grupo=Value(1, output_field=IntegerField())
+    ).values('grupo').annotate(
+        ultimo=Max('updated_at'),
+        total=Count('pk')
+    ).values_list('ultimo', 'total')
+
+def calcular_validadores(validadores, extra=''):
+    """Devuelve (etag, last_modified) para uno o varios querysets en una sola consulta.
+
+    Los validadores que no son querysets se toman como fechas de modificación
+    adicionales (o None), para estado que no vive en una tabla.
+    """
+    querysets = [validador for validador in validadores if isinstance(validador, QuerySet)]
+    consulta = _agregado(querysets[0])
+    if len(querysets) > 1:
+        consulta = consulta.union(*[_agregado(qs) for qs in querysets[1:]], all=True)
+    filas = list(consulta) + [(marca, 0) for marca in validadores if not isinstance(marca, QuerySet)]
+
+    firma = '|'.join(f"{ultimo.isoformat() if ultimo else ''}:{total}" for ultimo, total in filas)
+    etag = quote_etag(hashlib.md5(f'{firma}|{extra}'.encode()).hexdigest())
+    fechas = [ultimo for ultimo, _ in filas if ultimo is not None]
+    last_modified = int(max(fechas).timestamp()) if fechas else None
+    return etag, last_modified
+
+def condicional(querysets_func, por_usuario=False):
+    """Decorador para métodos GET de APIView.
+
+    querysets_func(request, *args, **kwargs) devuelve la lista de querysets de
+    los que depende la respuesta. Con por_usuario=True el ETag incluye al
+    usuario, para respuestas que agregan datos propios (p. ej. voto_usuario).
+    """
+    def decorator(metodo):
+        @wraps(metodo)
+        def wrapper(self, request, *args, **kwargs):
+            extra = request.user.pk if por_usuario else ''
+            etag, last_modified = calcular_validadores(querysets_func(request, *args, **kwargs), extra)
+
+            response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+            if response is None:
+                response = metodo(self, request, *args, **kwargs)
+                if response.status_code != 200:
+                    return response
+
+            response['ETag'] = etag
+            if last_modified is not None:
+                response['Last-Modified'] = http_date(last_modified)
+            return response
+        return wrapper
+    return decorator
@@ -0,0 +1,122 @@
+import json
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.db.models import Q
+from rest_framework.exceptions import NotFound, ValidationError
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+class KeysetPagination(BasePagination):
+    """Paginación por cursor opaco sobre (campo de orden, id), sin COUNT(*) ni OFFSET.
+
+    A diferencia de CursorPagination de DRF, el cursor guarda el valor del campo
+    y el id del último registro, así que los empates (p. ej. muchos recursos con
+    el mismo número de likes) no se resuelven con un offset y cada página es un
+    recorrido de rango sobre el índice (campo, id). El cursor también guarda el
+    orden con el que se generó: con otro ?ordering= (o con un valor que no es
+    del tipo del campo) se responde 404, no se filtra con él.
+    """
+    page_size = 20
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+    cursor_query_param = 'cursor'
+    ordering_param = 'ordering'
+    # Campo de orden por defecto y campos permitidos en ?ordering= (con o sin '-')
+    ordering = 'created_at'
+    ordering_fields = ('created_at',)
+
+    def get_page_size(self, request):
+        try:
+            page_size = int(request.query_params.get(self.page_size_query_param, self.page_size))
+        except ValueError:
+            return self.page_size
+        return max(1, min(page_size, self.max_page_size))
+
+    def get_ordering(self, request):
+        ordering = request.query_params.get(self.ordering_param, self.ordering)
+        if ordering.lstrip('-') not in self.ordering_fields:
+            raise ValidationError({self.ordering_param: f"Valores permitidos: {', '.join(self.ordering_fields)} (con '-' para orden descendente)."})
+        return ordering
+
+    def get_ordering_field(self, queryset):
+        field = queryset.model._meta.get_field(self.campo)
+        # Los campos generados (p. ej. puntaje_wilson) convierten valores con su output_field
+        return getattr(field, 'output_field', None) or field
+
+    def decode_cursor(self, request, ordering, field):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None, False
+        try:
+            data = json.loads(urlsafe_b64decode(encoded.encode()).decode())
+            if data['o'] != ordering:
+                raise ValueError('El cursor es de otro orden')
+            valor = field.to_python(data['v'])
+            if valor is None:
+                raise ValueError('El cursor no tiene valor')
+            return (valor, int(data['id'])), bool(data['r'])
+        except (TypeError, ValueError, KeyError, DjangoValidationError):
+            raise NotFound('Cursor inválido')
+
+    def encode_cursor(self, posicion, reverse):
+        valor, pk = posicion
+        data = json.dumps({'o': self.orden, 'v': valor, 'id': pk, 'r': int(reverse)}, separators=(',', ':'))
+        return replace_query_param(
+            self.base_url, self.cursor_query_param, urlsafe_b64encode(data.encode()).decode()
+        )
+
+    def _posicion(self, instance):
+        valor = getattr(instance, self.campo)
+        if hasattr(valor, 'isoformat'):
+            valor = valor.isoformat()
+        return valor, instance.pk
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.base_url = request.build_absolute_uri()
+        self.page_size = self.get_page_size(request)
+        ordering = self.get_ordering(request)
+        self.orden = ordering
+        self.campo = ordering.lstrip('-')
+        posicion, reverse = self.decode_cursor(request, ordering, self.get_ordering_field(queryset))
+
+        # Al ir hacia atrás se recorre el índice en sentido contrario y luego se invierte la página
+        descendente = ordering.startswith('-') != reverse
+        signo = '-' if descendente else ''
+        if posicion is not None:
+            valor, pk = posicion
+            comparador = 'lt' if descendente else 'gt'
+            queryset = queryset.filter(
+                Q(**{f'{self.campo}__{comparador}e': valor}),
+                Q(**{f'{self.campo}__{comparador}': valor}) | Q(**{self.campo: valor, f'pk__{comparador}': pk})
+            )
+
+        resultados = list(queryset.order_by(f'{signo}{self.campo}', f'{signo}pk')[:self.page_size + 1])
+        hay_mas = len(resultados) > self.page_size
+        resultados = resultados[:self.page_size]
+        if reverse:
+            resultados.reverse()
+
+        self.has_next = hay_mas if not reverse else posicion is not None
+        self.has_previous = posicion is not None if not reverse else hay_mas
+        self.page = resultados
+        return resultados
+
+    def get_next_link(self):
+        if not self.has_next or not self.page:
+            return None
+        return self.encode_cursor(self._posicion(self.page[-1]), False)
+
+    def get_previous_link(self):
+        if not self.has_previous:
+            return None
+        if not self.page:
+            return remove_query_param(self.base_url, self.cursor_query_param)
+        return self.encode_cursor(self._posicion(self.page[0]), True)
+
+    def get_paginated_response(self, data):
+        return Response({
+            'next': self.get_next_link(),
+            'previous': self.get_previous_link(),
+            'results': data,
+        })
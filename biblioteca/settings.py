@@ -98,6 +98,51 @@ DATABASES = {
 }
 
 
+# Cache
+# https://docs.djangoproject.com/en/5.2/topics/cache/
+# Con varios procesos se puede usar un directorio compartido (CACHE_DIR)
+
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.filebased.FileBasedCache",
+        "LOCATION": os.getenv("CACHE_DIR"),
+    } if os.getenv("CACHE_DIR") else {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        "LOCATION": "biblioteca",
+    }
+}
+
+# Tiempo (segundos) que se conserva el JSON serializado de cada recurso
+RECURSO_CACHE_TIMEOUT = int(os.getenv("RECURSO_CACHE_TIMEOUT", 60 * 60))
+
+# Segundos tras los cuales cada proceso reconstruye su índice de autocompletado
+AUTOCOMPLETAR_TTL = int(os.getenv("AUTOCOMPLETAR_TTL", 300))
+
+# Contadores de votos diferidos: los deltas se acumulan y se aplican a los
+# recursos cada VOTOS_FLUSH_SEGUNDOS (máximo retraso de los contadores persistidos)
+VOTOS_CONTADORES_DIFERIDOS = os.getenv("VOTOS_CONTADORES_DIFERIDOS", "False").lower() in ("true", "1")
+VOTOS_FLUSH_SEGUNDOS = int(os.getenv("VOTOS_FLUSH_SEGUNDOS", 5))
+
+# Contadores fragmentados: con N > 0 cada voto suma en uno de N fragmentos del
+# recurso y el comando compactar_contadores los pliega en los recursos
+VOTOS_CONTADORES_FRAGMENTOS = int(os.getenv("VOTOS_CONTADORES_FRAGMENTOS", 0))
+
+# Días que se conservan las lápidas de votos eliminados para la sincronización
+# incremental de mis-votos; un cursor más antiguo recibe la lista completa
+VOTOS_LAPIDAS_DIAS = int(os.getenv("VOTOS_LAPIDAS_DIAS", 30))
+
+# Hilos de cada proceso que procesan las cargas masivas de recursos; con 0 las
+# cargas quedan pendientes para el comando procesar_cargas
+CARGAS_HILOS = int(os.getenv("CARGAS_HILOS", 2))
+
+# Minutos sin progreso tras los que una carga en proceso se considera
+# abandonada y el comando procesar_cargas la vuelve a procesar
+CARGAS_ABANDONADA_MINUTOS = int(os.getenv("CARGAS_ABANDONADA_MINUTOS", 30))
+
+# Vida media (en horas) del peso de cada voto en el ranking de tendencia
+RANKING_VIDA_MEDIA_HORAS = float(os.getenv("RANKING_VIDA_MEDIA_HORAS", 72))
+
+
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
 
@@ -0,0 +1,203 @@
+import logging
+import re
+import threading
+import time
+from bisect import bisect_left, insort
+from collections import defaultdict
+from unidecode import unidecode
+from django.conf import settings
+from django.db import connection
+
+logger = logging.getLogger(__name__)
+
+# Índice en memoria (por proceso) para autocompletar títulos de recursos.
+#
+# Cada título normalizado se indexa por cada palabra en la que empieza
+# ("introduccion a python" -> "introduccion a python", "a python", "python")
+# en un arreglo ordenado, de modo que una búsqueda por prefijo es una
+# búsqueda binaria más la lectura de los resultados contiguos. Opcionalmente
+# se pueden pedir coincidencias aproximadas por trigramas.
+#
+# Se carga la primera vez que se usa, se actualiza desde las señales de
+# Recurso y se reconstruye por completo cada AUTOCOMPLETAR_TTL segundos
+# para recoger cambios hechos por otros procesos. La reconstrucción por TTL
+# se hace en un hilo: mientras tanto se sigue respondiendo con el índice
+# anterior y el nuevo se reemplaza de una vez al terminar. Los cambios de las
+# señales que llegan durante la reconstrucción se registran y se vuelven a
+# aplicar sobre el índice nuevo antes de publicarlo.
+
+def normalizar(texto):
+    texto = unidecode(texto or '').lower()
+    return ' '.join(re.findall(r'[a-z0-9]+', texto))
+
+def trigramas(texto):
+    # Igual que pg_trgm: cada palabra se rellena con dos espacios al inicio y uno al final
+    resultado = set()
+    for palabra in texto.split():
+        palabra = f'  {palabra} '
+        resultado.update(palabra[i:i + 3] for i in range(len(palabra) - 2))
+    return resultado
+
+
+class IndiceTitulos:
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._claves = []
+        self._titulos = {}
+        self._trigramas = defaultdict(set)
+        self._cargado_en = None
+        # Cambios (pk, titulo o None si se eliminó) recibidos durante una reconstrucción
+        self._cambios = None
+        self._lock_carga = threading.Lock()
+        self._hilo = None
+
+    def _vencido(self):
+        ttl = getattr(settings, 'AUTOCOMPLETAR_TTL', 300)
+        return self._cargado_en is None or time.monotonic() - self._cargado_en > ttl
+
+    def cargar(self):
+        """Reconstruye el índice desde la base de datos y lo reemplaza de una vez"""
+        with self._lock_carga:
+            with self._lock:
+                self._cambios = []
+            try:
+                claves, titulos, indice_trigramas = self._construir()
+            except Exception:
+                with self._lock:
+                    self._cambios = None
+                raise
+
+            with self._lock:
+                cambios, self._cambios = self._cambios, None
+                self._claves = claves
+                self._titulos = titulos
+                self._trigramas = indice_trigramas
+                self._cargado_en = time.monotonic()
+                for pk, titulo in cambios:
+                    if titulo is None:
+                        self._quitar(pk)
+                    else:
+                        self.agregar(pk, titulo)
+
+    def _construir(self):
+        from .models import Recurso
+
+        claves = []
+        titulos = {}
+        indice_trigramas = defaultdict(set)
+        for pk, titulo in Recurso.objects.values_list('id', 'titulo').iterator(chunk_size=2000):
+            normalizado = normalizar(titulo)
+            titulos[pk] = (normalizado, titulo)
+            claves.extend(self._claves_de(pk, normalizado))
+            for trigrama in trigramas(normalizado):
+                indice_trigramas[trigrama].add(pk)
+        claves.sort()
+        return claves, titulos, indice_trigramas
+
+    def _asegurar_cargado(self):
+        if self._cargado_en is None:
+            # La primera carga no tiene un índice anterior con el que responder
+            self.cargar()
+        elif self._vencido():
+            self._recargar_en_segundo_plano()
+
+    def _recargar_en_segundo_plano(self):
+        with self._lock:
+            if self._hilo is not None:
+                return
+            self._hilo = threading.Thread(target=self._recargar, name='autocompletar-carga', daemon=True)
+            self._hilo.start()
+
+    def _recargar(self):
+        try:
+            self.cargar()
+        except Exception:
+            logger.exception('Error reconstruyendo el índice de autocompletado')
+        finally:
+            connection.close()
+            with self._lock:
+                self._hilo = None
+
+    @staticmethod
+    def _claves_de(pk, normalizado):
+        palabras = normalizado.split(' ')
+        return [(' '.join(palabras[i:]), pk) for i in range(len(palabras)) if palabras[i]]
+
+    def agregar(self, pk, titulo):
+        with self._lock:
+            if self._cambios is not None:
+                self._cambios.append((pk, titulo))
+            if self._cargado_en is None:
+                return
+            self._quitar(pk)
+            normalizado = normalizar(titulo)
+            self._titulos[pk] = (normalizado, titulo)
+            for clave in self._claves_de(pk, normalizado):
+                insort(self._claves, clave)
+            for trigrama in trigramas(normalizado):
+                self._trigramas[trigrama].add(pk)
+
+    def eliminar(self, pk):
+        with self._lock:
+            if self._cambios is not None:
+                self._cambios.append((pk, None))
+            if self._cargado_en is not None:
+                self._quitar(pk)
+
+    def _quitar(self, pk):
+        anterior = self._titulos.pop(pk, None)
+        if anterior is None:
+            return
+        for clave in self._claves_de(pk, anterior[0]):
+            posicion = bisect_left(self._claves, clave)
+            if posicion < len(self._claves) and self._claves[posicion] == clave:
+                del self._claves[posicion]
+        for trigrama in trigramas(anterior[0]):
+            self._trigramas[trigrama].discard(pk)
+
+    def sugerir(self, texto, limite=10, aproximado=False):
+        """Devuelve [(id, titulo)] cuyo título (o alguna de sus palabras) empieza por texto"""
+        self._asegurar_cargado()
+        prefijo = normalizar(texto)
+        if not prefijo:
+            return []
+
+        resultados = []
+        vistos = set()
+        with self._lock:
+            posicion = bisect_left(self._claves, (prefijo,))
+            while posicion < len(self._claves) and len(resultados) < limite:
+                clave, pk = self._claves[posicion]
+                if not clave.startswith(prefijo):
+                    break
+                if pk not in vistos:
+                    vistos.add(pk)
+                    resultados.append((pk, self._titulos[pk][1]))
+                posicion += 1
+
+            if aproximado and len(resultados) < limite:
+                for pk in self._similares(prefijo, limite - len(resultados), vistos):
+                    resultados.append((pk, self._titulos[pk][1]))
+        return resultados
+
+    def _similares(self, texto, limite, excluir, umbral=0.3):
+        # Fracción de los trigramas buscados presentes en el título; solo se puntúan
+        # los recursos que comparten al menos un trigrama
+        buscados = trigramas(texto)
+        coincidencias = defaultdict(int)
+        for trigrama in buscados:
+            for pk in self._trigramas.get(trigrama, ()):
+                if pk not in excluir:
+                    coincidencias[pk] += 1
+
+        puntajes = []
+        for pk, comunes in coincidencias.items():
+            puntaje = comunes / len(buscados)
+            if puntaje >= umbral:
+                puntajes.append((-puntaje, len(self._titulos[pk][0]), pk))
+        puntajes.sort()
+        return [pk for _, _, pk in puntajes[:limite]]
+
+
+indice_titulos = IndiceTitulos()
@@ -0,0 +1,144 @@
+from django.db import connection
+
+# Índice de búsqueda de texto completo sobre recursos (titulo, subtitulo,
+# descripcion) y sus contenidos de tipo texto/código.
+#
+# - PostgreSQL: tabla recursos_busqueda con un tsvector ponderado por recurso
+#   y un índice GIN; el ranking se hace con ts_rank.
+# - SQLite: tabla virtual FTS5 recursos_busqueda (rowid = id del recurso);
+#   el ranking se hace con bm25.
+#
+# El índice se mantiene desde las señales de Recurso y Contenido (models.py).
+
+TIPOS_INDEXADOS = ('text', 'code')
+
+SQL_CREAR = {
+    'postgresql': [
+        """
+        CREATE TABLE recursos_busqueda (
+            recurso_id bigint PRIMARY KEY REFERENCES recursos(id) ON DELETE CASCADE,
+            documento tsvector NOT NULL
+        )
+        """,
+        "CREATE INDEX recursos_busqueda_documento_idx ON recursos_busqueda USING gin (documento)",
+    ],
+    'sqlite': [
+        """
+        CREATE VIRTUAL TABLE recursos_busqueda USING fts5(
+            titulo, subtitulo, descripcion, contenido,
+            tokenize = 'unicode61 remove_diacritics 2'
+        )
+        """,
+    ],
+}
+
+SQL_ELIMINAR_TABLA = "DROP TABLE IF EXISTS recursos_busqueda"
+
+
+def busqueda_indexada():
+    """Indica si la base de datos actual tiene un índice de texto completo"""
+    return connection.vendor in SQL_CREAR
+
+
+def crear_indice_busqueda(schema_editor):
+    for sql in SQL_CREAR.get(schema_editor.connection.vendor, []):
+        schema_editor.execute(sql)
+
+
+def eliminar_indice_busqueda(schema_editor):
+    if schema_editor.connection.vendor in SQL_CREAR:
+        schema_editor.execute(SQL_ELIMINAR_TABLA)
+
+
+def _marcadores(ids):
+    return ', '.join(['%s'] * len(ids))
+
+
+def actualizar_indice_busqueda(recurso_ids):
+    """(Re)indexa los recursos indicados en una sola sentencia por lote"""
+    recurso_ids = [int(pk) for pk in recurso_ids if pk is not None]
+    if not recurso_ids or not busqueda_indexada():
+        return
+
+    with connection.cursor() as cursor:
+        if connection.vendor == 'postgresql':
+            cursor.execute(
+                f"""
+                INSERT INTO recursos_busqueda (recurso_id, documento)
+                SELECT r.id,
+                    setweight(to_tsvector('spanish', coalesce(r.titulo, '')), 'A') ||
+                    setweight(to_tsvector('spanish', coalesce(r.subtitulo, '')), 'B') ||
+                    setweight(to_tsvector('spanish', coalesce(r.descripcion, '')), 'C') ||
+                    setweight(to_tsvector('spanish', coalesce((
+                        SELECT string_agg(c.contenido_bloque, ' ')
+                        FROM contenidos c
+                        WHERE c.recurso_id = r.id AND c.tipo_contenido IN ({_marcadores(TIPOS_INDEXADOS)})
+                    ), '')), 'D')
+                FROM recursos r
+                WHERE r.id IN ({_marcadores(recurso_ids)})
+                ON CONFLICT (recurso_id) DO UPDATE SET documento = EXCLUDED.documento
+                """,
+                [*TIPOS_INDEXADOS, *recurso_ids]
+            )
+        else:
+            cursor.execute(
+                f"DELETE FROM recursos_busqueda WHERE rowid IN ({_marcadores(recurso_ids)})",
+                recurso_ids
+            )
+            cursor.execute(
+                f"""
+                INSERT INTO recursos_busqueda (rowid, titulo, subtitulo, descripcion, contenido)
+                SELECT r.id, r.titulo, coalesce(r.subtitulo, ''), r.descripcion, coalesce((
+                    SELECT group_concat(c.contenido_bloque, ' ')
+                    FROM contenidos c
+                    WHERE c.recurso_id = r.id AND c.tipo_contenido IN ({_marcadores(TIPOS_INDEXADOS)})
+                ), '')
+                FROM recursos r
+                WHERE r.id IN ({_marcadores(recurso_ids)})
+                """,
+                [*TIPOS_INDEXADOS, *recurso_ids]
+            )
+
+
+def eliminar_del_indice_busqueda(recurso_id):
+    # En PostgreSQL la fila se elimina en cascada con el recurso
+    if connection.vendor != 'sqlite':
+        return
+    with connection.cursor() as cursor:
+        cursor.execute("DELETE FROM recursos_busqueda WHERE rowid = %s", [recurso_id])
+
+
+def _consulta_fts5(texto):
+    # Cada término se cita para que la entrada del usuario no se interprete como sintaxis FTS5
+    return ' '.join('"%s"' % termino.replace('"', '""') for termino in texto.split())
+
+
+def buscar_recursos(texto, limite):
+    """Devuelve los ids de los recursos que coinciden con texto, ordenados por relevancia"""
+    if not texto.split():
+        return []
+
+    with connection.cursor() as cursor:
+        if connection.vendor == 'postgresql':
+            cursor.execute(
+                """
+                SELECT recurso_id
+                FROM recursos_busqueda, websearch_to_tsquery('spanish', %s) consulta
+                WHERE documento @@ consulta
+                ORDER BY ts_rank(documento, consulta) DESC, recurso_id
+                LIMIT %s
+                """,
+                [texto, limite]
+            )
+        else:
+            cursor.execute(
+                """
+                SELECT rowid
+                FROM recursos_busqueda
+                WHERE recursos_busqueda MATCH %s
+                ORDER BY bm25(recursos_busqueda, 10.0, 5.0, 2.0, 1.0), rowid
+                LIMIT %s
+                """,
+                [_consulta_fts5(texto), limite]
+            )
+        return [fila[0] for fila in cursor.fetchall()]
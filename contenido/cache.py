@@ -0,0 +1,27 @@
+from django.conf import settings
+from django.core.cache import cache
+
+# Cache del JSON serializado de cada recurso (detalle). La entrada guarda la
+# versión con la que se generó (updated_at del recurso y de su categoría y
+# área, cuyos nombres incluye), de modo que un cambio en cualquiera de ellos
+# la invalida aunque la escritura no haya pasado por las señales.
+
+def clave_cache_recurso(pk):
+    return f'recurso:{pk}'
+
+def obtener_recurso_cache(pk, version):
+    """Devuelve el recurso serializado en cache si corresponde a la versión indicada"""
+    entrada = cache.get(clave_cache_recurso(pk))
+    if entrada is None or entrada['version'] != version:
+        return None
+    return entrada['data']
+
+def guardar_recurso_cache(pk, version, data):
+    cache.set(
+        clave_cache_recurso(pk),
+        {'version': version, 'data': data},
+        getattr(settings, 'RECURSO_CACHE_TIMEOUT', 60 * 60)
+    )
+
+def invalidar_recurso_cache(pk):
+    cache.delete(clave_cache_recurso(pk))
@@ -0,0 +1,567 @@
+import hashlib
+import io
+import json
+import logging
+import threading
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from itertools import islice
+import pandas as pd
+from openpyxl import load_workbook
+from openpyxl.utils.exceptions import InvalidFileException
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.db import DatabaseError, connection, transaction
+from django.db.models import Q
+from django.utils import timezone
+from maestros.models import Categoria, Area
+from .models import Recurso, Contenido, CargaMasiva, FragmentoCarga
+from .exportacion import COLUMNAS_CARGA
+from .busqueda import actualizar_indice_busqueda
+from .autocompletar import indice_titulos
+
+# Carga masiva de recursos desde Excel, CSV o JSON Lines en streaming.
+#
+# Los archivos tienen el formato de exportacion.COLUMNAS_CARGA: una fila (o
+# línea JSON) por bloque de contenido, repitiendo los datos del recurso. Se
+# leen en DataFrames de TAMANO_LECTURA filas (el Excel en modo read-only, sin
+# cargar la hoja en memoria) que se validan por columnas con pandas; las
+# filas con errores se informan con su número y se omite su recurso. Las
+# filas consecutivas con el mismo título forman un recurso y los recursos se
+# procesan en bloques de tamaño fijo con CargaRecursos (compartida con la
+# creación por lista de RecursoCreate), así que la memoria no depende del
+# tamaño del archivo. Un título que reaparece más adelante se informa como
+# duplicado.
+#
+# RecursoBulkUpload no procesa el archivo en la petición: lo guarda como una
+# CargaMasiva pendiente y la procesa un hilo del propio proceso (CARGAS_HILOS)
+# o el comando procesar_cargas. Cada bloque se confirma en su propia
+# transacción junto con el progreso de la carga, que se consulta en
+# RecursoCargaEstado; si el archivo falla a mitad, los bloques ya confirmados
+# se conservan. Un bloque con un error de base de datos se descarta, se
+# informa entre los errores y la carga sigue con el siguiente.
+#
+# Una carga que sigue 'procesando' sin actualizar su progreso durante
+# CARGAS_ABANDONADA_MINUTOS (el proceso que la tomaba terminó) vuelve a
+# 'pendiente' en procesar_cargas_pendientes y se reprocesa desde el principio,
+# omitiendo por su huella los recursos que ya había creado. El plazo debe
+# superar lo que tarda un bloque.
+#
+# Para archivos grandes existe además la carga por fragmentos: el cliente abre
+# una sesión (una CargaMasiva en estado 'recibiendo') y envía el archivo en
+# fragmentos autocontenidos (con su encabezado en CSV y sin partir recursos),
+# cada uno con su índice y su SHA-256. Cada fragmento se procesa y se registra
+# en FragmentoCarga en una sola transacción: reenviarlo no hace nada y, tras un
+# fallo, el cliente consulta los fragmentos confirmados y sigue desde el
+# primero que falte. Los recursos ya cargados se reconocen por su huella y se
+# omiten sin error.
+
+logger = logging.getLogger(__name__)
+
+TAMANO_BLOQUE = 500
+TAMANO_LECTURA = 5000
+MAX_ERRORES_GUARDADOS = 1000
+
+FORMATOS = {
+    '.xlsx': 'xlsx',
+    '.csv': 'csv',
+    '.jsonl': 'jsonl',
+}
+COLUMNAS_OBLIGATORIAS = ['titulo', 'descripcion']
+COLUMNAS_ENTERAS = ['numero_likes', 'numero_dislikes', 'numero_mejora']
+TIPOS_CONTENIDO = [tipo for tipo, _ in Contenido.TIPO_CHOICES]
+CAMPOS_HUELLA = ['titulo', 'subtitulo', 'categoria', 'area', 'descripcion']
+# Rango de IntegerField en PostgreSQL; un valor fuera de él haría fallar el INSERT del bloque
+ENTERO_MIN, ENTERO_MAX = -2 ** 31, 2 ** 31 - 1
+
+def _texto(valor):
+    if valor is None:
+        return None
+    if isinstance(valor, float) and valor.is_integer():
+        valor = int(valor)
+    return str(valor).strip()
+
+
+def _entero(valor, defecto=0):
+    if valor is None or valor == '':
+        return defecto
+    # Los CSV llegan como texto y pueden traer enteros escritos como "3.0"
+    return int(float(valor)) if isinstance(valor, str) else int(valor)
+
+
+def _booleano(valor):
+    if isinstance(valor, str):
+        return valor.strip().lower() in ('true', '1', 'si', 'sí', 'verdadero')
+    return bool(valor)
+
+
+def leer_filas_excel(archivo):
+    """Genera un dict {columna: valor} por fila de la primera hoja (las filas vacías se omiten)"""
+    libro = load_workbook(archivo, read_only=True, data_only=True)
+    try:
+        filas = libro.worksheets[0].iter_rows(values_only=True)
+        encabezado = next(filas, None)
+        if encabezado is None:
+            return
+        columnas = [_texto(columna) for columna in encabezado]
+        for valores in filas:
+            if all(valor is None or valor == '' for valor in valores):
+                continue
+            yield {columna: valor for columna, valor in zip(columnas, valores) if columna}
+    finally:
+        libro.close()
+
+
+def leer_tablas(archivo, formato, tamano=TAMANO_LECTURA):
+    """Genera DataFrames de a lo sumo 'tamano' filas, numeradas de forma continua en el índice.
+
+    Un archivo que no se puede leer en su formato (CSV o JSON mal formado o
+    truncado, Excel que no es un xlsx) genera un ValidationError.
+    """
+    leidas = 0
+    try:
+        if formato == 'csv':
+            tablas = pd.read_csv(
+                archivo, dtype=str, keep_default_na=False, na_values=[''], encoding='utf-8-sig', chunksize=tamano
+            )
+        elif formato == 'jsonl':
+            tablas = pd.read_json(io.TextIOWrapper(archivo, encoding='utf-8-sig'), lines=True, dtype=False, chunksize=tamano)
+        else:
+            tablas = (pd.DataFrame.from_records(filas) for filas in en_bloques(leer_filas_excel(archivo), tamano))
+
+        for tabla in tablas:
+            tabla.index = pd.RangeIndex(leidas, leidas + len(tabla))
+            leidas += len(tabla)
+            yield tabla
+    # ParserError y los errores de decodificación son subclases de ValueError
+    except (ValueError, zipfile.BadZipFile, InvalidFileException) as e:
+        raise ValidationError(f"El archivo no es un {formato} válido: {e}")
+
+
+def _enteros(valores):
+    """(presentes, enteros, números) de una columna; enteros marca los valores con valor entero"""
+    numeros = pd.to_numeric(valores, errors='coerce')
+    presentes = valores.notna() & (valores.astype('string').str.strip() != '')
+    return presentes, numeros.notna() & (numeros % 1 == 0), numeros
+
+
+def _en_rango(numeros):
+    return numeros.between(ENTERO_MIN, ENTERO_MAX)
+
+
+def _titulo(valor):
+    # Igual que el título normalizado de validar_tabla (astype('string').str.strip())
+    return None if pd.isna(valor) else str(valor).strip()
+
+
+def validar_tabla(tabla, carga_recursos, primera_fila=2, rechazados=()):
+    """Valida un DataFrame por columnas; devuelve (filas válidas como dicts, errores por fila, títulos rechazados).
+
+    Las filas de un recurso con alguna fila inválida (o cuyo título está en
+    'rechazados') también se omiten para no crearlo incompleto. Las categorías
+    y áreas se comprueban con una consulta por tabla (ver
+    CargaRecursos.referencias_validas).
+    """
+    faltantes = [columna for columna in COLUMNAS_OBLIGATORIAS if columna not in tabla.columns]
+    if faltantes:
+        raise ValidationError(f"Faltan columnas obligatorias en el archivo: {', '.join(faltantes)}.")
+    tabla = tabla.reindex(columns=COLUMNAS_CARGA)
+
+    titulo = tabla['titulo'].astype('string').str.strip()
+    tipo = tabla['tipo_contenido'].astype('string').str.strip()
+    con_contenido = tipo.fillna('') != ''
+    _, posicion_entera, posiciones = _enteros(tabla['posicion'])
+    reglas = [
+        (titulo.fillna('') == '', "El campo 'titulo' es obligatorio."),
+        (con_contenido & ~tipo.isin(TIPOS_CONTENIDO), "tipo_contenido '" + tipo.fillna('') + "' no es válido."),
+        (con_contenido & ~posicion_entera, "posicion debe ser un entero."),
+        (con_contenido & posicion_entera & ~_en_rango(posiciones), "posicion está fuera de rango."),
+    ]
+    for columna in COLUMNAS_ENTERAS:
+        presentes, enteros, numeros = _enteros(tabla[columna])
+        reglas.append((presentes & ~enteros, f"{columna} debe ser un entero."))
+        reglas.append((enteros & ~_en_rango(numeros), f"{columna} está fuera de rango."))
+    for columna, modelo in (('categoria', Categoria), ('area', Area)):
+        presentes, enteros, ids = _enteros(tabla[columna])
+        # Un id fuera de rango no se consulta y se informa como inexistente
+        consultables = ids[enteros & _en_rango(ids)]
+        validos = carga_recursos.referencias_validas(modelo, consultables.astype('int64').unique().tolist())
+        reglas.append((presentes & ~enteros, f"{columna} debe ser un id numérico."))
+        reglas.append((enteros & ~ids.isin(list(validos)), f"{columna} '" + tabla[columna].astype('string').fillna('') + "' no existe."))
+
+    mensajes = pd.Series('', index=tabla.index, dtype='string')
+    for mascara, mensaje in reglas:
+        mensajes = mensajes.mask(mascara, mensajes + ' ' + mensaje)
+    con_error = mensajes != ''
+    numeros_fila = pd.Series(tabla.index + primera_fila, index=tabla.index).astype('string')
+    errores = ('Fila ' + numeros_fila + ':' + mensajes)[con_error].tolist()
+
+    rechazados = set(titulo[con_error].dropna()) | set(rechazados)
+    validas = tabla[~con_error & ~titulo.isin(list(rechazados))]
+    return validas.astype(object).where(validas.notna(), None).to_dict('records'), errores, rechazados
+
+
+def filas_validadas(archivo, formato, carga_recursos, progreso, tamano=TAMANO_LECTURA):
+    """Filas válidas del archivo; los errores de validación se agregan a carga_recursos.errores.
+
+    Un recurso puede quedar repartido entre dos tablas: las filas del último
+    título de cada tabla se retienen hasta validar la siguiente y, si el
+    recurso tiene errores en cualquiera de las dos, se omite completo.
+    """
+    primera_fila = 1 if formato == 'jsonl' else 2
+    abierto, abierto_rechazado, retenidas = None, False, []
+    for tabla in leer_tablas(archivo, formato, tamano):
+        continua = abierto is not None and 'titulo' in tabla.columns and _titulo(tabla['titulo'].iloc[0]) == abierto
+        previos = {abierto} if continua and abierto_rechazado else set()
+        filas, errores, rechazados = validar_tabla(tabla, carga_recursos, primera_fila, previos)
+        progreso['filas_procesadas'] += len(tabla)
+        carga_recursos.errores.extend(errores)
+        if not (continua and abierto in rechazados):
+            yield from retenidas
+
+        abierto = _titulo(tabla['titulo'].iloc[-1])
+        abierto_rechazado = abierto in rechazados
+        corte = len(filas)
+        while corte and _titulo(filas[corte - 1].get('titulo')) == abierto:
+            corte -= 1
+        retenidas = filas[corte:]
+        yield from filas[:corte]
+    yield from retenidas
+
+
+def agrupar_por_titulo(filas):
+    """Agrupa filas consecutivas con el mismo título en recursos con su lista de contenido.
+
+    Las filas llegan validadas por validar_tabla (todas tienen título).
+    """
+    actual = None
+    for fila in filas:
+        titulo = _texto(fila.get('titulo'))
+        if actual is None or actual['titulo'] != titulo:
+            if actual is not None:
+                yield actual
+            actual = {
+                'titulo': titulo,
+                'subtitulo': _texto(fila.get('subtitulo')),
+                'categoria': _entero(fila.get('categoria'), None),
+                'area': _entero(fila.get('area'), None),
+                'descripcion': _texto(fila.get('descripcion')) or '',
+                'validado': _booleano(fila.get('validado')),
+                'numero_likes': _entero(fila.get('numero_likes')),
+                'numero_dislikes': _entero(fila.get('numero_dislikes')),
+                'numero_mejora': _entero(fila.get('numero_mejora')),
+                'contenido': [],
+            }
+
+        tipo_contenido = _texto(fila.get('tipo_contenido'))
+        if tipo_contenido:
+            actual['contenido'].append({
+                'tipo_contenido': tipo_contenido,
+                'contenido_bloque': _texto(fila.get('contenido_bloque')) or '',
+                'posicion': _entero(fila.get('posicion')),
+            })
+    if actual is not None:
+        yield actual
+
+
+def en_bloques(elementos, tamano):
+    """Divide un iterable en listas de a lo sumo 'tamano' elementos sin materializarlo"""
+    iterador = iter(elementos)
+    while bloque := list(islice(iterador, tamano)):
+        yield bloque
+
+
+def huella_recurso(recurso_data):
+    """SHA-256 de los datos y el contenido de un recurso (sin contadores ni validado)"""
+    datos = [recurso_data.get(campo) or None for campo in CAMPOS_HUELLA]
+    datos.append([
+        [contenido_data.get('tipo_contenido'), contenido_data.get('contenido_bloque'), contenido_data.get('posicion')]
+        for contenido_data in recurso_data.get('contenido') or []
+    ])
+    return hashlib.sha256(json.dumps(datos, ensure_ascii=False, default=str).encode()).hexdigest()
+
+
+class CargaRecursos:
+    """Crea bloques de recursos con su contenido usando bulk_create.
+
+    Por bloque: una consulta de títulos existentes, a lo sumo una por
+    categorías y áreas aún no vistas (las ya comprobadas quedan en memoria
+    entre bloques), un INSERT de recursos y otro de contenidos. Los recursos
+    rechazados se acumulan en errores y los creados en creados.
+
+    Cada recurso creado guarda su huella (huella_recurso). Con
+    omitir_duplicados, un recurso cuya huella ya existe se cuenta en omitidos
+    en lugar de informarse como error, de modo que repetir una carga no crea
+    ni reporta nada nuevo.
+
+    Cada bloque se inserta en su propio savepoint: un error de base de datos
+    descarta solo ese bloque, se informa en errores y queda en
+    error_base_datos, sin marcar para rollback la transacción de quien llama.
+    """
+
+    def __init__(self, omitir_duplicados=False):
+        self.omitir_duplicados = omitir_duplicados
+        self.creados = []
+        self.errores = []
+        self.omitidos = 0
+        self.error_base_datos = None
+        self._referencias = {Categoria: {}, Area: {}}
+
+    def referencias_validas(self, modelo, ids):
+        """Ids de modelo (Categoria o Area) que existen, consultando solo los no vistos antes"""
+        conocidas = self._referencias[modelo]
+        nuevas = {pk for pk in ids if pk is not None} - conocidas.keys()
+        if nuevas:
+            existentes = set(modelo.objects.filter(pk__in=nuevas).values_list('pk', flat=True))
+            conocidas.update((pk, pk in existentes) for pk in nuevas)
+        return {pk for pk, existe in conocidas.items() if existe}
+
+    def crear(self, recursos):
+        """Crea un bloque de dicts con los campos del recurso, categoria/area como ids y
+        la lista 'contenido'; devuelve los recursos creados"""
+        titulos = {recurso_data['titulo'] for recurso_data in recursos}
+        huellas = [huella_recurso(recurso_data) for recurso_data in recursos]
+        coincidencias = Recurso.objects.filter(Q(titulo__in=titulos) | Q(hash_contenido__in=huellas))
+        existentes = set()
+        huellas_existentes = set()
+        for titulo, huella in coincidencias.values_list('titulo', 'hash_contenido'):
+            existentes.add(titulo)
+            huellas_existentes.add(huella)
+        categorias = self.referencias_validas(Categoria, [recurso_data.get('categoria') for recurso_data in recursos])
+        areas = self.referencias_validas(Area, [recurso_data.get('area') for recurso_data in recursos])
+
+        nuevos = []
+        contenidos = []
+        for recurso_data, huella in zip(recursos, huellas):
+            titulo = recurso_data['titulo']
+            categoria = recurso_data.get('categoria')
+            area = recurso_data.get('area')
+            if huella in huellas_existentes and self.omitir_duplicados:
+                self.omitidos += 1
+                continue
+            if titulo in existentes or huella in huellas_existentes:
+                self.errores.append(f"El recurso con título '{titulo}' ya existe.")
+                continue
+            if categoria is not None and categoria not in categorias:
+                self.errores.append(f"La categoría {categoria} del recurso '{titulo}' no existe.")
+                continue
+            if area is not None and area not in areas:
+                self.errores.append(f"El área {area} del recurso '{titulo}' no existe.")
+                continue
+
+            # Un título repetido dentro del mismo bloque se informa igual que uno ya existente
+            existentes.add(titulo)
+            huellas_existentes.add(huella)
+            datos = {campo: valor for campo, valor in recurso_data.items() if campo not in ('categoria', 'area', 'contenido')}
+            recurso = Recurso(categoria_id=categoria, area_id=area, hash_contenido=huella, **datos)
+            nuevos.append(recurso)
+            contenidos.append(recurso_data.get('contenido') or [])
+
+        if not nuevos:
+            return []
+
+        try:
+            with transaction.atomic():
+                Recurso.objects.bulk_create(nuevos)
+                if not connection.features.can_return_rows_from_bulk_insert:
+                    ids = dict(Recurso.objects.filter(titulo__in=[r.titulo for r in nuevos]).values_list('titulo', 'id'))
+                    for recurso in nuevos:
+                        recurso.pk = ids[recurso.titulo]
+                Contenido.objects.bulk_create([
+                    Contenido(recurso=recurso, **contenido_data)
+                    for recurso, bloques in zip(nuevos, contenidos)
+                    for contenido_data in bloques
+                ])
+        except DatabaseError as e:
+            self.error_base_datos = f"Error al crear los recursos desde '{nuevos[0].titulo}' hasta '{nuevos[-1].titulo}': {str(e)}"
+            self.errores.append(self.error_base_datos)
+            return []
+
+        # bulk_create no dispara las señales de Recurso y Contenido: se indexa el bloque completo
+        actualizar_indice_busqueda([recurso.pk for recurso in nuevos])
+        agregados = [(recurso.pk, recurso.titulo) for recurso in nuevos]
+
+        def autocompletar():
+            for pk, titulo in agregados:
+                indice_titulos.agregar(pk, titulo)
+
+        transaction.on_commit(autocompletar)
+
+        self.creados.extend(nuevos)
+        return nuevos
+
+
+def _guardar_progreso(carga_id, progreso, **campos):
+    ahora = timezone.now()
+    CargaMasiva.objects.filter(pk=carga_id).update(updated_at=ahora, **progreso, **campos)
+
+
+def procesar_carga(carga_id, tamano_bloque=TAMANO_BLOQUE):
+    """Procesa una carga pendiente confirmando bloque a bloque; devuelve False si ya la tomó otro proceso"""
+    ahora = timezone.now()
+    tomada = CargaMasiva.objects.filter(pk=carga_id, estado='pendiente').update(estado='procesando', updated_at=ahora)
+    if not tomada:
+        return False
+
+    carga = CargaMasiva.objects.get(pk=carga_id)
+    # Una carga reencolada ya tiene iniciada_en y omite los recursos que creó antes
+    reanudada = carga.iniciada_en is not None
+    if not reanudada:
+        CargaMasiva.objects.filter(pk=carga_id).update(iniciada_en=ahora)
+    carga_recursos = CargaRecursos(omitir_duplicados=reanudada)
+    progreso = {'filas_procesadas': 0, 'recursos_creados': 0, 'recursos_omitidos': 0, 'total_errores': 0, 'errores': []}
+    try:
+        with carga.archivo.open('rb') as archivo:
+            recursos = agrupar_por_titulo(filas_validadas(archivo, carga.formato, carga_recursos, progreso))
+            for bloque in en_bloques(recursos, tamano_bloque):
+                with transaction.atomic():
+                    progreso['recursos_creados'] += len(carga_recursos.crear(bloque))
+                    progreso['recursos_omitidos'] = carga_recursos.omitidos
+                    progreso['total_errores'] += len(carga_recursos.errores)
+                    progreso['errores'] += carga_recursos.errores[:MAX_ERRORES_GUARDADOS - len(progreso['errores'])]
+                    # Solo se conservan los contadores, no los recursos de cada bloque
+                    carga_recursos.creados.clear()
+                    carga_recursos.errores.clear()
+                    _guardar_progreso(carga_id, progreso)
+    except Exception as e:
+        if isinstance(e, ValidationError):
+            mensaje = " ".join(e.messages)
+        else:
+            logger.exception('Error procesando la carga masiva %s', carga_id)
+            mensaje = "Error procesando el archivo: " + str(e)
+        _guardar_progreso(carga_id, progreso, estado='fallida', mensaje=mensaje, terminada_en=timezone.now())
+        return True
+
+    mensaje = f"Carga masiva de recursos realizada. Recursos creados: {progreso['recursos_creados']}"
+    if progreso['recursos_omitidos']:
+        mensaje += f", omitidos: {progreso['recursos_omitidos']}"
+    if progreso['total_errores']:
+        mensaje += f", errores: {progreso['total_errores']}"
+    _guardar_progreso(carga_id, progreso, estado='completada', mensaje=mensaje, terminada_en=timezone.now(), archivo='')
+    carga.archivo.delete(save=False)
+    return True
+
+
+def reencolar_cargas_abandonadas():
+    """Devuelve a 'pendiente' las cargas en proceso sin progreso durante CARGAS_ABANDONADA_MINUTOS"""
+    ahora = timezone.now()
+    limite = ahora - timedelta(minutes=getattr(settings, 'CARGAS_ABANDONADA_MINUTOS', 30))
+    reencoladas = CargaMasiva.objects.filter(estado='procesando', updated_at__lt=limite).update(
+        estado='pendiente', updated_at=ahora
+    )
+    if reencoladas:
+        logger.warning('Cargas masivas abandonadas reencoladas: %s', reencoladas)
+    return reencoladas
+
+
+def procesar_cargas_pendientes(tamano_bloque=TAMANO_BLOQUE):
+    """Procesa en orden de llegada las cargas pendientes (y las abandonadas); devuelve cuántas procesó este proceso"""
+    reencolar_cargas_abandonadas()
+    pendientes = CargaMasiva.objects.filter(estado='pendiente').order_by('created_at').values_list('id', flat=True)
+    return sum(procesar_carga(carga_id, tamano_bloque) for carga_id in list(pendientes))
+
+
+_ejecutor = None
+_lock_ejecutor = threading.Lock()
+
+
+def _procesar_en_hilo(carga_id):
+    try:
+        procesar_carga(carga_id)
+    except Exception:
+        logger.exception('Error procesando la carga masiva %s', carga_id)
+    finally:
+        connection.close()
+
+
+def encolar_carga(carga_id):
+    """Envía la carga al grupo de hilos del proceso al confirmar la transacción.
+
+    Con CARGAS_HILOS = 0 la carga queda pendiente para el comando procesar_cargas.
+    """
+    global _ejecutor
+    hilos = getattr(settings, 'CARGAS_HILOS', 2)
+    if not hilos:
+        return
+    with _lock_ejecutor:
+        if _ejecutor is None:
+            _ejecutor = ThreadPoolExecutor(max_workers=hilos, thread_name_prefix='carga-masiva')
+    transaction.on_commit(lambda: _ejecutor.submit(_procesar_en_hilo, carga_id))
+
+
+class ConflictoCarga(Exception):
+    """El fragmento no se puede aplicar a la sesión (índice ya usado con otro contenido o sesión cerrada)"""
+
+
+def procesar_fragmento(carga_id, indice, archivo, checksum):
+    """Procesa un fragmento de una carga por fragmentos en una transacción; devuelve (fragmento, nuevo).
+
+    Reenviar un fragmento confirmado con el mismo checksum devuelve el
+    registro existente sin procesarlo de nuevo.
+    """
+    checksum = checksum.strip().lower()
+    digest = hashlib.sha256()
+    for parte in archivo.chunks():
+        digest.update(parte)
+    if digest.hexdigest() != checksum:
+        raise ValidationError("El checksum no coincide con el contenido del fragmento.")
+    archivo.seek(0)
+
+    with transaction.atomic():
+        # El bloqueo de la sesión serializa los fragmentos de una misma carga
+        carga = CargaMasiva.objects.select_for_update().get(pk=carga_id)
+        anterior = FragmentoCarga.objects.filter(carga=carga, indice=indice).first()
+        if anterior is not None:
+            if anterior.checksum != checksum:
+                raise ConflictoCarga(f"El fragmento {indice} ya se confirmó con otro contenido.")
+            return anterior, False
+        if carga.estado != 'recibiendo':
+            raise ConflictoCarga("La carga ya no recibe fragmentos.")
+
+        carga_recursos = CargaRecursos(omitir_duplicados=True)
+        progreso = {'filas_procesadas': 0}
+        recursos = agrupar_por_titulo(filas_validadas(archivo, carga.formato, carga_recursos, progreso))
+        for bloque in en_bloques(recursos, TAMANO_BLOQUE):
+            carga_recursos.crear(bloque)
+        if carga_recursos.error_base_datos:
+            # Un error de base de datos descarta el fragmento completo para que se pueda reenviar
+            raise DatabaseError(carga_recursos.error_base_datos)
+
+        fragmento = FragmentoCarga.objects.create(
+            carga=carga,
+            indice=indice,
+            checksum=checksum,
+            filas=progreso['filas_procesadas'],
+            recursos_creados=len(carga_recursos.creados),
+            recursos_omitidos=carga_recursos.omitidos,
+            total_errores=len(carga_recursos.errores),
+        )
+        carga.filas_procesadas += fragmento.filas
+        carga.recursos_creados += fragmento.recursos_creados
+        carga.recursos_omitidos += fragmento.recursos_omitidos
+        carga.total_errores += fragmento.total_errores
+        errores = [f"Fragmento {indice}: {error}" for error in carga_recursos.errores]
+        carga.errores = carga.errores + errores[:MAX_ERRORES_GUARDADOS - len(carga.errores)]
+        carga.iniciada_en = carga.iniciada_en or fragmento.created_at
+        carga.save()
+    return fragmento, True
+
+
+def completar_carga(carga_id, total_fragmentos):
+    """Cierra una carga por fragmentos si tiene confirmados los fragmentos 0..total_fragmentos-1"""
+    with transaction.atomic():
+        carga = CargaMasiva.objects.select_for_update().get(pk=carga_id)
+        if carga.estado != 'recibiendo':
+            raise ConflictoCarga("La carga ya no recibe fragmentos.")
+        confirmados = set(carga.fragmentocarga_set.values_list('indice', flat=True))
+        faltantes = [indice for indice in range(total_fragmentos) if indice not in confirmados]
+        if faltantes:
+            raise ConflictoCarga(f"Faltan los fragmentos: {', '.join(map(str, faltantes))}.")
+        carga.estado = 'completada'
+        carga.terminada_en = timezone.now()
+        carga.mensaje = f"Carga masiva de recursos realizada. Recursos creados: {carga.recursos_creados}"
+        if carga.total_errores:
+            carga.mensaje += f", errores: {carga.total_errores}"
+        carga.save()
+    return carga
@@ -0,0 +1,316 @@
+import atexit
+import logging
+import random
+import threading
+import time
+from collections import defaultdict
+from django.conf import settings
+from django.core import checks
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.db.models import Case, F, FloatField, IntegerField, Sum, Value, When
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+# Contadores de votos diferidos (write-behind), opcional con
+# VOTOS_CONTADORES_DIFERIDOS = True.
+#
+# Los votos se siguen escribiendo al momento, pero los deltas de los
+# contadores se acumulan en un buffer en memoria del proceso y un hilo los
+# aplica a Recurso cada VOTOS_FLUSH_SEGUNDOS con un único UPDATE agrupado,
+# en vez de bloquear la fila del recurso en cada voto. Los deltas pendientes
+# también se suman en la cache de Django para que cualquier proceso pueda
+# mostrar los contadores persistidos más los pendientes.
+#
+# Con VOTOS_FLUSH_SEGUNDOS = 0 no se inicia el hilo y el flush es manual.
+# Si un proceso termina de forma abrupta se pierden sus deltas pendientes; las
+# claves de la cache vencen a los _ttl_pendientes() segundos de crearse, así
+# que los deltas que dejó sumados dejan de mostrarse. La cache debe tener un
+# incr atómico entre procesos (ver verificar_cache_contadores).
+#
+# Contadores fragmentados, opcional con VOTOS_CONTADORES_FRAGMENTOS = N.
+#
+# Cada delta se suma a uno de N fragmentos del recurso, elegido al azar, en
+# recursos_contadores_fragmentos; los votos concurrentes sobre un mismo recurso
+# se reparten entre N filas en vez de esperar el bloqueo de la fila de
+# recursos. Las lecturas suman los fragmentos a los contadores persistidos y
+# compactar_fragmentos() (comando compactar_contadores) los pliega en Recurso.
+# A diferencia del buffer, los deltas se escriben en la transacción del voto.
+
+CONTADORES_VOTO = {
+    'like': 'numero_likes',
+    'dislike': 'numero_dislikes',
+    'mejora': 'numero_mejora',
+}
+
+
+def contadores_diferidos():
+    return getattr(settings, 'VOTOS_CONTADORES_DIFERIDOS', False)
+
+
+def contadores_fragmentados():
+    return getattr(settings, 'VOTOS_CONTADORES_FRAGMENTOS', 0) > 0
+
+
+# Backends de cache cuyo incr es atómico para todos los procesos que la comparten
+# (LocMemCache solo se comparte dentro del proceso, donde su incr usa un lock)
+CACHES_INCR_ATOMICO = (
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.redis.RedisCache',
+    'django.core.cache.backends.memcached.PyMemcacheCache',
+    'django.core.cache.backends.memcached.PyLibMCCache',
+    'django_redis.cache.RedisCache',
+)
+
+
+@checks.register()
+def verificar_cache_contadores(app_configs, **kwargs):
+    """Los contadores diferidos suman los pendientes con cache.incr, que debe ser atómico"""
+    backend = settings.CACHES.get('default', {}).get('BACKEND')
+    if not contadores_diferidos() or backend in CACHES_INCR_ATOMICO:
+        return []
+    return [checks.Error(
+        f'VOTOS_CONTADORES_DIFERIDOS requiere una cache con incr atómico; {backend} no lo es.',
+        hint='Use Redis, Memcached o LocMemCache, o desactive VOTOS_CONTADORES_DIFERIDOS.',
+        id='contenido.E001',
+    )]
+
+
+def _ttl_pendientes():
+    return max(getattr(settings, 'VOTOS_FLUSH_SEGUNDOS', 5) * 10, 60)
+
+
+def _actualizar_recursos(pendientes, tendencias):
+    """Suma deltas {recurso_id: {tipo_voto: n}} y {recurso_id: tendencia} a los recursos en un solo UPDATE.
+
+    Los deltas de recursos eliminados desde que se acumularon se descartan.
+    """
+    from .estadisticas import registrar_resumen
+    from .models import Recurso
+
+    with transaction.atomic():
+        # El bloqueo evita que un recurso se elimine entre la comprobación y el INSERT de su resumen
+        existentes = set(
+            Recurso.objects.select_for_update().filter(pk__in=set(pendientes) | set(tendencias)).values_list('pk', flat=True)
+        )
+        pendientes = {recurso_id: deltas for recurso_id, deltas in pendientes.items() if recurso_id in existentes}
+        tendencias = {recurso_id: delta for recurso_id, delta in tendencias.items() if recurso_id in existentes}
+
+        cambios = {}
+        for tipo, campo in CONTADORES_VOTO.items():
+            casos = [
+                When(pk=recurso_id, then=Value(deltas[tipo]))
+                for recurso_id, deltas in pendientes.items() if deltas.get(tipo)
+            ]
+            if casos:
+                cambios[campo] = F(campo) + Case(*casos, default=Value(0), output_field=IntegerField())
+        casos = [When(pk=recurso_id, then=Value(delta)) for recurso_id, delta in tendencias.items() if delta]
+        if casos:
+            cambios['tendencia'] = F('tendencia') + Case(*casos, default=Value(0.0), output_field=FloatField())
+        if not existentes:
+            return
+
+        Recurso.objects.filter(pk__in=existentes).update(updated_at=timezone.now(), **cambios)
+        # Los deltas se registran en el periodo en que se aplican
+        registrar_resumen(pendientes)
+
+
+def _clave_pendiente(recurso_id, tipo):
+    return f'contador_pendiente:{recurso_id}:{tipo}'
+
+
+def _clave_modificado(recurso_id=None):
+    return 'contador_pendiente:modificado' if recurso_id is None else f'contador_pendiente:modificado:{recurso_id}'
+
+
+class BufferContadores:
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._pendientes = defaultdict(lambda: defaultdict(int))
+        self._tendencias = defaultdict(float)
+        self._hilo = None
+
+    def agregar(self, recurso_id, deltas, tendencia=0.0):
+        """Acumula deltas {tipo_voto: n} (y el delta de tendencia) del recurso hasta el próximo flush"""
+        with self._lock:
+            for tipo, delta in deltas.items():
+                if delta:
+                    self._pendientes[recurso_id][tipo] += delta
+            if tendencia:
+                self._tendencias[recurso_id] += tendencia
+        for tipo, delta in deltas.items():
+            if delta:
+                clave = _clave_pendiente(recurso_id, tipo)
+                cache.add(clave, 0, _ttl_pendientes())
+                try:
+                    cache.incr(clave, delta)
+                except ValueError:
+                    # La clave venció entre add e incr
+                    cache.add(clave, delta, _ttl_pendientes())
+        # El voto no cambia el updated_at del recurso hasta el flush: los validadores HTTP usan esta marca
+        ahora = timezone.now()
+        cache.set_many({_clave_modificado(): ahora, _clave_modificado(recurso_id): ahora}, _ttl_pendientes())
+        self._iniciar_hilo()
+
+    def ultima_modificacion(self, recurso_id=None):
+        """Momento del último delta agregado (de cualquier proceso) al recurso o, sin recurso_id, a cualquiera"""
+        return cache.get(_clave_modificado(recurso_id))
+
+    def flush(self):
+        """Aplica todos los deltas pendientes del proceso en un solo UPDATE"""
+        from .cache import invalidar_recurso_cache
+
+        with self._lock:
+            pendientes, self._pendientes = self._pendientes, defaultdict(lambda: defaultdict(int))
+            tendencias, self._tendencias = self._tendencias, defaultdict(float)
+        afectados = set(pendientes) | set(tendencias)
+        if not afectados:
+            return 0
+
+        try:
+            _actualizar_recursos(pendientes, tendencias)
+        except Exception:
+            # Se devuelven los deltas al buffer para el siguiente intento
+            with self._lock:
+                for recurso_id, deltas in pendientes.items():
+                    for tipo, delta in deltas.items():
+                        self._pendientes[recurso_id][tipo] += delta
+                for recurso_id, delta in tendencias.items():
+                    self._tendencias[recurso_id] += delta
+            raise
+
+        for recurso_id, deltas in pendientes.items():
+            for tipo, delta in deltas.items():
+                if delta:
+                    try:
+                        cache.decr(_clave_pendiente(recurso_id, tipo), delta)
+                    except ValueError:
+                        pass
+        for recurso_id in afectados:
+            invalidar_recurso_cache(recurso_id)
+        return len(afectados)
+
+    def pendientes(self, recurso_ids):
+        """Deltas pendientes (de todos los procesos) por recurso: {recurso_id: {campo: delta}}"""
+        claves = {
+            _clave_pendiente(recurso_id, tipo): (recurso_id, campo)
+            for recurso_id in recurso_ids
+            for tipo, campo in CONTADORES_VOTO.items()
+        }
+        resultado = defaultdict(dict)
+        for clave, delta in cache.get_many(list(claves)).items():
+            if delta:
+                recurso_id, campo = claves[clave]
+                resultado[recurso_id][campo] = delta
+        return resultado
+
+    def _iniciar_hilo(self):
+        if self._hilo is not None or not getattr(settings, 'VOTOS_FLUSH_SEGUNDOS', 5):
+            return
+        with self._lock:
+            if self._hilo is None:
+                self._hilo = threading.Thread(target=self._ciclo, name='flush-contadores', daemon=True)
+                self._hilo.start()
+                atexit.register(self.flush)
+
+    def _ciclo(self):
+        while True:
+            time.sleep(getattr(settings, 'VOTOS_FLUSH_SEGUNDOS', 5))
+            try:
+                self.flush()
+            except Exception:
+                logger.exception('Error aplicando los contadores de votos pendientes')
+            finally:
+                connection.close()
+
+
+buffer_contadores = BufferContadores()
+
+
+TABLA_FRAGMENTOS = 'recursos_contadores_fragmentos'
+CAMPOS_FRAGMENTO = list(CONTADORES_VOTO.values()) + ['tendencia']
+
+# El fragmento solo se escribe si el recurso existe: un voto eliminado junto con su recurso no lo recrea
+SQL_SUMAR_FRAGMENTO = (
+    f"INSERT INTO {TABLA_FRAGMENTOS} (recurso_id, fragmento, {', '.join(CAMPOS_FRAGMENTO)}, updated_at)"
+    f" SELECT id, %s, {', '.join(['%s'] * len(CAMPOS_FRAGMENTO))}, %s FROM recursos WHERE id = %s"
+    f" ON CONFLICT (recurso_id, fragmento) DO UPDATE SET "
+    + ', '.join(f"{campo} = {TABLA_FRAGMENTOS}.{campo} + EXCLUDED.{campo}" for campo in CAMPOS_FRAGMENTO)
+    + ", updated_at = EXCLUDED.updated_at"
+)
+
+
+def sumar_a_fragmento(recurso_id, deltas, tendencia=0.0, fragmentos=None):
+    """Suma deltas {tipo_voto: n} y el delta de tendencia a un fragmento al azar del recurso"""
+    valores = [deltas.get(tipo, 0) for tipo in CONTADORES_VOTO] + [tendencia]
+    if not any(valores):
+        return
+    fragmento = random.randrange(fragmentos or settings.VOTOS_CONTADORES_FRAGMENTOS)
+    ahora = connection.ops.adapt_datetimefield_value(timezone.now())
+    with connection.cursor() as cursor:
+        cursor.execute(SQL_SUMAR_FRAGMENTO, [fragmento, *valores, ahora, recurso_id])
+
+
+def deltas_fragmentos(recurso_ids):
+    """Suma de los fragmentos sin compactar por recurso: {recurso_id: {campo: delta}}"""
+    from .models import ContadorFragmentoRecurso
+
+    filas = ContadorFragmentoRecurso.objects.filter(recurso_id__in=recurso_ids).values('recurso_id').annotate(
+        **{f'suma_{campo}': Sum(campo) for campo in CONTADORES_VOTO.values()}
+    )
+    return {
+        fila['recurso_id']: {campo: fila[f'suma_{campo}'] for campo in CONTADORES_VOTO.values()}
+        for fila in filas
+    }
+
+
+def compactar_fragmentos(limite=5000):
+    """Pliega en Recurso hasta 'limite' fragmentos y los elimina; devuelve los fragmentos compactados.
+
+    Los fragmentos se bloquean mientras se compactan, así que un voto
+    concurrente sobre uno de ellos espera a que termine y vuelve a crearlo.
+    """
+    from .cache import invalidar_recurso_cache
+    from .models import ContadorFragmentoRecurso
+
+    with transaction.atomic():
+        filas = list(
+            ContadorFragmentoRecurso.objects.select_for_update().order_by('pk').values_list(
+                'pk', 'recurso_id', *CAMPOS_FRAGMENTO
+            )[:limite]
+        )
+        if not filas:
+            return 0
+        pendientes = defaultdict(lambda: defaultdict(int))
+        tendencias = defaultdict(float)
+        for pk, recurso_id, *valores, tendencia in filas:
+            for tipo, delta in zip(CONTADORES_VOTO, valores):
+                pendientes[recurso_id][tipo] += delta
+            tendencias[recurso_id] += tendencia
+        # Los deltas de recursos que ya no existen se descartan junto con sus fragmentos
+        _actualizar_recursos(pendientes, tendencias)
+        ContadorFragmentoRecurso.objects.filter(pk__in=[fila[0] for fila in filas]).delete()
+
+    for recurso_id in pendientes:
+        invalidar_recurso_cache(recurso_id)
+    return len(filas)
+
+
+def sumar_pendientes(datos):
+    """Suma a recursos serializados (dicts con 'id' y contadores) los deltas del buffer y de los fragmentos"""
+    if not datos or not (contadores_diferidos() or contadores_fragmentados()):
+        return datos
+    recurso_ids = [dato['id'] for dato in datos]
+    fuentes = []
+    if contadores_diferidos():
+        fuentes.append(buffer_contadores.pendientes(recurso_ids))
+    if contadores_fragmentados():
+        fuentes.append(deltas_fragmentos(recurso_ids))
+    for pendientes in fuentes:
+        for dato in datos:
+            for campo, delta in pendientes.get(dato['id'], {}).items():
+                if campo in dato:
+                    dato[campo] += delta
+    return datos
@@ -0,0 +1,158 @@
+import pandas as pd
+from django.db import connection, transaction
+from django.db.models import Count, Q
+from django.db.models.functions import TruncDay, TruncHour
+from django.utils import timezone
+
+# Resúmenes de votos por periodo (hora y día) para las gráficas de evolución.
+#
+# Cada fila de votos_recursos_resumen guarda el cambio neto de likes, dislikes
+# y mejora de un recurso en un periodo: un voto nuevo suma 1, uno eliminado
+# resta 1 y un cambio de tipo resta en el anterior y suma en el nuevo. Las
+# filas se acumulan en cada escritura de votos con INSERT ... ON CONFLICT DO
+# UPDATE, así que los reportes por rango leen filas ya agregadas en vez de
+# recorrer votos_recursos. Los periodos se cortan en la zona horaria del
+# proyecto (TIME_ZONE).
+
+TABLA_RESUMEN = 'votos_recursos_resumen'
+COLUMNAS_RESUMEN = {
+    'like': 'likes',
+    'dislike': 'dislikes',
+    'mejora': 'mejora',
+}
+FRECUENCIAS = {
+    'hora': 'h',
+    'dia': 'D',
+}
+
+SQL_ACUMULAR = (
+    "ON CONFLICT (recurso_id, granularidad, inicio) DO UPDATE SET "
+    + ', '.join(f"{columna} = {TABLA_RESUMEN}.{columna} + EXCLUDED.{columna}" for columna in COLUMNAS_RESUMEN.values())
+)
+
+
+def inicio_periodo(momento, granularidad):
+    local = timezone.localtime(momento)
+    if granularidad == 'hora':
+        return local.replace(minute=0, second=0, microsecond=0)
+    return local.replace(hour=0, minute=0, second=0, microsecond=0)
+
+
+def parametros_resumen(momento=None):
+    """Inicio de los periodos hora y día de un momento, para sql_acumular_resumen"""
+    momento = momento or timezone.now()
+    return {granularidad: inicio_periodo(momento, granularidad) for granularidad in FRECUENCIAS}
+
+
+def sql_acumular_resumen(deltas, origen, condicion='TRUE'):
+    """INSERT que suma las expresiones SQL {tipo_voto: delta} de cada fila de origen a los periodos del recurso.
+
+    Requiere los parámetros %(recurso)s y los de parametros_resumen().
+    """
+    columnas = ', '.join(COLUMNAS_RESUMEN.values())
+    valores = ', '.join(deltas[tipo] for tipo in COLUMNAS_RESUMEN)
+    periodos = ', '.join(f"('{granularidad}', %({granularidad})s)" for granularidad in FRECUENCIAS)
+    return (
+        f"INSERT INTO {TABLA_RESUMEN} (recurso_id, granularidad, inicio, {columnas})\n"
+        f"    SELECT %(recurso)s, periodo.granularidad, periodo.inicio, {valores}\n"
+        f"    FROM {origen}, (VALUES {periodos}) AS periodo (granularidad, inicio)\n"
+        f"    WHERE {condicion}\n"
+        f"    {SQL_ACUMULAR}"
+    )
+
+
+def registrar_resumen(deltas_por_recurso, momento=None):
+    """Suma deltas {recurso_id: {tipo_voto: n}} a los periodos actuales en una sola sentencia"""
+    periodos = parametros_resumen(momento)
+    filas = []
+    for recurso_id, deltas in deltas_por_recurso.items():
+        if not any(deltas.values()):
+            continue
+        for granularidad, inicio in periodos.items():
+            filas.append(
+                [recurso_id, granularidad, connection.ops.adapt_datetimefield_value(inicio)]
+                + [deltas.get(tipo, 0) for tipo in COLUMNAS_RESUMEN]
+            )
+    if not filas:
+        return
+
+    columnas = ', '.join(COLUMNAS_RESUMEN.values())
+    marcadores = ', '.join(['(' + ', '.join(['%s'] * len(filas[0])) + ')'] * len(filas))
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"INSERT INTO {TABLA_RESUMEN} (recurso_id, granularidad, inicio, {columnas}) VALUES {marcadores} {SQL_ACUMULAR}",
+            [valor for fila in filas for valor in fila]
+        )
+
+
+def reconstruir_resumen(batch_size=1000):
+    """Reconstruye los resúmenes desde los votos actuales; devuelve las filas creadas.
+
+    Los votos eliminados y los cambios de tipo anteriores no quedan en
+    votos_recursos, así que cada voto vigente se cuenta con su tipo actual en
+    el periodo en que se creó.
+    """
+    from .models import ResumenVotosRecurso, VotoRecurso
+
+    conteos = {
+        columna: Count('id', filter=Q(tipo_voto=tipo)) for tipo, columna in COLUMNAS_RESUMEN.items()
+    }
+    creadas = 0
+    with transaction.atomic():
+        ResumenVotosRecurso.objects.all().delete()
+        for granularidad, truncar in (('hora', TruncHour), ('dia', TruncDay)):
+            filas = (
+                VotoRecurso.objects.order_by()
+                .annotate(inicio=truncar('created_at'))
+                .values('recurso_id', 'inicio')
+                .annotate(**conteos)
+                .iterator(chunk_size=batch_size)
+            )
+            bloque = []
+            for fila in filas:
+                bloque.append(ResumenVotosRecurso(granularidad=granularidad, **fila))
+                if len(bloque) >= batch_size:
+                    creadas += len(ResumenVotosRecurso.objects.bulk_create(bloque))
+                    bloque = []
+            creadas += len(ResumenVotosRecurso.objects.bulk_create(bloque))
+    return creadas
+
+
+def reporte_votos(granularidad, desde, hasta, recurso_ids=None):
+    """Evolución de los votos entre desde y hasta, sumada sobre los recursos indicados (o todos).
+
+    Devuelve la serie por periodo (con los periodos sin votos en cero y los
+    acumulados desde el inicio del rango) y los totales por recurso.
+    """
+    from .models import ResumenVotosRecurso
+
+    columnas = list(COLUMNAS_RESUMEN.values())
+    inicio = inicio_periodo(desde, granularidad)
+    filas = ResumenVotosRecurso.objects.filter(granularidad=granularidad, inicio__gte=inicio, inicio__lte=hasta)
+    if recurso_ids is not None:
+        filas = filas.filter(recurso_id__in=recurso_ids)
+    datos = pd.DataFrame.from_records(
+        filas.values_list('recurso_id', 'inicio', *columnas).iterator(chunk_size=5000),
+        columns=['recurso_id', 'inicio'] + columnas
+    )
+    datos['inicio'] = pd.to_datetime(datos['inicio'], utc=True)
+
+    # Los periodos se generan en hora local (cambios de horario incluidos) y se comparan en UTC
+    periodos = pd.date_range(
+        inicio, timezone.localtime(hasta), freq=FRECUENCIAS[granularidad], name='inicio'
+    ).tz_convert('UTC')
+    serie = datos.groupby('inicio')[columnas].sum().reindex(periodos, fill_value=0)
+    acumulado = serie.cumsum().add_prefix('acumulado_')
+    serie = pd.concat([serie, acumulado], axis=1).reset_index()
+
+    recursos = datos.groupby('recurso_id')[columnas].sum()
+    recursos['neto'] = recursos['likes'] - recursos['dislikes']
+    recursos = recursos.sort_values(['neto', 'likes'], ascending=False).reset_index()
+
+    return {
+        'granularidad': granularidad,
+        'desde': inicio,
+        'hasta': hasta,
+        'series': serie.to_dict('records'),
+        'recursos': recursos.to_dict('records'),
+    }
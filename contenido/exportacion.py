@@ -0,0 +1,78 @@
+import csv
+import tempfile
+from openpyxl import Workbook
+from openpyxl.cell.cell import ILLEGAL_CHARACTERS_RE
+
+# Exportación del catálogo con el mismo formato que acepta RecursoBulkUpload:
+# una fila por bloque de contenido, repitiendo los datos del recurso. Los
+# recursos sin contenido se exportan en una fila con las columnas de contenido
+# vacías.
+
+COLUMNAS_CARGA = [
+    'titulo',
+    'subtitulo',
+    'categoria',
+    'area',
+    'descripcion',
+    'validado',
+    'numero_likes',
+    'numero_dislikes',
+    'numero_mejora',
+    'tipo_contenido',
+    'contenido_bloque',
+    'posicion',
+]
+
+
+def filas_recursos(recursos, chunk_size):
+    """Genera las filas de carga masiva; recursos debe precargar contenidos_ordenados"""
+    for recurso in recursos.iterator(chunk_size=chunk_size):
+        datos = [
+            recurso.titulo,
+            recurso.subtitulo or '',
+            recurso.categoria_id or '',
+            recurso.area_id or '',
+            recurso.descripcion,
+            recurso.validado,
+            recurso.numero_likes,
+            recurso.numero_dislikes,
+            recurso.numero_mejora,
+        ]
+        if not recurso.contenidos_ordenados:
+            yield datos + ['', '', '']
+        for contenido in recurso.contenidos_ordenados:
+            yield datos + [contenido.tipo_contenido, contenido.contenido_bloque, contenido.posicion]
+
+
+class _Eco:
+    """Buffer mínimo para csv.writer: devuelve la línea en vez de guardarla"""
+
+    def write(self, valor):
+        return valor
+
+
+def generar_csv(recursos, chunk_size):
+    escritor = csv.writer(_Eco())
+    yield escritor.writerow(COLUMNAS_CARGA)
+    for fila in filas_recursos(recursos, chunk_size):
+        yield escritor.writerow(fila)
+
+
+def _celda(valor):
+    if isinstance(valor, str):
+        return ILLEGAL_CHARACTERS_RE.sub('', valor)
+    return valor
+
+
+def generar_xlsx(recursos, chunk_size):
+    """Escribe el libro en modo write-only (las filas no se guardan en memoria) y devuelve el archivo temporal"""
+    libro = Workbook(write_only=True)
+    hoja = libro.create_sheet('recursos')
+    hoja.append(COLUMNAS_CARGA)
+    for fila in filas_recursos(recursos, chunk_size):
+        hoja.append([_celda(valor) for valor in fila])
+
+    archivo = tempfile.TemporaryFile()
+    libro.save(archivo)
+    archivo.seek(0)
+    return archivo
@@ -0,0 +1,71 @@
+import threading
+import time
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.db.models import F, Sum
+from contenido.contadores import sumar_a_fragmento
+from contenido.models import ContadorFragmentoRecurso, Recurso
+
+
+class Command(BaseCommand):
+    help = (
+        'Mide los votos por segundo sobre un mismo recurso con hilos concurrentes, sumando en la fila '
+        'del recurso y en fragmentos. Cada voto es una transacción que, tras sumar, mantiene el bloqueo '
+        '--espera-ms (el resto del trabajo de la petición). Solo es representativo en PostgreSQL.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--hilos', type=int, default=16)
+        parser.add_argument('--votos', type=int, default=200, help='Votos por hilo')
+        parser.add_argument('--fragmentos', type=int, default=16)
+        parser.add_argument('--espera-ms', type=float, default=2)
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'postgresql':
+            self.stderr.write('Aviso: este motor serializa las escrituras, los resultados no son representativos')
+
+        recurso = Recurso.objects.create(titulo='Benchmark de contadores', descripcion='Recurso temporal')
+        espera = options['espera_ms'] / 1000
+        total = options['hilos'] * options['votos']
+
+        def en_fila():
+            Recurso.objects.filter(pk=recurso.pk).update(numero_likes=F('numero_likes') + 1)
+
+        def en_fragmento():
+            sumar_a_fragmento(recurso.pk, {'like': 1}, fragmentos=options['fragmentos'])
+
+        try:
+            resultados = {}
+            for nombre, sumar in (('fila', en_fila), ('fragmentos', en_fragmento)):
+                resultados[nombre] = self.medir(sumar, options['hilos'], options['votos'], espera)
+                self.stdout.write(f'{nombre:>10}: {total / resultados[nombre]:10.1f} votos/s ({resultados[nombre]:.2f} s)')
+
+            recurso.refresh_from_db()
+            en_fragmentos = ContadorFragmentoRecurso.objects.filter(recurso=recurso).aggregate(total=Sum('numero_likes'))['total']
+            if recurso.numero_likes != total or en_fragmentos != total:
+                self.stderr.write(f'Conteo inesperado: fila={recurso.numero_likes} fragmentos={en_fragmentos} esperado={total}')
+            self.stdout.write(self.style.SUCCESS(f"Mejora con fragmentos: x{resultados['fila'] / resultados['fragmentos']:.2f}"))
+        finally:
+            recurso.delete()
+
+    def medir(self, sumar, hilos, votos, espera):
+        barrera = threading.Barrier(hilos + 1)
+
+        def trabajar():
+            try:
+                barrera.wait()
+                for _ in range(votos):
+                    with transaction.atomic():
+                        sumar()
+                        time.sleep(espera)
+            finally:
+                connection.close()
+
+        trabajadores = [threading.Thread(target=trabajar) for _ in range(hilos)]
+        for trabajador in trabajadores:
+            trabajador.start()
+        barrera.wait()
+        inicio = time.perf_counter()
+        for trabajador in trabajadores:
+            trabajador.join()
+        return time.perf_counter() - inicio
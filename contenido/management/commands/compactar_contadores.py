@@ -0,0 +1,26 @@
+import time
+from django.core.management.base import BaseCommand
+from django.db import connection
+from contenido.contadores import compactar_fragmentos
+
+
+class Command(BaseCommand):
+    help = 'Pliega los fragmentos de contadores de votos en los recursos (VOTOS_CONTADORES_FRAGMENTOS)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--limite', type=int, default=5000, help='Fragmentos por transacción')
+        parser.add_argument('--intervalo', type=float, default=0, help='Si se indica, repite la compactación cada N segundos')
+
+    def handle(self, *args, **options):
+        while True:
+            total = 0
+            while True:
+                compactados = compactar_fragmentos(limite=options['limite'])
+                total += compactados
+                if compactados < options['limite']:
+                    break
+            self.stdout.write(f'Fragmentos compactados: {total}')
+            if not options['intervalo']:
+                break
+            connection.close()
+            time.sleep(options['intervalo'])
@@ -0,0 +1,21 @@
+import time
+from django.core.management.base import BaseCommand
+from django.db import connection
+from contenido.carga import TAMANO_BLOQUE, procesar_cargas_pendientes
+
+
+class Command(BaseCommand):
+    help = 'Procesa las cargas masivas de recursos pendientes y las abandonadas (para usar con CARGAS_HILOS = 0 o tras reiniciar)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--tamano-bloque', type=int, default=TAMANO_BLOQUE, help='Recursos por transacción')
+        parser.add_argument('--intervalo', type=float, default=0, help='Si se indica, revisa la cola cada N segundos')
+
+    def handle(self, *args, **options):
+        while True:
+            procesadas = procesar_cargas_pendientes(tamano_bloque=options['tamano_bloque'])
+            self.stdout.write(f'Cargas procesadas: {procesadas}')
+            if not options['intervalo']:
+                break
+            connection.close()
+            time.sleep(options['intervalo'])
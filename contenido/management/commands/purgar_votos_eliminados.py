@@ -0,0 +1,10 @@
+from django.core.management.base import BaseCommand
+from contenido.votos import purgar_votos_eliminados
+
+
+class Command(BaseCommand):
+    help = 'Elimina las lápidas de votos eliminados más antiguas que VOTOS_LAPIDAS_DIAS'
+
+    def handle(self, *args, **options):
+        eliminadas = purgar_votos_eliminados()
+        self.stdout.write(self.style.SUCCESS(f'Lápidas eliminadas: {eliminadas}'))
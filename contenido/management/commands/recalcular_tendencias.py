@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+from contenido.ranking import recalcular_tendencias
+
+
+class Command(BaseCommand):
+    help = 'Recalcula el puntaje de tendencia de los recursos a partir de los votos (p. ej. tras cambiar EPOCA_TENDENCIA)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000, help='Recursos por bloque de bulk_update')
+
+    def handle(self, *args, **options):
+        revisados = recalcular_tendencias(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f'Tendencia recalculada para {revisados} recursos'))
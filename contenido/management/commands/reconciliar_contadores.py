@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+from contenido.votos import reconciliar_contadores
+
+
+class Command(BaseCommand):
+    help = 'Recalcula numero_likes, numero_dislikes y numero_mejora de los recursos a partir de los votos'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000, help='Recursos por bloque de lectura y de bulk_update')
+        parser.add_argument('--dry-run', action='store_true', help='Solo informa la deriva, sin corregirla')
+
+    def handle(self, *args, **options):
+        reporte = reconciliar_contadores(batch_size=options['batch_size'], aplicar=not options['dry_run'])
+
+        accion = 'con deriva' if options['dry_run'] else 'corregidos'
+        self.stdout.write(f"Recursos revisados: {reporte['recursos_revisados']}")
+        self.stdout.write(f"Recursos {accion}: {reporte['recursos_corregidos']}")
+        for campo, deriva in reporte['deriva'].items():
+            self.stdout.write(f"  {campo}: {deriva}")
+        self.stdout.write(self.style.SUCCESS('Reconciliación de contadores terminada'))
@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+from contenido.estadisticas import reconstruir_resumen
+
+
+class Command(BaseCommand):
+    help = 'Reconstruye los resúmenes de votos por hora y por día a partir de los votos actuales'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000, help='Filas por bloque de bulk_create')
+
+    def handle(self, *args, **options):
+        creadas = reconstruir_resumen(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f'Filas de resumen creadas: {creadas}'))
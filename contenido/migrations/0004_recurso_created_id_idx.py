@@ -0,0 +1,18 @@
+# Generated by Django 5.2 on 2026-10-18 11:27
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('contenido', '0003_votorecurso'),
+        ('maestros', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='recurso',
+            index=models.Index(fields=['created_at', 'id'], name='recursos_created_id_idx'),
+        ),
+    ]
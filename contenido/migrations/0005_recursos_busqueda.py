@@ -0,0 +1,28 @@
+from django.db import migrations
+
+from contenido.busqueda import actualizar_indice_busqueda, crear_indice_busqueda, eliminar_indice_busqueda
+
+
+def crear_indice(apps, schema_editor):
+    crear_indice_busqueda(schema_editor)
+
+    # Indexar los recursos existentes por lotes
+    Recurso = apps.get_model('contenido', 'Recurso')
+    ids = list(Recurso.objects.values_list('id', flat=True))
+    for inicio in range(0, len(ids), 500):
+        actualizar_indice_busqueda(ids[inicio:inicio + 500])
+
+
+def eliminar_indice(apps, schema_editor):
+    eliminar_indice_busqueda(schema_editor)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('contenido', '0004_recurso_created_id_idx'),
+    ]
+
+    operations = [
+        migrations.RunPython(crear_indice, eliminar_indice),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 5.2 on 2026-10-18 11:34
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('contenido', '0005_recursos_busqueda'),
+        ('maestros', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='recurso',
+            index=models.Index(fields=['categoria', 'created_at', 'id'], name='recursos_cat_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='recurso',
+            index=models.Index(fields=['area', 'validado', 'created_at', 'id'], name='recursos_area_val_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='recurso',
+            index=models.Index(fields=['validado', 'is_active', 'created_at', 'id'], name='recursos_val_act_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='recurso',
+            index=models.Index(fields=['numero_likes', 'id'], name='recursos_likes_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='recurso',
+            index=models.Index(fields=['numero_dislikes', 'id'], name='recursos_dislikes_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='recurso',
+            index=models.Index(fields=['numero_mejora', 'id'], name='recursos_mejora_idx'),
+        ),
+    ]
@@ -0,0 +1,46 @@
+# Generated by Django 5.2 on 2026-10-18 11:45
+
+import django.db.models.expressions
+import django.db.models.functions.comparison
+import django.db.models.functions.math
+from django.db import migrations, models
+from contenido.ranking import calcular_tendencias
+
+
+def calcular_tendencias_existentes(apps, schema_editor):
+    Recurso = apps.get_model('contenido', 'Recurso')
+    VotoRecurso = apps.get_model('contenido', 'VotoRecurso')
+    tendencias = calcular_tendencias(VotoRecurso.objects.all())
+    Recurso.objects.bulk_update(
+        [Recurso(pk=pk, tendencia=tendencia) for pk, tendencia in tendencias.items()], ['tendencia'], batch_size=1000
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('contenido', '0006_recurso_filtros_indices'),
+        ('maestros', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recurso',
+            name='puntaje_wilson',
+            field=models.GeneratedField(db_persist=True, expression=models.Case(models.When(models.Q(('numero_likes__lte', 0), ('numero_dislikes__lt', 0), _connector='OR'), then=models.Value(0.0)), default=django.db.models.expressions.CombinedExpression(django.db.models.expressions.CombinedExpression(django.db.models.expressions.CombinedExpression(django.db.models.functions.comparison.Cast('numero_likes', models.FloatField()), '+', models.Value(1.9207999999999998)), '-', django.db.models.expressions.CombinedExpression(models.Value(1.96), '*', django.db.models.functions.math.Sqrt(django.db.models.expressions.CombinedExpression(django.db.models.expressions.CombinedExpression(django.db.models.expressions.CombinedExpression(django.db.models.functions.comparison.Cast('numero_likes', models.FloatField()), '*', django.db.models.functions.comparison.Cast('numero_dislikes', models.FloatField())), '/', django.db.models.expressions.CombinedExpression(django.db.models.functions.comparison.Cast('numero_likes', models.FloatField()), '+', django.db.models.functions.comparison.Cast('numero_dislikes', models.FloatField()))), '+', models.Value(0.9603999999999999))))), '/', django.db.models.expressions.CombinedExpression(django.db.models.expressions.CombinedExpression(django.db.models.functions.comparison.Cast('numero_likes', models.FloatField()), '+', django.db.models.functions.comparison.Cast('numero_dislikes', models.FloatField())), '+', models.Value(3.8415999999999997))), output_field=models.FloatField()), output_field=models.FloatField()),
+        ),
+        migrations.AddField(
+            model_name='recurso',
+            name='tendencia',
+            field=models.FloatField(default=0, verbose_name='Tendencia'),
+        ),
+        migrations.AddIndex(
+            model_name='recurso',
+            index=models.Index(fields=['puntaje_wilson', 'id'], name='recursos_wilson_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='recurso',
+            index=models.Index(fields=['tendencia', 'id'], name='recursos_tendencia_idx'),
+        ),
+        migrations.RunPython(calcular_tendencias_existentes, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,52 @@
+# Generated by Django 5.2 on 2026-10-18 11:47
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('contenido', '0007_recurso_ranking'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='VotoRecursoEliminado',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Fecha de Creación')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='Fecha de Actualización')),
+                ('is_active', models.BooleanField(default=True, verbose_name='Estado')),
+            ],
+            options={
+                'verbose_name': 'Voto de Recurso eliminado',
+                'verbose_name_plural': 'Votos de Recursos eliminados',
+                'db_table': 'votos_recursos_eliminados',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='votorecurso',
+            index=models.Index(fields=['usuario', 'updated_at'], name='votos_usuario_updated_idx'),
+        ),
+        migrations.AddField(
+            model_name='votorecursoeliminado',
+            name='recurso',
+            field=models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, to='contenido.recurso', verbose_name='Recurso'),
+        ),
+        migrations.AddField(
+            model_name='votorecursoeliminado',
+            name='usuario',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL, verbose_name='Usuario'),
+        ),
+        migrations.AddIndex(
+            model_name='votorecursoeliminado',
+            index=models.Index(fields=['usuario', 'updated_at'], name='votos_elim_usuario_updated_idx'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='votorecursoeliminado',
+            unique_together={('usuario', 'recurso')},
+        ),
+    ]
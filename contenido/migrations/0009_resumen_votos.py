@@ -0,0 +1,33 @@
+# Generated by Django 5.2 on 2026-10-18 11:51
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('contenido', '0008_votos_sincronizacion'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ResumenVotosRecurso',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('granularidad', models.CharField(choices=[('hora', 'Hora'), ('dia', 'Día')], max_length=4, verbose_name='Granularidad')),
+                ('inicio', models.DateTimeField(verbose_name='Inicio del periodo')),
+                ('likes', models.IntegerField(default=0, verbose_name='Likes')),
+                ('dislikes', models.IntegerField(default=0, verbose_name='Dislikes')),
+                ('mejora', models.IntegerField(default=0, verbose_name='Mejoras')),
+                ('recurso', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='contenido.recurso', verbose_name='Recurso')),
+            ],
+            options={
+                'verbose_name': 'Resumen de votos',
+                'verbose_name_plural': 'Resúmenes de votos',
+                'db_table': 'votos_recursos_resumen',
+                'indexes': [models.Index(fields=['granularidad', 'inicio'], name='votos_resumen_periodo_idx')],
+                'unique_together': {('recurso', 'granularidad', 'inicio')},
+            },
+        ),
+    ]
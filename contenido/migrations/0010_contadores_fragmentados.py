@@ -0,0 +1,33 @@
+# Generated by Django 5.2 on 2026-10-18 11:54
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('contenido', '0009_resumen_votos'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ContadorFragmentoRecurso',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('fragmento', models.PositiveSmallIntegerField(verbose_name='Fragmento')),
+                ('numero_likes', models.IntegerField(default=0, verbose_name='Numero likes')),
+                ('numero_dislikes', models.IntegerField(default=0, verbose_name='Numero dislikes')),
+                ('numero_mejora', models.IntegerField(default=0, verbose_name='Numero mejoras')),
+                ('tendencia', models.FloatField(default=0, verbose_name='Tendencia')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='Fecha de Actualización')),
+                ('recurso', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='contenido.recurso', verbose_name='Recurso')),
+            ],
+            options={
+                'verbose_name': 'Fragmento de contadores',
+                'verbose_name_plural': 'Fragmentos de contadores',
+                'db_table': 'recursos_contadores_fragmentos',
+                'unique_together': {('recurso', 'fragmento')},
+            },
+        ),
+    ]
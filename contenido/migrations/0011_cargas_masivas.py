@@ -0,0 +1,42 @@
+# Generated by Django 5.2 on 2026-10-18 12:01
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('contenido', '0010_contadores_fragmentados'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CargaMasiva',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Fecha de Creación')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='Fecha de Actualización')),
+                ('is_active', models.BooleanField(default=True, verbose_name='Estado')),
+                ('archivo', models.FileField(upload_to='cargas/', verbose_name='Archivo')),
+                ('nombre_archivo', models.CharField(max_length=255, verbose_name='Nombre del archivo')),
+                ('estado', models.CharField(choices=[('pendiente', 'Pendiente'), ('procesando', 'Procesando'), ('completada', 'Completada'), ('fallida', 'Fallida')], default='pendiente', max_length=10, verbose_name='Estado')),
+                ('filas_procesadas', models.IntegerField(default=0, verbose_name='Filas procesadas')),
+                ('recursos_creados', models.IntegerField(default=0, verbose_name='Recursos creados')),
+                ('total_errores', models.IntegerField(default=0, verbose_name='Total de errores')),
+                ('errores', models.JSONField(blank=True, default=list, verbose_name='Errores')),
+                ('mensaje', models.TextField(blank=True, default='', verbose_name='Mensaje')),
+                ('iniciada_en', models.DateTimeField(blank=True, null=True, verbose_name='Inicio del procesamiento')),
+                ('terminada_en', models.DateTimeField(blank=True, null=True, verbose_name='Fin del procesamiento')),
+                ('usuario', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to=settings.AUTH_USER_MODEL, verbose_name='Usuario')),
+            ],
+            options={
+                'verbose_name': 'Carga masiva',
+                'verbose_name_plural': 'Cargas masivas',
+                'db_table': 'cargas_masivas',
+                'indexes': [models.Index(fields=['estado', 'created_at'], name='cargas_estado_created_idx')],
+            },
+        ),
+    ]
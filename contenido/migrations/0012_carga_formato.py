@@ -0,0 +1,18 @@
+# Generated by Django 5.2 on 2026-10-18 12:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('contenido', '0011_cargas_masivas'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='cargamasiva',
+            name='formato',
+            field=models.CharField(choices=[('xlsx', 'Excel'), ('csv', 'CSV'), ('jsonl', 'JSON Lines')], default='xlsx', max_length=5, verbose_name='Formato'),
+        ),
+    ]
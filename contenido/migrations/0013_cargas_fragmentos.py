@@ -0,0 +1,54 @@
+# Generated by Django 5.2 on 2026-10-18 12:07
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('contenido', '0012_carga_formato'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='cargamasiva',
+            name='recursos_omitidos',
+            field=models.IntegerField(default=0, verbose_name='Recursos omitidos por estar ya cargados'),
+        ),
+        migrations.AddField(
+            model_name='recurso',
+            name='hash_contenido',
+            field=models.CharField(blank=True, editable=False, max_length=64, null=True, unique=True, verbose_name='Hash del contenido'),
+        ),
+        migrations.AlterField(
+            model_name='cargamasiva',
+            name='archivo',
+            field=models.FileField(blank=True, upload_to='cargas/', verbose_name='Archivo'),
+        ),
+        migrations.AlterField(
+            model_name='cargamasiva',
+            name='estado',
+            field=models.CharField(choices=[('recibiendo', 'Recibiendo fragmentos'), ('pendiente', 'Pendiente'), ('procesando', 'Procesando'), ('completada', 'Completada'), ('fallida', 'Fallida')], default='pendiente', max_length=10, verbose_name='Estado'),
+        ),
+        migrations.CreateModel(
+            name='FragmentoCarga',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('indice', models.PositiveIntegerField(verbose_name='Índice')),
+                ('checksum', models.CharField(max_length=64, verbose_name='SHA-256 del fragmento')),
+                ('filas', models.IntegerField(default=0, verbose_name='Filas')),
+                ('recursos_creados', models.IntegerField(default=0, verbose_name='Recursos creados')),
+                ('recursos_omitidos', models.IntegerField(default=0, verbose_name='Recursos omitidos')),
+                ('total_errores', models.IntegerField(default=0, verbose_name='Total de errores')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Fecha de Creación')),
+                ('carga', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='contenido.cargamasiva', verbose_name='Carga')),
+            ],
+            options={
+                'verbose_name': 'Fragmento de carga',
+                'verbose_name_plural': 'Fragmentos de carga',
+                'db_table': 'cargas_fragmentos',
+                'unique_together': {('carga', 'indice')},
+            },
+        ),
+    ]
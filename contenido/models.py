@@ -1,12 +1,20 @@
 import os
 import re
 from unidecode import unidecode
-from django.db import models
+from django.db import models, transaction
+from django.db.models import Count, F, QuerySet
+from django.utils import timezone
 from django.db.models.signals import post_delete, pre_save
 from django.dispatch import receiver
 from biblioteca.modeloBase import BaseModel
 from maestros.models import Categoria, Area
 from usuarios.models import Usuario
+from .cache import invalidar_recurso_cache
+from .busqueda import actualizar_indice_busqueda, eliminar_del_indice_busqueda
+from .autocompletar import indice_titulos
+from .contadores import CONTADORES_VOTO, buffer_contadores, contadores_diferidos, contadores_fragmentados, sumar_a_fragmento
+from .ranking import calcular_tendencias, delta_tendencia, expresion_wilson
+from .estadisticas import registrar_resumen
 
 class Recurso(BaseModel):
     titulo = models.CharField(max_length=400, verbose_name="Titulo")
@@ -18,11 +26,29 @@ class Recurso(BaseModel):
     numero_likes = models.IntegerField(default=0, verbose_name="Numero likes")
     numero_dislikes = models.IntegerField(default=0, verbose_name="Numero dislikes")
     numero_mejora = models.IntegerField(default=0, verbose_name="Numero mejoras")
+    # Puntajes de ranking (ver ranking.py): Wilson lo calcula la base de datos a partir de los
+    # contadores y tendencia se ajusta con deltas junto con ellos
+    puntaje_wilson = models.GeneratedField(expression=expresion_wilson(), output_field=models.FloatField(), db_persist=True)
+    tendencia = models.FloatField(default=0, verbose_name="Tendencia")
+    # Huella del contenido de los recursos creados por carga masiva (ver carga.huella_recurso)
+    hash_contenido = models.CharField(max_length=64, null=True, blank=True, unique=True, editable=False, verbose_name="Hash del contenido")
 
     class Meta:
         verbose_name = "Recurso"
         verbose_name_plural = "Recursos"
         db_table = "recursos"
+        indexes = [
+            models.Index(fields=['created_at', 'id'], name='recursos_created_id_idx'),
+            # Filtros y órdenes del listado (ver filtrar_recursos y RecursoPagination)
+            models.Index(fields=['categoria', 'created_at', 'id'], name='recursos_cat_created_idx'),
+            models.Index(fields=['area', 'validado', 'created_at', 'id'], name='recursos_area_val_created_idx'),
+            models.Index(fields=['validado', 'is_active', 'created_at', 'id'], name='recursos_val_act_created_idx'),
+            models.Index(fields=['numero_likes', 'id'], name='recursos_likes_idx'),
+            models.Index(fields=['numero_dislikes', 'id'], name='recursos_dislikes_idx'),
+            models.Index(fields=['numero_mejora', 'id'], name='recursos_mejora_idx'),
+            models.Index(fields=['puntaje_wilson', 'id'], name='recursos_wilson_idx'),
+            models.Index(fields=['tendencia', 'id'], name='recursos_tendencia_idx'),
+        ]
 
     def __str__(self):
         return self.titulo.title()
@@ -64,38 +90,279 @@ class VotoRecurso(BaseModel):
         verbose_name_plural = "Votos de Recursos"
         db_table = "votos_recursos"
         unique_together = ('usuario', 'recurso')  # Un usuario solo puede votar una vez por recurso
+        indexes = [
+            # Sincronización incremental de MisVotosRecursos (?since=)
+            models.Index(fields=['usuario', 'updated_at'], name='votos_usuario_updated_idx'),
+        ]
     
     def __str__(self):
         return f"{self.usuario.username} - {self.recurso.titulo} - {self.get_tipo_voto_display()}"
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        # Se guarda el tipo de voto leído para calcular los deltas de los contadores al guardar
+        instance = super().from_db(db, field_names, values)
+        instance._tipo_voto_original = instance.__dict__.get('tipo_voto')
+        return instance
+
+class VotoRecursoEliminado(BaseModel):
+    """Marca (lápida) de un voto eliminado, para que la sincronización incremental informe la eliminación.
+
+    No tiene restricción de clave foránea con el recurso para que la marca
+    sobreviva cuando se elimina el recurso.
+    """
+    usuario = models.ForeignKey(Usuario, on_delete=models.CASCADE, verbose_name="Usuario")
+    recurso = models.ForeignKey(Recurso, on_delete=models.DO_NOTHING, db_constraint=False, verbose_name="Recurso")
+
+    class Meta:
+        verbose_name = "Voto de Recurso eliminado"
+        verbose_name_plural = "Votos de Recursos eliminados"
+        db_table = "votos_recursos_eliminados"
+        unique_together = ('usuario', 'recurso')
+        indexes = [
+            models.Index(fields=['usuario', 'updated_at'], name='votos_elim_usuario_updated_idx'),
+        ]
+
+class ContadorFragmentoRecurso(models.Model):
+    """Deltas de contadores de un recurso aún no compactados en Recurso (ver contadores.py)"""
+    recurso = models.ForeignKey(Recurso, on_delete=models.CASCADE, verbose_name="Recurso")
+    fragmento = models.PositiveSmallIntegerField(verbose_name="Fragmento")
+    numero_likes = models.IntegerField(default=0, verbose_name="Numero likes")
+    numero_dislikes = models.IntegerField(default=0, verbose_name="Numero dislikes")
+    numero_mejora = models.IntegerField(default=0, verbose_name="Numero mejoras")
+    tendencia = models.FloatField(default=0, verbose_name="Tendencia")
+    updated_at = models.DateTimeField(auto_now=True, verbose_name="Fecha de Actualización")
+
+    class Meta:
+        verbose_name = "Fragmento de contadores"
+        verbose_name_plural = "Fragmentos de contadores"
+        db_table = "recursos_contadores_fragmentos"
+        unique_together = ('recurso', 'fragmento')
+
+class ResumenVotosRecurso(models.Model):
+    """Cambio neto de los votos de un recurso en una hora o un día (ver estadisticas.py)"""
+    GRANULARIDAD_CHOICES = (
+        ('hora', 'Hora'),
+        ('dia', 'Día'),
+    )
+
+    recurso = models.ForeignKey(Recurso, on_delete=models.CASCADE, verbose_name="Recurso")
+    granularidad = models.CharField(max_length=4, choices=GRANULARIDAD_CHOICES, verbose_name="Granularidad")
+    inicio = models.DateTimeField(verbose_name="Inicio del periodo")
+    likes = models.IntegerField(default=0, verbose_name="Likes")
+    dislikes = models.IntegerField(default=0, verbose_name="Dislikes")
+    mejora = models.IntegerField(default=0, verbose_name="Mejoras")
+
+    class Meta:
+        verbose_name = "Resumen de votos"
+        verbose_name_plural = "Resúmenes de votos"
+        db_table = "votos_recursos_resumen"
+        unique_together = ('recurso', 'granularidad', 'inicio')
+        indexes = [
+            # Reportes por rango sobre todos los recursos
+            models.Index(fields=['granularidad', 'inicio'], name='votos_resumen_periodo_idx'),
+        ]
+
+class CargaMasiva(BaseModel):
+    """Trabajo de carga masiva de recursos desde un archivo, procesado en segundo plano (ver carga.py)"""
+    ESTADO_CHOICES = (
+        ('recibiendo', 'Recibiendo fragmentos'),
+        ('pendiente', 'Pendiente'),
+        ('procesando', 'Procesando'),
+        ('completada', 'Completada'),
+        ('fallida', 'Fallida'),
+    )
+    FORMATO_CHOICES = (
+        ('xlsx', 'Excel'),
+        ('csv', 'CSV'),
+        ('jsonl', 'JSON Lines'),
+    )
+
+    usuario = models.ForeignKey(Usuario, on_delete=models.SET_NULL, null=True, blank=True, verbose_name="Usuario")
+    # Vacío en las cargas por fragmentos, que no guardan el archivo
+    archivo = models.FileField(upload_to='cargas/', blank=True, verbose_name="Archivo")
+    nombre_archivo = models.CharField(max_length=255, verbose_name="Nombre del archivo")
+    formato = models.CharField(max_length=5, choices=FORMATO_CHOICES, default='xlsx', verbose_name="Formato")
+    estado = models.CharField(max_length=10, choices=ESTADO_CHOICES, default='pendiente', verbose_name="Estado")
+    filas_procesadas = models.IntegerField(default=0, verbose_name="Filas procesadas")
+    recursos_creados = models.IntegerField(default=0, verbose_name="Recursos creados")
+    recursos_omitidos = models.IntegerField(default=0, verbose_name="Recursos omitidos por estar ya cargados")
+    total_errores = models.IntegerField(default=0, verbose_name="Total de errores")
+    errores = models.JSONField(default=list, blank=True, verbose_name="Errores")
+    mensaje = models.TextField(blank=True, default='', verbose_name="Mensaje")
+    iniciada_en = models.DateTimeField(null=True, blank=True, verbose_name="Inicio del procesamiento")
+    terminada_en = models.DateTimeField(null=True, blank=True, verbose_name="Fin del procesamiento")
+
+    class Meta:
+        verbose_name = "Carga masiva"
+        verbose_name_plural = "Cargas masivas"
+        db_table = "cargas_masivas"
+        indexes = [
+            # Cola de trabajos pendientes del comando procesar_cargas
+            models.Index(fields=['estado', 'created_at'], name='cargas_estado_created_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.nombre_archivo} - {self.get_estado_display()}"
+
+    @property
+    def filas_por_segundo(self):
+        if self.iniciada_en is None:
+            return None
+        segundos = ((self.terminada_en or timezone.now()) - self.iniciada_en).total_seconds()
+        return round(self.filas_procesadas / segundos, 1) if segundos > 0 else None
+
+class FragmentoCarga(models.Model):
+    """Fragmento confirmado de una carga masiva por fragmentos; permite reanudarla y reenviarlo sin duplicar"""
+    carga = models.ForeignKey(CargaMasiva, on_delete=models.CASCADE, verbose_name="Carga")
+    indice = models.PositiveIntegerField(verbose_name="Índice")
+    checksum = models.CharField(max_length=64, verbose_name="SHA-256 del fragmento")
+    filas = models.IntegerField(default=0, verbose_name="Filas")
+    recursos_creados = models.IntegerField(default=0, verbose_name="Recursos creados")
+    recursos_omitidos = models.IntegerField(default=0, verbose_name="Recursos omitidos")
+    total_errores = models.IntegerField(default=0, verbose_name="Total de errores")
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name="Fecha de Creación")
+
+    class Meta:
+        verbose_name = "Fragmento de carga"
+        verbose_name_plural = "Fragmentos de carga"
+        db_table = "cargas_fragmentos"
+        unique_together = ('carga', 'indice')
+
+def registrar_votos_eliminados(usuario_id, recurso_ids):
+    """Crea o renueva las lápidas de los votos eliminados del usuario en una sola sentencia"""
+    ahora = timezone.now()
+    VotoRecursoEliminado.objects.bulk_create(
+        [
+            VotoRecursoEliminado(usuario_id=usuario_id, recurso_id=recurso_id, created_at=ahora, updated_at=ahora)
+            for recurso_id in recurso_ids
+        ],
+        update_conflicts=True,
+        unique_fields=['usuario', 'recurso'],
+        update_fields=['updated_at'],
+    )
+
 # Señales para actualizar automáticamente los contadores en el modelo Recurso
 from django.db.models.signals import post_save, post_delete
 from django.dispatch import receiver
 
+def ajustar_contadores_recurso(recurso_id, deltas, tendencia=0.0):
+    """Aplica deltas {tipo_voto: n} a los contadores (y el delta de tendencia) del recurso en un solo UPDATE atómico"""
+    if contadores_fragmentados():
+        # No se bloquea la fila del recurso: el delta va a un fragmento y se compacta después
+        sumar_a_fragmento(recurso_id, deltas, tendencia)
+        return
+    if contadores_diferidos():
+        # El voto ya está escrito; el delta se aplica en el próximo flush del buffer
+        transaction.on_commit(lambda: buffer_contadores.agregar(recurso_id, deltas, tendencia))
+        return
+    cambios = {
+        CONTADORES_VOTO[tipo]: F(CONTADORES_VOTO[tipo]) + delta
+        for tipo, delta in deltas.items() if delta
+    }
+    if tendencia:
+        cambios['tendencia'] = F('tendencia') + tendencia
+    if not cambios:
+        return
+    # updated_at también se actualiza para que la cache y los validadores HTTP vean el cambio
+    if not Recurso.objects.filter(pk=recurso_id).update(updated_at=timezone.now(), **cambios):
+        # El recurso ya no existe: su resumen fallaría por la FK
+        return
+    registrar_resumen({recurso_id: deltas})
+    invalidar_recurso_cache(recurso_id)
+
+def recontar_contadores_recurso(recurso_id):
+    """Recalcula los contadores y la tendencia de un recurso desde sus votos"""
+    votos = VotoRecurso.objects.filter(recurso_id=recurso_id)
+    conteos = dict(votos.values_list('tipo_voto').annotate(total=Count('id')))
+    # Los fragmentos sin compactar quedan incluidos en el recálculo
+    ContadorFragmentoRecurso.objects.filter(recurso_id=recurso_id).delete()
+    Recurso.objects.filter(pk=recurso_id).update(
+        updated_at=timezone.now(),
+        tendencia=calcular_tendencias(votos).get(recurso_id, 0.0),
+        **{campo: conteos.get(tipo, 0) for tipo, campo in CONTADORES_VOTO.items()}
+    )
+    invalidar_recurso_cache(recurso_id)
+
 @receiver(post_save, sender=VotoRecurso)
 def actualizar_contadores_voto_guardado(sender, instance, created, **kwargs):
-    """Actualiza los contadores cuando se guarda un voto"""
-    recurso = instance.recurso
-    
-    # Recalcular todos los contadores
-    votos = VotoRecurso.objects.filter(recurso=recurso)
-    
-    recurso.numero_likes = votos.filter(tipo_voto='like').count()
-    recurso.numero_dislikes = votos.filter(tipo_voto='dislike').count()
-    recurso.numero_mejora = votos.filter(tipo_voto='mejora').count()
-    
-    recurso.save(update_fields=['numero_likes', 'numero_dislikes', 'numero_mejora'])
+    """Actualiza los contadores cuando se guarda un voto, según el tipo anterior y el nuevo"""
+    anterior = getattr(instance, '_tipo_voto_original', None)
+    if created:
+        ajustar_contadores_recurso(
+            instance.recurso_id, {instance.tipo_voto: 1}, delta_tendencia(None, instance.tipo_voto, instance.created_at)
+        )
+    elif anterior is None:
+        # El voto no se cargó de la base de datos, así que no se conoce el tipo anterior
+        recontar_contadores_recurso(instance.recurso_id)
+    elif anterior != instance.tipo_voto:
+        ajustar_contadores_recurso(
+            instance.recurso_id,
+            {anterior: -1, instance.tipo_voto: 1},
+            delta_tendencia(anterior, instance.tipo_voto, instance.created_at)
+        )
+    instance._tipo_voto_original = instance.tipo_voto
+
+def _eliminando_recursos(origin):
+    """Si la eliminación en cascada viene de un recurso (instancia o queryset)"""
+    return isinstance(origin, Recurso) or (isinstance(origin, QuerySet) and origin.model is Recurso)
 
 @receiver(post_delete, sender=VotoRecurso)
-def actualizar_contadores_voto_eliminado(sender, instance, **kwargs):
+def actualizar_contadores_voto_eliminado(sender, instance, origin=None, **kwargs):
     """Actualiza los contadores cuando se elimina un voto"""
-    recurso = instance.recurso
-    
-    # Recalcular todos los contadores
-    votos = VotoRecurso.objects.filter(recurso=recurso)
-    
-    recurso.numero_likes = votos.filter(tipo_voto='like').count()
-    recurso.numero_dislikes = votos.filter(tipo_voto='dislike').count()
-    recurso.numero_mejora = votos.filter(tipo_voto='mejora').count()
-    
-    recurso.save(update_fields=['numero_likes', 'numero_dislikes', 'numero_mejora'])
\ No newline at end of file
+    tipo = getattr(instance, '_tipo_voto_original', None) or instance.tipo_voto
+    # Si se está eliminando el recurso no hay contadores que ajustar (y su resumen fallaría por la FK)
+    if not _eliminando_recursos(origin):
+        ajustar_contadores_recurso(instance.recurso_id, {tipo: -1}, delta_tendencia(tipo, None, instance.created_at))
+    # Si se está eliminando el usuario, sus lápidas no tienen a quién informarse (y su FK fallaría)
+    if not isinstance(origin, Usuario):
+        registrar_votos_eliminados(instance.usuario_id, [instance.recurso_id])
+
+# Señales para invalidar la cache del recurso serializado
+@receiver(post_save, sender=Recurso)
+@receiver(post_delete, sender=Recurso)
+def invalidar_cache_recurso(sender, instance, **kwargs):
+    """Invalida la cache cuando cambia o se elimina un recurso"""
+    invalidar_recurso_cache(instance.pk)
+
+@receiver(post_save, sender=Contenido)
+@receiver(post_delete, sender=Contenido)
+def invalidar_cache_recurso_contenido(sender, instance, **kwargs):
+    """Invalida la cache del recurso y actualiza su updated_at cuando cambia uno de sus contenidos"""
+    Recurso.objects.filter(pk=instance.recurso_id).update(updated_at=timezone.now())
+    invalidar_recurso_cache(instance.recurso_id)
+
+# Señales para mantener el índice de búsqueda de texto completo
+CAMPOS_INDEXADOS = {'titulo', 'subtitulo', 'descripcion'}
+
+@receiver(post_save, sender=Recurso)
+def indexar_recurso(sender, instance, update_fields=None, **kwargs):
+    """Reindexa el recurso salvo que solo hayan cambiado campos no indexados (p. ej. contadores)"""
+    if update_fields is not None and not CAMPOS_INDEXADOS & set(update_fields):
+        return
+    actualizar_indice_busqueda([instance.pk])
+
+@receiver(post_delete, sender=Recurso)
+def desindexar_recurso(sender, instance, **kwargs):
+    eliminar_del_indice_busqueda(instance.pk)
+
+@receiver(post_save, sender=Contenido)
+@receiver(post_delete, sender=Contenido)
+def indexar_recurso_contenido(sender, instance, **kwargs):
+    """Reindexa el recurso cuando cambia cualquiera de sus contenidos.
+
+    No se filtra por tipo: un contenido que pasa de texto a otro tipo debe salir del índice.
+    """
+    actualizar_indice_busqueda([instance.recurso_id])
+
+# Señales para mantener el índice en memoria de autocompletado de títulos
+@receiver(post_save, sender=Recurso)
+def autocompletar_recurso(sender, instance, update_fields=None, **kwargs):
+    if update_fields is not None and 'titulo' not in update_fields:
+        return
+    transaction.on_commit(lambda: indice_titulos.agregar(instance.pk, instance.titulo))
+
+@receiver(post_delete, sender=Recurso)
+def autocompletar_eliminar_recurso(sender, instance, **kwargs):
+    pk = instance.pk
+    transaction.on_commit(lambda: indice_titulos.eliminar(pk))
@@ -0,0 +1,104 @@
+import math
+from collections import defaultdict
+from datetime import datetime, timezone as dt_timezone
+from django.conf import settings
+from django.db.models import Case, FloatField, Q, Value, When
+from django.db.models.functions import Cast, Sqrt
+from django.utils import timezone
+
+# Puntajes de los listados de ranking (ver RecursoRanking).
+#
+# "Mejor valorados" usa el límite inferior del intervalo de Wilson (95 %) de la
+# proporción de likes sobre likes + dislikes, de modo que 3 likes sin dislikes
+# no superan a 300 likes con 10 dislikes. Es una columna generada de Recurso:
+# la base de datos la recalcula en cualquier escritura de los contadores.
+#
+# "En tendencia" suma por cada voto un peso según su tipo que decae a la mitad
+# cada RANKING_VIDA_MEDIA_HORAS. Para no reescribir todos los recursos a medida
+# que pasa el tiempo, cada voto aporta peso * exp((creado - EPOCA_TENDENCIA) / tau);
+# el factor común exp(-(ahora - EPOCA_TENDENCIA) / tau) no altera el orden, así
+# que la columna tendencia solo se ajusta con deltas al votar y su índice sirve
+# el orden. Con la vida media por defecto los valores se acercan al límite de un
+# float hacia 2033: antes hay que adelantar EPOCA_TENDENCIA y ejecutar
+# recalcular_tendencias.
+
+Z = 1.96
+EPOCA_TENDENCIA = datetime(2025, 1, 1, tzinfo=dt_timezone.utc)
+PESOS_TENDENCIA = {
+    'like': 1.0,
+    'dislike': -1.0,
+    'mejora': 0.0,
+}
+
+
+def expresion_wilson():
+    likes = Cast('numero_likes', FloatField())
+    dislikes = Cast('numero_dislikes', FloatField())
+    total = likes + dislikes
+    return Case(
+        When(Q(numero_likes__lte=0) | Q(numero_dislikes__lt=0), then=Value(0.0)),
+        default=(likes + Z * Z / 2 - Z * Sqrt(likes * dislikes / total + Z * Z / 4)) / (total + Z * Z),
+        output_field=FloatField(),
+    )
+
+
+def _tau():
+    return getattr(settings, 'RANKING_VIDA_MEDIA_HORAS', 72) * 3600 / math.log(2)
+
+
+def peso_tendencia(tipo_voto, creado):
+    """Aporte de un voto a la columna tendencia"""
+    peso = PESOS_TENDENCIA.get(tipo_voto, 0.0)
+    if not peso:
+        return 0.0
+    return peso * math.exp((creado - EPOCA_TENDENCIA).total_seconds() / _tau())
+
+
+def delta_tendencia(anterior, nuevo, creado):
+    """Cambio de tendencia cuando un voto creado en 'creado' pasa de anterior a nuevo (None = sin voto)"""
+    return peso_tendencia(nuevo, creado) - peso_tendencia(anterior, creado)
+
+
+def tendencia_actual(valor, ahora=None):
+    """Convierte el valor almacenado en votos ponderados a la fecha (comparable entre consultas)"""
+    ahora = ahora or timezone.now()
+    return valor * math.exp(-(ahora - EPOCA_TENDENCIA).total_seconds() / _tau())
+
+
+def sql_peso_tendencia(tipo, creado):
+    """peso_tendencia en SQL (PostgreSQL); requiere los parámetros de parametros_tendencia()"""
+    casos = ' '.join(f"WHEN '{tipo_voto}' THEN {peso}" for tipo_voto, peso in PESOS_TENDENCIA.items() if peso)
+    return (
+        f"(CASE {tipo} {casos} ELSE 0 END)"
+        f" * EXP(EXTRACT(EPOCH FROM ({creado} - %(epoca_tendencia)s))::float8 / %(tau_tendencia)s)"
+    )
+
+
+def parametros_tendencia():
+    return {'epoca_tendencia': EPOCA_TENDENCIA, 'tau_tendencia': _tau()}
+
+
+def calcular_tendencias(votos):
+    """Tendencia por recurso a partir de un queryset de votos, leído por bloques"""
+    tendencias = defaultdict(float)
+    filas = votos.order_by().values_list('recurso_id', 'tipo_voto', 'created_at').iterator(chunk_size=5000)
+    for recurso_id, tipo_voto, creado in filas:
+        tendencias[recurso_id] += peso_tendencia(tipo_voto, creado)
+    return tendencias
+
+
+def recalcular_tendencias(batch_size=1000):
+    """Recalcula la columna tendencia de todos los recursos desde sus votos; devuelve los recursos revisados"""
+    from .models import Recurso, VotoRecurso
+
+    tendencias = calcular_tendencias(VotoRecurso.objects.all())
+    revisados = 0
+    bloque = []
+    for recurso_id in Recurso.objects.values_list('id', flat=True).iterator(chunk_size=batch_size):
+        revisados += 1
+        bloque.append(Recurso(pk=recurso_id, tendencia=tendencias.get(recurso_id, 0.0)))
+        if len(bloque) >= batch_size:
+            Recurso.objects.bulk_update(bloque, ['tendencia'])
+            bloque = []
+    Recurso.objects.bulk_update(bloque, ['tendencia'])
+    return revisados
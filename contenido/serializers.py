@@ -1,5 +1,5 @@
 from rest_framework import serializers
-from .models import Contenido, Recurso
+from .models import CargaMasiva, Contenido, FragmentoCarga, Recurso
 
 class ContenidoSerializer(serializers.ModelSerializer):
     class Meta:
@@ -17,6 +17,7 @@ class ContenidoSerializer(serializers.ModelSerializer):
 class RecursoSerializer(serializers.ModelSerializer):
     # Definimos el campo contenido como una relación anidada que puede ser escrita
     categoria_nombre = serializers.CharField(source='categoria.nombre', read_only=True)
+    area_nombre = serializers.CharField(source='area.nombre', read_only=True)
     contenido = ContenidoSerializer(many=True, read_only=False, required=False)
     
     class Meta:
@@ -28,6 +29,7 @@ class RecursoSerializer(serializers.ModelSerializer):
             'categoria',
             'categoria_nombre',
             'area',
+            'area_nombre',
             'descripcion',
             'validado',
             'numero_likes',
@@ -37,6 +39,14 @@ class RecursoSerializer(serializers.ModelSerializer):
             'updated_at',
             'contenido',  # Importante: incluir el campo contenido aquí
         ]
+
+    def __init__(self, *args, **kwargs):
+        # Permite limitar los campos serializados (sparse fieldsets): RecursoSerializer(..., fields=[...])
+        fields = kwargs.pop('fields', None)
+        super().__init__(*args, **kwargs)
+        if fields is not None:
+            for field_name in set(self.fields) - set(fields):
+                self.fields.pop(field_name)
     
     def create(self, validated_data):
         # Extraer los datos de contenido antes de crear el recurso
@@ -79,11 +89,75 @@ class RecursoSerializer(serializers.ModelSerializer):
         # Obtener la representación estándar del recurso
         representation = super().to_representation(instance)
         
-        # Obtener los contenidos del recurso
-        contenidos = Contenido.objects.filter(recurso=instance).order_by('posicion')
+        # Si no se pidió el contenido no se consulta
+        if 'contenido' not in self.fields:
+            return representation
+        
+        # Usar los contenidos precargados por la vista si existen; si no, consultarlos
+        contenidos = getattr(instance, 'contenidos_ordenados', None)
+        if contenidos is None:
+            contenidos = Contenido.objects.filter(recurso=instance).order_by('posicion')
         
         # Serializar los contenidos
         contenido_serializer = ContenidoSerializer(contenidos, many=True)
         representation['contenido'] = contenido_serializer.data
         
-        return representation
\ No newline at end of file
+        return representation
+
+
+class RecursoConVotoSerializer(RecursoSerializer):
+    # Tipo de voto del usuario, anotado en la consulta por la vista (ver RecursoListConVotos)
+    voto_usuario = serializers.CharField(read_only=True, allow_null=True, default=None)
+
+    class Meta(RecursoSerializer.Meta):
+        fields = RecursoSerializer.Meta.fields + ['voto_usuario']
+
+
+class RecursoCargaSerializer(RecursoSerializer):
+    # En la creación por lote categoria y area se reciben como ids y CargaRecursos
+    # comprueba que existan con una consulta por bloque
+    categoria = serializers.IntegerField(required=False, allow_null=True)
+    area = serializers.IntegerField(required=False, allow_null=True)
+
+
+class CargaMasivaSerializer(serializers.ModelSerializer):
+    filas_por_segundo = serializers.ReadOnlyField()
+    # Índices confirmados de una carga por fragmentos, para reanudarla
+    fragmentos = serializers.SerializerMethodField()
+
+    class Meta:
+        model = CargaMasiva
+        fields = [
+            'id',
+            'nombre_archivo',
+            'formato',
+            'estado',
+            'filas_procesadas',
+            'recursos_creados',
+            'recursos_omitidos',
+            'total_errores',
+            'errores',
+            'mensaje',
+            'filas_por_segundo',
+            'fragmentos',
+            'created_at',
+            'iniciada_en',
+            'terminada_en',
+        ]
+
+    def get_fragmentos(self, obj):
+        return list(obj.fragmentocarga_set.order_by('indice').values_list('indice', flat=True))
+
+
+class FragmentoCargaSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = FragmentoCarga
+        fields = [
+            'indice',
+            'checksum',
+            'filas',
+            'recursos_creados',
+            'recursos_omitidos',
+            'total_errores',
+            'created_at',
+        ]
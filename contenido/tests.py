@@ -1,3 +1,1401 @@
-from django.test import TestCase
+import csv
+import hashlib
+import io
+import json
+import shutil
+import tempfile
+import time
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from datetime import timedelta
+from unittest import skipUnless
+from types import SimpleNamespace
+from unittest.mock import patch
+from urllib.parse import parse_qs, urlparse
+from openpyxl import Workbook, load_workbook
+from django.conf import settings
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import DataError, connection
+from django.test.utils import CaptureQueriesContext
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from rest_framework.exceptions import NotFound
+from rest_framework.request import Request
+from rest_framework.test import APIClient, APIRequestFactory
+from biblioteca.paginacion import KeysetPagination
+from usuarios.models import Usuario
+from maestros.models import Categoria, Area
+from .models import Recurso, Contenido, VotoRecurso, ContadorFragmentoRecurso, ResumenVotosRecurso, CargaMasiva, VotoRecursoEliminado
+from .autocompletar import indice_titulos
+from .views import RecursoCreate, RecursoExportar
+from .exportacion import COLUMNAS_CARGA
+from .carga import CargaRecursos, agrupar_por_titulo, filas_validadas
+from .votos import registrar_voto, reconciliar_contadores
+from .ranking import calcular_tendencias
+from .contadores import _ttl_pendientes, buffer_contadores, compactar_fragmentos, sumar_a_fragmento, verificar_cache_contadores
 
-# Create your tests here.
+
+class RecursoListQueriesTest(TestCase):
+    """El número de consultas del listado no debe crecer con el número de recursos.
+
+    Cada GET hace una consulta de agregados para el ETag, la de recursos y la
+    de contenidos precargados.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.usuario = Usuario.objects.create_user(correo='lector@biblioteca.co', password='clave', nombre_completo='Lector')
+        cls.categoria = Categoria.objects.create(nombre='Programación', descripcion='Categoria')
+        cls.area = Area.objects.create(nombre='Sistemas', descripcion='Area')
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.client.force_authenticate(self.usuario)
+
+    def crear_recursos(self, cantidad):
+        for i in range(cantidad):
+            recurso = Recurso.objects.create(
+                titulo=f'Recurso {Recurso.objects.count()}',
+                descripcion='Descripcion',
+                categoria=self.categoria,
+                area=self.area
+            )
+            for posicion in (2, 1, 3):
+                Contenido.objects.create(recurso=recurso, tipo_contenido='text', contenido_bloque='Bloque', posicion=posicion)
+
+    def test_listado_con_consultas_constantes(self):
+        self.crear_recursos(3)
+        with self.assertNumQueries(3):
+            response = self.client.get('/api/recursos/')
+        self.assertEqual(len(response.data['results']), 3)
+
+        self.crear_recursos(10)
+        with self.assertNumQueries(3):
+            response = self.client.get('/api/recursos/')
+        self.assertEqual(len(response.data['results']), 13)
+
+    def test_listado_sin_paginar_con_consultas_constantes(self):
+        self.crear_recursos(25)
+        with self.assertNumQueries(3):
+            response = self.client.get('/api/recursos/?paginar=false')
+        self.assertEqual(len(response.data), 25)
+
+    def test_listado_con_votos_sin_consulta_de_votos_aparte(self):
+        self.crear_recursos(4)
+        votado = Recurso.objects.order_by('created_at', 'id')[1]
+        VotoRecurso.objects.create(usuario=self.usuario, recurso=votado, tipo_voto='mejora')
+        with self.assertNumQueries(3):
+            response = self.client.get('/api/recursos-con-votos/')
+        votos = {r['id']: r['voto_usuario'] for r in response.data['results']}
+        self.assertEqual(votos.pop(votado.pk), 'mejora')
+        self.assertEqual(set(votos.values()), {None})
+
+        response = self.client.get('/api/recursos-con-votos/?view=summary')
+        self.assertEqual(response.data['results'][1]['voto_usuario'], 'mejora')
+
+    def test_contenidos_ordenados_por_posicion(self):
+        self.crear_recursos(1)
+        response = self.client.get('/api/recursos/')
+        posiciones = [c['posicion'] for c in response.data['results'][0]['contenido']]
+        self.assertEqual(posiciones, [1, 2, 3])
+        self.assertEqual(response.data['results'][0]['categoria_nombre'], 'Programación')
+
+    def test_resumen_sin_contenido_en_una_consulta(self):
+        self.crear_recursos(5)
+        with self.assertNumQueries(2):
+            response = self.client.get('/api/recursos/?view=summary')
+        recurso = response.data['results'][0]
+        self.assertNotIn('contenido', recurso)
+        self.assertNotIn('descripcion', recurso)
+        self.assertEqual(recurso['area_nombre'], 'Sistemas')
+
+    def test_fields_limita_los_campos(self):
+        self.crear_recursos(2)
+        response = self.client.get('/api/recursos/?fields=titulo,numero_likes,inexistente')
+        self.assertEqual(set(response.data['results'][0]), {'id', 'titulo', 'numero_likes'})
+
+
+class RecursoCacheTest(TestCase):
+    """El detalle del recurso se sirve desde cache y se invalida al cambiar"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.usuario = Usuario.objects.create_user(correo='lector@biblioteca.co', password='clave', nombre_completo='Lector')
+        cls.otro_usuario = Usuario.objects.create_user(correo='otro@biblioteca.co', password='clave', nombre_completo='Otro')
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.client.force_authenticate(self.usuario)
+        self.recurso = Recurso.objects.create(titulo='Recurso', descripcion='Descripcion')
+        self.contenido = Contenido.objects.create(recurso=self.recurso, tipo_contenido='text', contenido_bloque='Original', posicion=1)
+
+    def test_detalle_desde_cache(self):
+        url = f'/api/recursos/{self.recurso.pk}/'
+        self.client.get(url)
+        with self.assertNumQueries(2):
+            response = self.client.get(url)
+        self.assertEqual(response.data['contenido'][0]['contenido_bloque'], 'Original')
+
+    def test_invalidacion_por_contenido_y_votos(self):
+        url = f'/api/recursos/{self.recurso.pk}/'
+        self.client.get(url)
+
+        self.contenido.contenido_bloque = 'Editado'
+        self.contenido.save()
+        self.assertEqual(self.client.get(url).data['contenido'][0]['contenido_bloque'], 'Editado')
+
+        VotoRecurso.objects.create(usuario=self.otro_usuario, recurso=self.recurso, tipo_voto='like')
+        self.assertEqual(self.client.get(url).data['numero_likes'], 1)
+
+    def test_invalidacion_por_categoria(self):
+        categoria = Categoria.objects.create(nombre='Vieja', descripcion='Categoria')
+        self.recurso.categoria = categoria
+        self.recurso.save()
+        url = f'/api/recursos/{self.recurso.pk}/'
+        self.assertEqual(self.client.get(url).data['categoria_nombre'], 'Vieja')
+
+        categoria.nombre = 'Nueva'
+        categoria.save()
+        self.assertEqual(self.client.get(url).data['categoria_nombre'], 'Nueva')
+
+    def test_voto_usuario_no_se_comparte(self):
+        VotoRecurso.objects.create(usuario=self.otro_usuario, recurso=self.recurso, tipo_voto='like')
+        url = f'/api/recursos-con-votos/{self.recurso.pk}/'
+
+        otro_cliente = APIClient()
+        otro_cliente.force_authenticate(self.otro_usuario)
+        self.assertEqual(otro_cliente.get(url).data['voto_usuario'], 'like')
+        self.assertIsNone(self.client.get(url).data['voto_usuario'])
+
+
+class RecursoGetCondicionalTest(TestCase):
+    """Los endpoints de recursos responden 304 cuando el cliente tiene la versión actual"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.usuario = Usuario.objects.create_user(correo='lector@biblioteca.co', password='clave', nombre_completo='Lector')
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.client.force_authenticate(self.usuario)
+        self.recurso = Recurso.objects.create(titulo='Recurso', descripcion='Descripcion')
+
+    def test_listado_304_con_etag(self):
+        response = self.client.get('/api/recursos/')
+        etag = response['ETag']
+        self.assertIn('Last-Modified', response)
+
+        with self.assertNumQueries(1):
+            response = self.client.get('/api/recursos/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+        Contenido.objects.create(recurso=self.recurso, tipo_contenido='text', contenido_bloque='Nuevo', posicion=1)
+        response = self.client.get('/api/recursos/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_detalle_304_con_if_modified_since(self):
+        url = f'/api/recursos/{self.recurso.pk}/'
+        response = self.client.get(url)
+        response = self.client.get(url, HTTP_IF_MODIFIED_SINCE=response['Last-Modified'])
+        self.assertEqual(response.status_code, 304)
+
+    def test_detalle_inexistente(self):
+        response = self.client.get('/api/recursos/999999/')
+        self.assertEqual(response.status_code, 404)
+
+
+class RecursoBusquedaTest(TestCase):
+    """La búsqueda usa el índice de texto completo mantenido por las señales"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.usuario = Usuario.objects.create_user(correo='lector@biblioteca.co', password='clave', nombre_completo='Lector')
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.usuario)
+        self.python = Recurso.objects.create(titulo='Introducción a Python', descripcion='Lenguaje de programación')
+        self.django = Recurso.objects.create(titulo='Django', descripcion='Framework web')
+        Contenido.objects.create(recurso=self.django, tipo_contenido='code', contenido_bloque='import python_module', posicion=1)
+        Contenido.objects.create(recurso=self.django, tipo_contenido='text', contenido_bloque='Modelos y migraciones', posicion=2)
+
+    def buscar(self, texto):
+        response = self.client.get('/api/recursos/buscar/', {'q': texto})
+        self.assertEqual(response.status_code, 200)
+        return [recurso['id'] for recurso in response.data]
+
+    def test_busca_en_recurso_y_contenido(self):
+        self.assertEqual(self.buscar('introduccion'), [self.python.pk])
+        self.assertEqual(self.buscar('migraciones'), [self.django.pk])
+
+    def test_indice_se_actualiza(self):
+        self.python.titulo = 'Aprende Rust'
+        self.python.save()
+        self.assertEqual(self.buscar('introduccion'), [])
+        self.assertEqual(self.buscar('rust'), [self.python.pk])
+
+        self.django.delete()
+        self.assertEqual(self.buscar('migraciones'), [])
+
+    def test_contenido_cambia_de_tipo(self):
+        contenido = Contenido.objects.get(recurso=self.django, tipo_contenido='text')
+        contenido.tipo_contenido = 'image'
+        contenido.save()
+        self.assertEqual(self.buscar('migraciones'), [])
+
+        contenido.tipo_contenido = 'text'
+        contenido.save()
+        self.assertEqual(self.buscar('migraciones'), [self.django.pk])
+
+    def test_q_obligatorio(self):
+        response = self.client.get('/api/recursos/buscar/')
+        self.assertEqual(response.status_code, 400)
+
+
+class RecursoAutocompletarTest(TestCase):
+    """El autocompletado usa el índice en memoria y se actualiza con las señales"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.usuario = Usuario.objects.create_user(correo='lector@biblioteca.co', password='clave', nombre_completo='Lector')
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.usuario)
+        self.recurso = Recurso.objects.create(titulo='Introducción a Python', descripcion='Descripcion')
+        indice_titulos.cargar()
+
+    def sugerir(self, texto, **params):
+        response = self.client.get('/api/recursos/autocompletar/', {'q': texto, **params})
+        return [sugerencia['titulo'] for sugerencia in response.data]
+
+    def test_prefijo_de_titulo_y_de_palabra(self):
+        self.assertEqual(self.sugerir('intro'), ['Introducción a Python'])
+        self.assertEqual(self.sugerir('PYT'), ['Introducción a Python'])
+        self.assertEqual(self.sugerir('java'), [])
+
+    def test_coincidencia_aproximada(self):
+        self.assertEqual(self.sugerir('pyhton'), [])
+        self.assertEqual(self.sugerir('pyhton', fuzzy='true'), ['Introducción a Python'])
+
+    def test_actualizacion_por_senales(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            Recurso.objects.create(titulo='Django avanzado', descripcion='Descripcion')
+        self.assertEqual(self.sugerir('djan'), ['Django avanzado'])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.recurso.delete()
+        self.assertEqual(self.sugerir('intro'), [])
+
+    def test_reconstruccion_en_segundo_plano(self):
+        indice_titulos._cargado_en -= settings.AUTOCOMPLETAR_TTL + 1
+        # El índice vencido sigue respondiendo sin consultas mientras un hilo lo reconstruye
+        with patch('contenido.autocompletar.threading.Thread') as hilo, self.assertNumQueries(0):
+            self.assertEqual([titulo for _, titulo in indice_titulos.sugerir('intro')], ['Introducción a Python'])
+            indice_titulos.sugerir('intro')
+        hilo.assert_called_once()
+        hilo.return_value.start.assert_called_once_with()
+        indice_titulos._hilo = None
+
+    def test_cambios_durante_la_reconstruccion(self):
+        construir = indice_titulos._construir
+
+        def construir_con_cambios():
+            resultado = construir()
+            # Señales recibidas mientras se leía la tabla
+            indice_titulos.agregar(self.recurso.pk + 1000, 'Django avanzado')
+            indice_titulos.eliminar(self.recurso.pk)
+            return resultado
+
+        with patch.object(indice_titulos, '_construir', side_effect=construir_con_cambios):
+            indice_titulos.cargar()
+        self.assertEqual(self.sugerir('djan'), ['Django avanzado'])
+        self.assertEqual(self.sugerir('intro'), [])
+        indice_titulos.cargar()
+
+
+class KeysetPaginationTest(TestCase):
+    """El cursor guarda (valor, id) del borde de la página: sin huecos ni repetidos con empates y en ambos sentidos"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.recursos = [Recurso.objects.create(titulo=f'Recurso {i}', descripcion='Descripcion') for i in range(7)]
+        # El orden por created_at es el inverso al de los ids
+        base = timezone.now()
+        for i, recurso in enumerate(cls.recursos):
+            Recurso.objects.filter(pk=recurso.pk).update(created_at=base - timedelta(minutes=i))
+
+    def pagina(self, url):
+        paginador = KeysetPagination()
+        resultados = paginador.paginate_queryset(Recurso.objects.all(), Request(APIRequestFactory().get(url)))
+        return [recurso.pk for recurso in resultados], paginador.get_next_link(), paginador.get_previous_link()
+
+    def recorrer(self, url):
+        paginas = []
+        while url:
+            pks, url, _ = self.pagina(url)
+            paginas.append(pks)
+        return paginas
+
+    def test_cursor_ida_y_vuelta(self):
+        paginador = KeysetPagination()
+        paginador.base_url = 'http://testserver/recursos/?page_size=3'
+        paginador.orden = '-created_at'
+        creado = Recurso.objects.get(pk=self.recursos[0].pk).created_at
+        enlace = paginador.encode_cursor((creado.isoformat(), self.recursos[0].pk), True)
+        self.assertIn('page_size=3', enlace)
+        campo = Recurso._meta.get_field('created_at')
+        decodificado = paginador.decode_cursor(Request(APIRequestFactory().get(enlace)), '-created_at', campo)
+        self.assertEqual(decodificado, ((creado, self.recursos[0].pk), True))
+
+        with self.assertRaises(NotFound):
+            paginador.decode_cursor(Request(APIRequestFactory().get('/recursos/?cursor=no-es-un-cursor')), 'created_at', campo)
+
+        paginas = self.recorrer('/recursos/?page_size=3')
+        self.assertEqual(paginas, [[r.pk for r in self.recursos[::-1][i:i + 3]] for i in (0, 3, 6)])
+
+    def test_cursor_manipulado(self):
+        def cursor(**data):
+            datos = {'o': 'created_at', 'v': (timezone.now() - timedelta(days=1)).isoformat(), 'id': 1, 'r': 0, **data}
+            return urlsafe_b64encode(json.dumps(datos).encode()).decode()
+
+        self.assertEqual(len(self.pagina(f'/recursos/?cursor={cursor()}')[0]), 7)
+        for url in (
+            f'/recursos/?cursor={cursor(v="garbage")}',
+            f'/recursos/?cursor={cursor(v=[1])}',
+            f'/recursos/?cursor={cursor(v=None)}',
+            f'/recursos/?cursor={cursor(id=[1])}',
+            # Un cursor de un orden no sirve para otro
+            f'/recursos/?cursor={cursor()}&ordering=-created_at',
+            f'/recursos/?cursor={urlsafe_b64encode(b"[1]").decode()}',
+        ):
+            with self.assertRaises(NotFound):
+                self.pagina(url)
+
+    def test_empates_se_resuelven_por_id(self):
+        Recurso.objects.update(created_at=timezone.now())
+        for ordering in ('created_at', '-created_at'):
+            paginas = self.recorrer(f'/recursos/?page_size=2&ordering={ordering}')
+            pks = [pk for pagina in paginas for pk in pagina]
+            esperados = sorted(r.pk for r in self.recursos)
+            self.assertEqual(pks, esperados if ordering == 'created_at' else esperados[::-1])
+            self.assertEqual([len(pagina) for pagina in paginas], [2, 2, 2, 1])
+
+    def test_cursor_hacia_atras(self):
+        adelante = []
+        url = '/recursos/?page_size=3&ordering=-created_at'
+        while url:
+            pks, url_siguiente, anterior = self.pagina(url)
+            adelante.append((pks, anterior))
+            url = url_siguiente
+        self.assertIsNone(adelante[0][1])
+
+        # Desde la última página los enlaces previous recorren las mismas páginas en orden inverso
+        atras = []
+        url = adelante[-1][1]
+        while url:
+            pks, siguiente, url = self.pagina(url)
+            atras.append(pks)
+            self.assertIsNotNone(siguiente)
+        self.assertEqual(atras, [pks for pks, _ in adelante[-2::-1]])
+
+
+class RecursoFiltrosTest(TestCase):
+    """Filtros y orden por contadores del listado paginado"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.usuario = Usuario.objects.create_user(correo='lector@biblioteca.co', password='clave', nombre_completo='Lector')
+        cls.area = Area.objects.create(nombre='Sistemas', descripcion='Area')
+        cls.otra_area = Area.objects.create(nombre='Matemáticas', descripcion='Area')
+        for i in range(12):
+            Recurso.objects.create(
+                titulo=f'Recurso {i}',
+                descripcion='Descripcion',
+                area=cls.area if i % 2 else cls.otra_area,
+                validado=i % 3 == 0,
+                numero_likes=i % 4
+            )
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.client.force_authenticate(self.usuario)
+
+    def recorrer(self, url):
+        """Recorre todas las páginas siguiendo los enlaces next"""
+        resultados = []
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            resultados += response.data['results']
+            url = response.data['next']
+        return resultados
+
+    def test_filtros(self):
+        resultados = self.recorrer(f'/api/recursos/?area={self.area.pk}&validado=true')
+        esperados = Recurso.objects.filter(area=self.area, validado=True)
+        self.assertEqual({r['id'] for r in resultados}, {r.pk for r in esperados})
+
+    def test_filtro_invalido(self):
+        self.assertEqual(self.client.get('/api/recursos/?validado=tal-vez').status_code, 400)
+        self.assertEqual(self.client.get('/api/recursos-con-votos/?ordering=titulo').status_code, 400)
+
+    def test_orden_por_likes_con_empates(self):
+        resultados = self.recorrer('/api/recursos/?ordering=-numero_likes&page_size=5')
+        self.assertEqual(len(resultados), 12)
+        self.assertEqual(len({r['id'] for r in resultados}), 12)
+        claves = [(-r['numero_likes'], -r['id']) for r in resultados]
+        self.assertEqual(claves, sorted(claves))
+
+    def test_cursor_de_otro_orden(self):
+        primera = self.client.get('/api/recursos/?page_size=5').data
+        self.assertEqual(self.client.get(primera['next'] + '&ordering=-numero_likes').status_code, 404)
+
+        siguiente = self.client.get('/api/recursos/?ordering=-numero_likes&page_size=5').data['next']
+        self.assertEqual(self.client.get(siguiente).status_code, 200)
+        cursor = parse_qs(urlparse(siguiente).query)['cursor'][0]
+        datos = json.loads(urlsafe_b64decode(cursor))
+        for valor in ('garbage', [1], {'x': 1}):
+            manipulado = urlsafe_b64encode(json.dumps({**datos, 'v': valor}).encode()).decode()
+            respuesta = self.client.get(f'/api/recursos-con-votos/?ordering=-numero_likes&cursor={manipulado}')
+            self.assertEqual(respuesta.status_code, 404)
+
+        resultados = self.recorrer('/api/recursos/?ordering=-puntaje_wilson&page_size=5')
+        self.assertEqual(len({r['id'] for r in resultados}), 12)
+
+    def test_pagina_anterior(self):
+        primera = self.client.get('/api/recursos/?page_size=5').data
+        segunda = self.client.get(primera['next']).data
+        anterior = self.client.get(segunda['previous']).data
+        self.assertEqual([r['id'] for r in anterior['results']], [r['id'] for r in primera['results']])
+        self.assertIsNone(anterior['previous'])
+
+
+class RecursoExportarTest(TestCase):
+    """La exportación NDJSON trae todos los recursos con sus contenidos"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.usuario = Usuario.objects.create_user(correo='lector@biblioteca.co', password='clave', nombre_completo='Lector')
+        for i in range(5):
+            recurso = Recurso.objects.create(titulo=f'Recurso {i}', descripcion='Descripcion')
+            for posicion in (2, 1):
+                Contenido.objects.create(recurso=recurso, tipo_contenido='text', contenido_bloque=f'Bloque {posicion}', posicion=posicion)
+
+    def test_exportacion_por_bloques(self):
+        client = APIClient()
+        client.force_authenticate(self.usuario)
+        with patch.object(RecursoExportar, 'chunk_size', 2):
+            response = client.get('/api/recursos/exportar/')
+            lineas = b''.join(response.streaming_content).decode().splitlines()
+
+        recursos = [json.loads(linea) for linea in lineas]
+        self.assertEqual([r['titulo'] for r in recursos], [f'Recurso {i}' for i in range(5)])
+        for recurso in recursos:
+            self.assertEqual([c['posicion'] for c in recurso['contenido']], [1, 2])
+
+
+class RecursoExportarExcelTest(TestCase):
+    """La exportación tabular usa las columnas de la carga masiva, una fila por contenido"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.usuario = Usuario.objects.create_user(correo='lector@biblioteca.co', password='clave', nombre_completo='Lector')
+        cls.categoria = Categoria.objects.create(nombre='Programación', descripcion='Categoria')
+        recurso = Recurso.objects.create(titulo='Con contenido', descripcion='Descripcion', categoria=cls.categoria)
+        for posicion in (2, 1):
+            Contenido.objects.create(recurso=recurso, tipo_contenido='text', contenido_bloque=f'Bloque {posicion}', posicion=posicion)
+        Recurso.objects.create(titulo='Sin contenido', descripcion='Descripcion')
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.usuario)
+
+    def test_csv(self):
+        response = self.client.get('/api/recursos/exportar/excel/', {'formato': 'csv'})
+        filas = list(csv.DictReader(io.StringIO(b''.join(response.streaming_content).decode())))
+        self.assertEqual(list(filas[0]), COLUMNAS_CARGA)
+        self.assertEqual([(f['titulo'], f['posicion']) for f in filas], [('Con contenido', '1'), ('Con contenido', '2'), ('Sin contenido', '')])
+        self.assertEqual(filas[0]['categoria'], str(self.categoria.pk))
+
+    def test_xlsx(self):
+        response = self.client.get('/api/recursos/exportar/excel/')
+        hoja = load_workbook(io.BytesIO(b''.join(response.streaming_content)), read_only=True).active
+        filas = list(hoja.iter_rows(values_only=True))
+        self.assertEqual(list(filas[0]), COLUMNAS_CARGA)
+        self.assertEqual(len(filas), 4)
+        self.assertEqual(filas[1][COLUMNAS_CARGA.index('contenido_bloque')], 'Bloque 1')
+
+
+class RecursoCreateLoteTest(TestCase):
+    """La creación por lista inserta por bloques: las consultas no dependen del número de recursos"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.usuario = Usuario.objects.create_user(correo='editor@biblioteca.co', password='clave', nombre_completo='Editor')
+        cls.categoria = Categoria.objects.create(nombre='Programación', descripcion='Categoria')
+        cls.area = Area.objects.create(nombre='Backend', descripcion='Area')
+        Recurso.objects.create(titulo='Existente', descripcion='Descripcion')
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.usuario)
+
+    def recursos(self, prefijo, cantidad, **extra):
+        return [
+            {
+                'titulo': f'{prefijo} {i}', 'descripcion': 'Descripcion', 'categoria': self.categoria.pk, 'area': self.area.pk,
+                'contenido': [
+                    {'tipo_contenido': 'text', 'contenido_bloque': f'Bloque {posicion}', 'posicion': posicion}
+                    for posicion in (2, 1)
+                ],
+                **extra,
+            }
+            for i in range(cantidad)
+        ]
+
+    def crear(self, recursos):
+        with self.captureOnCommitCallbacks(execute=True), CaptureQueriesContext(connection) as consultas:
+            respuesta = self.client.post('/api/recursos/crear/', recursos, format='json')
+        return respuesta, len(consultas)
+
+    def test_consultas_constantes(self):
+        indice_titulos.cargar()
+        respuesta, pocos = self.crear(self.recursos('Pocos', 2))
+        self.assertEqual(respuesta.status_code, 201)
+        respuesta, muchos = self.crear(self.recursos('Muchos', 20))
+        self.assertEqual(respuesta.status_code, 201)
+        self.assertEqual(pocos, muchos)
+
+        creado = respuesta.data['created_resources'][-1]
+        self.assertEqual((creado['titulo'], creado['categoria_nombre']), ('Muchos 19', 'Programación'))
+        self.assertEqual([c['posicion'] for c in creado['contenido']], [1, 2])
+        self.assertEqual(Contenido.objects.filter(recurso__titulo__startswith='Muchos').count(), 40)
+        self.assertEqual([pk for pk, _ in indice_titulos.sugerir('muchos 19')], [creado['id']])
+
+    def test_errores(self):
+        recursos = self.recursos('Nuevo', 1) + self.recursos('Nuevo', 1) + self.recursos('Existente', 1, titulo='Existente')
+        recursos += self.recursos('Sin categoria', 1, categoria=9999)
+        respuesta, _ = self.crear(recursos)
+        self.assertEqual(respuesta.status_code, 400)
+        self.assertEqual([e['error'] for e in respuesta.data['errors']], [
+            "El recurso con título 'Nuevo 0' ya existe.",
+            "El recurso con título 'Existente' ya existe.",
+            "La categoría 9999 del recurso 'Sin categoria 0' no existe.",
+        ])
+
+    def test_error_de_base_de_datos(self):
+        bulk_create = Contenido.objects.bulk_create
+
+        def fallar_primero(objetos, *args, **kwargs):
+            if objetos[0].recurso.titulo == 'Primero 0':
+                raise DataError('integer out of range')
+            return bulk_create(objetos, *args, **kwargs)
+
+        # El bloque que falla se descarta en su savepoint y los siguientes se crean
+        with patch.object(RecursoCreate, 'tamano_bloque', 1), patch.object(Contenido.objects, 'bulk_create', fallar_primero):
+            respuesta, _ = self.crear(self.recursos('Primero', 1) + self.recursos('Segundo', 1))
+        self.assertEqual(respuesta.status_code, 400)
+        self.assertEqual([e['error'] for e in respuesta.data['errors']], [
+            "Error al crear los recursos desde 'Primero 0' hasta 'Primero 0': integer out of range",
+        ])
+        self.assertEqual(list(Recurso.objects.filter(titulo__in=['Primero 0', 'Segundo 0']).values_list('titulo', flat=True)), ['Segundo 0'])
+
+
+@override_settings(CARGAS_HILOS=0, MEDIA_ROOT=tempfile.mkdtemp())
+class RecursoBulkUploadTest(TestCase):
+    """La carga masiva se recibe como trabajo pendiente y se procesa fila a fila, confirmando por bloques"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.usuario = Usuario.objects.create_user(correo='editor@biblioteca.co', password='clave', nombre_completo='Editor')
+        cls.categoria = Categoria.objects.create(nombre='Programación', descripcion='Categoria')
+        Recurso.objects.create(titulo='Existente', descripcion='Descripcion')
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(settings.MEDIA_ROOT, ignore_errors=True)
+        super().tearDownClass()
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.usuario)
+
+    def subir(self, filas, tamano_bloque=500, formato='xlsx', columnas=COLUMNAS_CARGA):
+        archivo = io.BytesIO()
+        if formato == 'xlsx':
+            libro = Workbook()
+            hoja = libro.active
+            hoja.append(columnas)
+            for fila in filas:
+                hoja.append([fila.get(columna) for columna in columnas])
+            libro.save(archivo)
+        elif formato == 'csv':
+            texto = io.StringIO()
+            escritor = csv.DictWriter(texto, columnas, extrasaction='ignore')
+            escritor.writeheader()
+            escritor.writerows(filas)
+            archivo.write(texto.getvalue().encode())
+        else:
+            archivo.write(''.join(json.dumps(fila) + '\n' for fila in filas).encode())
+        archivo.seek(0)
+        archivo.name = f'recursos.{formato}'
+        respuesta = self.client.post('/api/recursos/carga-masiva/', {'recursos': archivo}, format='multipart')
+        self.assertEqual(respuesta.status_code, 202)
+        self.assertEqual(respuesta.data['carga']['estado'], 'pendiente')
+        call_command('procesar_cargas', '--tamano-bloque', str(tamano_bloque), stdout=io.StringIO())
+        return self.client.get(f"/api/recursos/carga-masiva/{respuesta.data['carga']['id']}/").data
+
+    def test_excel_por_bloques(self):
+        filas = []
+        for i in range(5):
+            for posicion in (1, 2):
+                filas.append({
+                    'titulo': f'Recurso {i}', 'categoria': self.categoria.pk, 'descripcion': 'Descripcion',
+                    'tipo_contenido': 'text', 'contenido_bloque': f'Bloque {posicion}', 'posicion': posicion,
+                })
+        estado = self.subir(filas, tamano_bloque=2)
+        self.assertEqual(estado['estado'], 'completada')
+        self.assertEqual((estado['filas_procesadas'], estado['recursos_creados'], estado['total_errores']), (10, 5, 0))
+        self.assertIsNotNone(estado['filas_por_segundo'])
+        self.assertFalse(CargaMasiva.objects.get(pk=estado['id']).archivo)
+        recurso = Recurso.objects.get(titulo='Recurso 4')
+        self.assertEqual(recurso.categoria, self.categoria)
+        self.assertEqual(list(recurso.contenido_set.order_by('posicion').values_list('contenido_bloque', flat=True)), ['Bloque 1', 'Bloque 2'])
+
+    def test_duplicados(self):
+        estado = self.subir([
+            {'titulo': 'Nuevo', 'descripcion': 'Descripcion'},
+            {'titulo': 'Existente', 'descripcion': 'Descripcion'},
+        ])
+        self.assertEqual((estado['estado'], estado['recursos_creados'], estado['total_errores']), ('completada', 1, 1))
+        self.assertEqual(estado['errores'], ["El recurso con título 'Existente' ya existe."])
+
+    def test_errores_por_fila(self):
+        estado = self.subir([
+            {'titulo': 'Valido', 'descripcion': 'Descripcion', 'categoria': self.categoria.pk, 'tipo_contenido': 'text', 'contenido_bloque': 'Uno', 'posicion': 1},
+            {'titulo': 'Incompleto', 'descripcion': 'Descripcion', 'tipo_contenido': 'text', 'contenido_bloque': 'Uno', 'posicion': 1},
+            {'titulo': 'Incompleto', 'descripcion': 'Descripcion', 'tipo_contenido': 'pdf', 'contenido_bloque': 'Dos', 'posicion': 'x'},
+            {'descripcion': 'Sin título'},
+            {'titulo': 'Sin categoria', 'descripcion': 'Descripcion', 'categoria': 9999},
+            {'titulo': 'Likes', 'descripcion': 'Descripcion', 'numero_likes': 'muchos'},
+            {'titulo': 'Fuera de rango', 'descripcion': 'Descripcion', 'tipo_contenido': 'text', 'contenido_bloque': 'Uno', 'posicion': 2 ** 31},
+        ], formato='csv')
+        self.assertEqual((estado['estado'], estado['filas_procesadas'], estado['recursos_creados']), ('completada', 7, 1))
+        self.assertEqual(estado['errores'], [
+            "Fila 4: tipo_contenido 'pdf' no es válido. posicion debe ser un entero.",
+            "Fila 5: El campo 'titulo' es obligatorio.",
+            "Fila 6: categoria '9999' no existe.",
+            "Fila 7: numero_likes debe ser un entero.",
+            "Fila 8: posicion está fuera de rango.",
+        ])
+        # Las demás filas de un recurso con errores también se omiten
+        self.assertEqual(list(Recurso.objects.exclude(titulo='Existente').values_list('titulo', flat=True)), ['Valido'])
+
+    def filas_recursos(self, cantidad):
+        return [
+            {'titulo': f'Recurso {i}', 'descripcion': 'Descripcion', 'tipo_contenido': 'text', 'contenido_bloque': 'Uno', 'posicion': 1}
+            for i in range(cantidad)
+        ]
+
+    def test_error_de_base_de_datos_en_un_bloque(self):
+        bulk_create = Contenido.objects.bulk_create
+
+        def fallar(objetos, *args, **kwargs):
+            if objetos[0].recurso.titulo == 'Recurso 1':
+                raise DataError('integer out of range')
+            return bulk_create(objetos, *args, **kwargs)
+
+        with patch.object(Contenido.objects, 'bulk_create', fallar):
+            estado = self.subir(self.filas_recursos(3), tamano_bloque=1)
+        self.assertEqual((estado['estado'], estado['recursos_creados'], estado['total_errores']), ('completada', 2, 1))
+        self.assertEqual(estado['errores'], ["Error al crear los recursos desde 'Recurso 1' hasta 'Recurso 1': integer out of range"])
+
+    def test_reanudar_carga_abandonada(self):
+        crear = CargaRecursos.crear
+
+        def morir_en_el_segundo(carga_recursos, bloque):
+            if bloque[0]['titulo'] == 'Recurso 1':
+                raise SystemExit()
+            return crear(carga_recursos, bloque)
+
+        # El proceso termina tras confirmar el primer bloque y la carga queda 'procesando'
+        with patch.object(CargaRecursos, 'crear', morir_en_el_segundo), self.assertRaises(SystemExit):
+            self.subir(self.filas_recursos(3), tamano_bloque=1)
+        carga = CargaMasiva.objects.get()
+        self.assertEqual((carga.estado, carga.recursos_creados), ('procesando', 1))
+
+        call_command('procesar_cargas', stdout=io.StringIO())
+        self.assertEqual(CargaMasiva.objects.get().estado, 'procesando')
+
+        CargaMasiva.objects.update(updated_at=timezone.now() - timedelta(minutes=settings.CARGAS_ABANDONADA_MINUTOS + 1))
+        with self.assertLogs('contenido.carga', 'WARNING'):
+            call_command('procesar_cargas', stdout=io.StringIO())
+        estado = self.client.get(f'/api/recursos/carga-masiva/{carga.pk}/').data
+        self.assertEqual((estado['estado'], estado['recursos_creados'], estado['recursos_omitidos']), ('completada', 2, 1))
+        self.assertEqual(Recurso.objects.filter(titulo__startswith='Recurso').count(), 3)
+
+    def test_recurso_repartido_entre_tablas(self):
+        filas = [
+            ('A', 'text'), ('B', 'text'),      # B sigue en la tabla siguiente con una fila inválida
+            ('B', 'pdf'), ('C', 'pdf'),        # C sigue en la tabla siguiente con una fila válida
+            ('C', 'text'), ('D', 'text'),      # D sigue en la tabla siguiente y es válido
+            ('D', 'code'),
+        ]
+        texto = io.StringIO()
+        escritor = csv.writer(texto)
+        escritor.writerow(['titulo', 'descripcion', 'tipo_contenido', 'contenido_bloque', 'posicion'])
+        for posicion, (titulo, tipo) in enumerate(filas, 1):
+            escritor.writerow([titulo, 'Descripcion', tipo, 'Bloque', posicion])
+        archivo = io.BytesIO(texto.getvalue().encode())
+
+        carga_recursos = CargaRecursos()
+        progreso = {'filas_procesadas': 0}
+        recursos = list(agrupar_por_titulo(filas_validadas(archivo, 'csv', carga_recursos, progreso, tamano=2)))
+        self.assertEqual([(r['titulo'], len(r['contenido'])) for r in recursos], [('A', 1), ('D', 2)])
+        self.assertEqual(carga_recursos.errores, ["Fila 4: tipo_contenido 'pdf' no es válido.", "Fila 5: tipo_contenido 'pdf' no es válido."])
+        self.assertEqual(progreso['filas_procesadas'], 7)
+
+    def test_jsonl(self):
+        estado = self.subir([
+            {'titulo': 'Desde JSON', 'descripcion': 'Descripcion', 'area': None, 'tipo_contenido': 'code', 'contenido_bloque': 'print()', 'posicion': 1},
+            {'titulo': 'Desde JSON', 'descripcion': 'Descripcion', 'tipo_contenido': 'link', 'contenido_bloque': 'https://example.com', 'posicion': 2},
+            {'titulo': 'Otro', 'descripcion': 'Descripcion', 'tipo_contenido': 'audio', 'contenido_bloque': 'x', 'posicion': 1},
+        ], formato='jsonl')
+        self.assertEqual((estado['estado'], estado['recursos_creados']), ('completada', 1))
+        self.assertEqual(estado['errores'], ["Fila 3: tipo_contenido 'audio' no es válido."])
+        recurso = Recurso.objects.get(titulo='Desde JSON')
+        self.assertEqual(list(recurso.contenido_set.order_by('posicion').values_list('tipo_contenido', flat=True)), ['code', 'link'])
+
+    def test_columnas_obligatorias(self):
+        estado = self.subir([{'titulo': 'Sin descripcion'}], formato='csv', columnas=['titulo', 'subtitulo'])
+        self.assertEqual(estado['estado'], 'fallida')
+        self.assertEqual(estado['mensaje'], 'Faltan columnas obligatorias en el archivo: descripcion.')
+
+    def test_formato_no_soportado(self):
+        archivo = io.BytesIO(b'titulo')
+        archivo.name = 'recursos.txt'
+        respuesta = self.client.post('/api/recursos/carga-masiva/', {'recursos': archivo}, format='multipart')
+        self.assertEqual(respuesta.status_code, 400)
+
+    def test_estado_de_otro_usuario(self):
+        carga = CargaMasiva.objects.create(nombre_archivo='ajeno.xlsx')
+        self.assertEqual(self.client.get(f'/api/recursos/carga-masiva/{carga.pk}/').status_code, 404)
+
+class RecursoCargaFragmentosTest(TestCase):
+    """La carga por fragmentos confirma cada fragmento una sola vez y se puede reanudar"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.usuario = Usuario.objects.create_user(correo='editor@biblioteca.co', password='clave', nombre_completo='Editor')
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.usuario)
+
+    def abrir(self, nombre_archivo='catalogo.csv'):
+        respuesta = self.client.post('/api/recursos/carga-masiva/sesiones/', {'nombre_archivo': nombre_archivo}, format='json')
+        self.assertEqual((respuesta.status_code, respuesta.data['estado']), (201, 'recibiendo'))
+        return respuesta.data['id']
+
+    def enviar(self, carga_id, indice, titulos, checksum=None):
+        texto = io.StringIO()
+        escritor = csv.writer(texto)
+        escritor.writerow(['titulo', 'descripcion', 'tipo_contenido', 'contenido_bloque', 'posicion'])
+        for titulo in titulos:
+            escritor.writerow([titulo, 'Descripcion', 'text', f'Contenido de {titulo}', 1])
+        return self.enviar_contenido(carga_id, indice, texto.getvalue().encode(), checksum)
+
+    def enviar_contenido(self, carga_id, indice, contenido, checksum=None):
+        archivo = io.BytesIO(contenido)
+        archivo.name = f'fragmento-{indice}'
+        return self.client.put(
+            f'/api/recursos/carga-masiva/{carga_id}/fragmentos/{indice}/',
+            {'fragmento': archivo, 'checksum': checksum or hashlib.sha256(contenido).hexdigest()},
+            format='multipart'
+        )
+
+    def test_reanudar_sin_duplicar(self):
+        carga_id = self.abrir()
+        self.assertEqual(self.enviar(carga_id, 0, ['A', 'B']).status_code, 201)
+        self.assertEqual(self.enviar(carga_id, 1, ['C']).status_code, 201)
+
+        # Reenviar un fragmento confirmado no lo procesa de nuevo; con otro contenido es un conflicto
+        self.assertEqual(self.enviar(carga_id, 1, ['C']).status_code, 200)
+        self.assertEqual(self.enviar(carga_id, 1, ['X']).status_code, 409)
+        self.assertEqual(self.enviar(carga_id, 2, ['D'], checksum='0' * 64).status_code, 400)
+
+        estado = self.client.get(f'/api/recursos/carga-masiva/{carga_id}/').data
+        self.assertEqual((estado['fragmentos'], estado['recursos_creados']), ([0, 1], 3))
+        respuesta = self.client.post(f'/api/recursos/carga-masiva/{carga_id}/completar/', {'total_fragmentos': 3}, format='json')
+        self.assertEqual(respuesta.status_code, 409)
+
+        # Un recurso ya cargado se reconoce por su huella y se omite sin error
+        respuesta = self.enviar(carga_id, 2, ['A', 'D'])
+        self.assertEqual((respuesta.data['fragmento']['recursos_creados'], respuesta.data['fragmento']['recursos_omitidos']), (1, 1))
+        respuesta = self.client.post(f'/api/recursos/carga-masiva/{carga_id}/completar/', {'total_fragmentos': 3}, format='json')
+        self.assertEqual((respuesta.data['estado'], respuesta.data['recursos_creados'], respuesta.data['total_errores']), ('completada', 4, 0))
+        self.assertEqual(self.enviar(carga_id, 3, ['E']).status_code, 409)
+        self.assertEqual(Recurso.objects.count(), 4)
+        self.assertEqual(Contenido.objects.count(), 4)
+
+    def test_fragmento_ilegible(self):
+        truncado = json.dumps({'titulo': 'A', 'descripcion': 'Descripcion'}) + '\n{"titulo": "B", "descr'
+        for nombre_archivo, contenido in (('catalogo.jsonl', truncado.encode()), ('catalogo.xlsx', b'no es un xlsx')):
+            carga_id = self.abrir(nombre_archivo)
+            respuesta = self.enviar_contenido(carga_id, 0, contenido)
+            self.assertEqual(respuesta.status_code, 400)
+            self.assertTrue(respuesta.data['error'].startswith('El archivo no es un'))
+            self.assertEqual(self.client.get(f'/api/recursos/carga-masiva/{carga_id}/').data['fragmentos'], [])
+        self.assertEqual(Recurso.objects.count(), 0)
+
+    def test_repetir_la_carga_en_otra_sesion(self):
+        self.enviar(self.abrir(), 0, ['A', 'B'])
+        respuesta = self.enviar(self.abrir(), 0, ['A', 'B'])
+        self.assertEqual(respuesta.status_code, 201)
+        self.assertEqual((respuesta.data['carga']['recursos_omitidos'], respuesta.data['carga']['total_errores']), (2, 0))
+        self.assertEqual(Recurso.objects.count(), 2)
+
+
+class VotoContadoresTest(TestCase):
+    """Los contadores se mantienen con deltas según el tipo de voto anterior y el nuevo"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.usuarios = [
+            Usuario.objects.create_user(correo=f'lector{i}@biblioteca.co', password='clave', nombre_completo='Lector')
+            for i in range(3)
+        ]
+
+    def setUp(self):
+        self.recurso = Recurso.objects.create(titulo='Recurso', descripcion='Descripcion')
+
+    def contadores(self):
+        self.recurso.refresh_from_db()
+        return self.recurso.numero_likes, self.recurso.numero_dislikes, self.recurso.numero_mejora
+
+    def test_crear_cambiar_y_eliminar(self):
+        for usuario in self.usuarios:
+            VotoRecurso.objects.create(usuario=usuario, recurso=self.recurso, tipo_voto='like')
+        self.assertEqual(self.contadores(), (3, 0, 0))
+
+        voto = VotoRecurso.objects.get(usuario=self.usuarios[0], recurso=self.recurso)
+        voto.tipo_voto = 'mejora'
+        voto.save()
+        voto.save()
+        self.assertEqual(self.contadores(), (2, 0, 1))
+
+        voto.tipo_voto = 'dislike'
+        voto.save()
+        self.assertEqual(self.contadores(), (2, 1, 0))
+
+        voto.delete()
+        self.assertEqual(self.contadores(), (2, 0, 0))
+
+    def test_eliminar_recurso_con_votos(self):
+        for usuario in self.usuarios:
+            VotoRecurso.objects.create(usuario=usuario, recurso=self.recurso, tipo_voto='like')
+        cliente = APIClient()
+        cliente.force_authenticate(self.usuarios[0])
+        self.assertEqual(cliente.delete(f'/api/recursos/eliminar/{self.recurso.pk}/').status_code, 204)
+        connection.check_constraints()
+        self.assertFalse(ResumenVotosRecurso.objects.filter(recurso_id=self.recurso.pk).exists())
+        # Las lápidas se conservan para que los clientes quiten el voto en la sincronización
+        self.assertEqual(VotoRecursoEliminado.objects.filter(recurso_id=self.recurso.pk).count(), 3)
+
+    def test_voto_cambiado_en_una_consulta(self):
+        VotoRecurso.objects.create(usuario=self.usuarios[0], recurso=self.recurso, tipo_voto='like')
+        voto = VotoRecurso.objects.get(usuario=self.usuarios[0], recurso=self.recurso)
+        voto.tipo_voto = 'dislike'
+        # UPDATE del voto, UPDATE de los contadores y acumulado del resumen por periodo
+        with self.assertNumQueries(3):
+            voto.save()
+
+
+class VotarRecursoTest(TestCase):
+    """Los endpoints de votación devuelven los contadores actualizados"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.usuario = Usuario.objects.create_user(correo='lector@biblioteca.co', password='clave', nombre_completo='Lector')
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.usuario)
+        self.recurso = Recurso.objects.create(titulo='Recurso', descripcion='Descripcion')
+
+    def votar(self, tipo_voto):
+        return self.client.post('/api/recursos/votar/', {'recurso_id': self.recurso.pk, 'tipo_voto': tipo_voto}, format='json')
+
+    def test_votar_cambiar_y_remover(self):
+        response = self.votar('like')
+        self.assertEqual((response.data['numero_likes'], response.data['numero_dislikes']), (1, 0))
+
+        self.votar('like')
+        response = self.votar('dislike')
+        self.assertEqual((response.data['numero_likes'], response.data['numero_dislikes']), (0, 1))
+        self.assertEqual(VotoRecurso.objects.get(usuario=self.usuario).tipo_voto, 'dislike')
+
+        response = self.client.post('/api/recursos/remover-voto/', {'recurso_id': self.recurso.pk}, format='json')
+        self.assertEqual(response.data['message'], 'Voto removido correctamente')
+        self.assertEqual(response.data['numero_dislikes'], 0)
+
+        response = self.client.post('/api/recursos/remover-voto/', {'recurso_id': self.recurso.pk}, format='json')
+        self.assertEqual(response.data['message'], 'No había voto previo')
+
+    @skipUnless(connection.vendor == 'postgresql', 'El voto en una sola sentencia es exclusivo de PostgreSQL')
+    def test_voto_en_una_consulta(self):
+        with self.assertNumQueries(1):
+            contadores = registrar_voto(self.usuario.pk, self.recurso.pk, 'like')
+        self.assertEqual(contadores['numero_likes'], 1)
+        with self.assertNumQueries(1):
+            contadores = registrar_voto(self.usuario.pk, self.recurso.pk, 'mejora')
+        self.assertEqual((contadores['numero_likes'], contadores['numero_mejora']), (0, 1))
+
+    def test_recurso_inexistente(self):
+        response = self.client.post('/api/recursos/votar/', {'recurso_id': 999999, 'tipo_voto': 'like'}, format='json')
+        self.assertEqual(response.status_code, 404)
+        response = self.client.post('/api/recursos/remover-voto/', {'recurso_id': 999999}, format='json')
+        self.assertEqual(response.status_code, 404)
+
+
+class VotarRecursosLoteTest(TestCase):
+    """El lote de votos aplica la última operación por recurso y devuelve los contadores finales"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.usuario = Usuario.objects.create_user(correo='lector@biblioteca.co', password='clave', nombre_completo='Lector')
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.usuario)
+        self.recursos = [Recurso.objects.create(titulo=f'Recurso {i}', descripcion='Descripcion') for i in range(3)]
+        VotoRecurso.objects.create(usuario=self.usuario, recurso=self.recursos[1], tipo_voto='like')
+        VotoRecurso.objects.create(usuario=self.usuario, recurso=self.recursos[2], tipo_voto='like')
+
+    def test_lote(self):
+        uno, dos, tres = [r.pk for r in self.recursos]
+        response = self.client.post('/api/recursos/votar-lote/', {'votos': [
+            {'recurso_id': uno, 'tipo_voto': 'dislike'},
+            {'recurso_id': uno, 'tipo_voto': 'like'},
+            {'recurso_id': dos, 'tipo_voto': 'mejora'},
+            {'recurso_id': tres, 'tipo_voto': None},
+            {'recurso_id': 999999, 'tipo_voto': 'like'},
+            {'recurso_id': uno, 'tipo_voto': 'super'},
+            {'recurso_id': dos, 'tipo_voto': ['like']},
+            {'recurso_id': dos, 'tipo_voto': {'tipo': 'like'}},
+        ]}, format='json')
+        self.assertEqual(response.status_code, 200)
+        resultados = response.data['resultados']
+        self.assertEqual([r['success'] for r in resultados], [True, True, True, True, False, False, False, False])
+        self.assertEqual(resultados[4]['error'], 'Recurso no encontrado')
+        self.assertEqual({r['error'] for r in resultados[5:]}, {'Tipo de voto inválido'})
+        self.assertEqual(resultados[1]['numero_likes'], 1)
+
+        votos = dict(VotoRecurso.objects.filter(usuario=self.usuario).values_list('recurso_id', 'tipo_voto'))
+        self.assertEqual(votos, {uno: 'like', dos: 'mejora'})
+        contadores = {r.pk: (r.numero_likes, r.numero_dislikes, r.numero_mejora) for r in Recurso.objects.all()}
+        self.assertEqual(contadores, {uno: (1, 0, 0), dos: (0, 0, 1), tres: (0, 0, 0)})
+
+    def test_voto_concurrente(self):
+        otro = Usuario.objects.create_user(correo='otro@biblioteca.co', password='clave', nombre_completo='Otro')
+        VotoRecurso.objects.create(usuario=otro, recurso=self.recursos[0], tipo_voto='like')
+        select_for_update = VotoRecurso.objects.select_for_update
+
+        def filtrar(**filtros):
+            votos = list(select_for_update().filter(**filtros))
+            # Otra petición registra un voto del mismo usuario después de la lectura del lote
+            VotoRecurso.objects.create(usuario=self.usuario, recurso=self.recursos[0], tipo_voto='dislike')
+            return votos
+
+        with patch.object(VotoRecurso.objects, 'select_for_update', return_value=SimpleNamespace(filter=filtrar)):
+            response = self.client.post('/api/recursos/votar-lote/', {'votos': [
+                {'recurso_id': self.recursos[0].pk, 'tipo_voto': 'mejora'},
+            ]}, format='json')
+        self.assertEqual(response.status_code, 200)
+        resultado = response.data['resultados'][0]
+        self.assertTrue(resultado['success'])
+        self.assertEqual((resultado['numero_likes'], resultado['numero_dislikes'], resultado['numero_mejora']), (1, 0, 1))
+        self.assertEqual(VotoRecurso.objects.get(usuario=self.usuario, recurso=self.recursos[0]).tipo_voto, 'mejora')
+
+    def test_lote_vacio(self):
+        response = self.client.post('/api/recursos/votar-lote/', {'votos': []}, format='json')
+        self.assertEqual(response.status_code, 400)
+
+
+@override_settings(VOTOS_CONTADORES_DIFERIDOS=True, VOTOS_FLUSH_SEGUNDOS=0)
+class ContadoresDiferidosTest(TestCase):
+    """Con contadores diferidos los votos se acumulan y se aplican en un flush agrupado"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.usuarios = [
+            Usuario.objects.create_user(correo=f'lector{i}@biblioteca.co', password='clave', nombre_completo='Lector')
+            for i in range(3)
+        ]
+
+    def setUp(self):
+        cache.clear()
+        self.recursos = [Recurso.objects.create(titulo=f'Recurso {i}', descripcion='Descripcion') for i in range(2)]
+        self.client = APIClient()
+        self.client.force_authenticate(self.usuarios[0])
+
+    def tearDown(self):
+        # Los deltas que queden en el buffer del proceso se aplican dentro de la transacción del test
+        buffer_contadores.flush()
+
+    def votar(self, usuario, recurso, tipo_voto):
+        self.client.force_authenticate(usuario)
+        with self.captureOnCommitCallbacks(execute=True):
+            return self.client.post('/api/recursos/votar/', {'recurso_id': recurso.pk, 'tipo_voto': tipo_voto}, format='json')
+
+    def test_get_condicional_con_pendientes(self):
+        for url in ('/api/recursos-con-votos/', f'/api/recursos/{self.recursos[0].pk}/'):
+            self.client.force_authenticate(self.usuarios[0])
+            etag = self.client.get(url)['ETag']
+            self.votar(self.usuarios[0], self.recursos[0], 'like' if 'votos' in url else 'dislike')
+            respuesta = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+            self.assertEqual(respuesta.status_code, 200)
+
+        respuesta = self.client.get('/api/recursos-con-votos/')
+        self.assertEqual(self.client.get('/api/recursos-con-votos/', HTTP_IF_NONE_MATCH=respuesta['ETag']).status_code, 304)
+        recurso = next(r for r in respuesta.data['results'] if r['id'] == self.recursos[0].pk)
+        self.assertEqual((recurso['numero_dislikes'], recurso['voto_usuario']), (1, 'dislike'))
+
+    def test_pendientes_vencen(self):
+        self.votar(self.usuarios[0], self.recursos[0], 'like')
+        url = f'/api/recursos/{self.recursos[0].pk}/'
+        self.assertEqual(self.client.get(url).data['numero_likes'], 1)
+
+        # Si el proceso muere sin flush, sus deltas dejan de sumarse al vencer las claves
+        vencido = time.time() + _ttl_pendientes() + 1
+        with patch('django.core.cache.backends.locmem.time.time', return_value=vencido):
+            self.assertEqual(self.client.get(url).data['numero_likes'], 0)
+
+    @override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache', 'LOCATION': '/tmp'}})
+    def test_cache_sin_incr_atomico(self):
+        self.assertEqual([error.id for error in verificar_cache_contadores(None)], ['contenido.E001'])
+
+    def test_reconciliar_con_pendientes(self):
+        recurso = self.recursos[0]
+        self.votar(self.usuarios[0], recurso, 'like')
+        # Voto de otro proceso: su delta solo está en la cache, no en el buffer de este
+        VotoRecurso.objects.bulk_create([VotoRecurso(usuario=self.usuarios[1], recurso=recurso, tipo_voto='like')])
+        cache.incr(f'contador_pendiente:{recurso.pk}:like')
+        Recurso.objects.filter(pk=recurso.pk).update(numero_likes=5)
+
+        # Solo lectura: informa la deriva sobre persistidos más pendientes, sin flush
+        reporte = reconciliar_contadores(aplicar=False)
+        self.assertEqual((reporte['recursos_corregidos'], reporte['deriva']['numero_likes']), (1, 5))
+        self.assertEqual(Recurso.objects.get(pk=recurso.pk).numero_likes, 5)
+
+        # Se persiste lo esperado menos el delta que aún aplicará el otro proceso
+        reconciliar_contadores()
+        self.assertEqual(Recurso.objects.get(pk=recurso.pk).numero_likes, 1)
+        self.assertEqual(self.client.get(f'/api/recursos/{recurso.pk}/').data['numero_likes'], 2)
+        self.assertEqual(reconciliar_contadores(aplicar=False)['recursos_corregidos'], 0)
+
+    def test_eliminar_recurso_con_votos(self):
+        eliminado, otro = self.recursos
+        self.votar(self.usuarios[0], eliminado, 'like')
+        buffer_contadores.flush()
+        self.votar(self.usuarios[1], eliminado, 'like')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(self.client.delete(f'/api/recursos/eliminar/{eliminado.pk}/').status_code, 204)
+        connection.check_constraints()
+
+        # El delta pendiente del recurso eliminado se descarta y no impide aplicar los demás
+        self.votar(self.usuarios[0], otro, 'like')
+        buffer_contadores.flush()
+        connection.check_constraints()
+        self.assertEqual(Recurso.objects.get(pk=otro.pk).numero_likes, 1)
+        self.assertEqual(buffer_contadores.flush(), 0)
+
+    def test_pendientes_y_flush(self):
+        for usuario in self.usuarios:
+            self.votar(usuario, self.recursos[0], 'like')
+        self.votar(self.usuarios[0], self.recursos[1], 'mejora')
+        self.votar(self.usuarios[0], self.recursos[1], 'dislike')
+
+        # Persistido sin cambios; la lectura suma los pendientes
+        self.recursos[0].refresh_from_db()
+        self.assertEqual(self.recursos[0].numero_likes, 0)
+        detalle = self.client.get(f'/api/recursos/{self.recursos[0].pk}/').data
+        self.assertEqual(detalle['numero_likes'], 3)
+
+        # Bloqueo de los recursos, un UPDATE agrupado de contadores y un INSERT de resúmenes, en una transacción
+        # (savepoint en el test)
+        with self.assertNumQueries(5):
+            self.assertEqual(buffer_contadores.flush(), 2)
+        contadores = {r.pk: (r.numero_likes, r.numero_dislikes, r.numero_mejora) for r in Recurso.objects.all()}
+        self.assertEqual(contadores, {self.recursos[0].pk: (3, 0, 0), self.recursos[1].pk: (0, 1, 0)})
+
+        listado = self.client.get('/api/recursos/').data['results']
+        self.assertEqual([r['numero_likes'] for r in listado], [3, 0])
+
+
+class ReconciliarContadoresTest(TestCase):
+    """La reconciliación corrige solo los recursos cuyos contadores no coinciden con los votos"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.usuarios = [
+            Usuario.objects.create_user(correo=f'lector{i}@biblioteca.co', password='clave', nombre_completo='Lector')
+            for i in range(2)
+        ]
+
+    def test_reconciliar(self):
+        correcto = Recurso.objects.create(titulo='Correcto', descripcion='Descripcion')
+        con_deriva = Recurso.objects.create(titulo='Con deriva', descripcion='Descripcion')
+        for usuario in self.usuarios:
+            VotoRecurso.objects.create(usuario=usuario, recurso=correcto, tipo_voto='like')
+        VotoRecurso.objects.create(usuario=self.usuarios[0], recurso=con_deriva, tipo_voto='mejora')
+        Recurso.objects.filter(pk=con_deriva.pk).update(numero_likes=7, numero_mejora=0)
+
+        salida = io.StringIO()
+        call_command('reconciliar_contadores', '--dry-run', stdout=salida)
+        self.assertIn('Recursos con deriva: 1', salida.getvalue())
+        self.assertEqual(Recurso.objects.get(pk=con_deriva.pk).numero_likes, 7)
+
+        reporte = reconciliar_contadores(batch_size=1)
+        self.assertEqual(reporte['recursos_corregidos'], 1)
+        self.assertEqual(reporte['deriva'], {'numero_likes': 7, 'numero_dislikes': 0, 'numero_mejora': 1})
+        contadores = {r.pk: (r.numero_likes, r.numero_dislikes, r.numero_mejora) for r in Recurso.objects.all()}
+        self.assertEqual(contadores, {correcto.pk: (2, 0, 0), con_deriva.pk: (0, 0, 1)})
+
+
+class RecursoRankingTest(TestCase):
+    """Ranking por límite inferior de Wilson y por tendencia, mantenidos con cada voto"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.usuarios = [
+            Usuario.objects.create_user(correo=f'lector{i}@biblioteca.co', password='clave', nombre_completo='Lector')
+            for i in range(4)
+        ]
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.uno, self.tres, self.mixto = [
+            Recurso.objects.create(titulo=titulo, descripcion='Descripcion') for titulo in ('Uno', 'Tres', 'Mixto')
+        ]
+        self.votar(self.usuarios[0], self.uno, 'like')
+        for usuario in self.usuarios[:3]:
+            self.votar(usuario, self.tres, 'like')
+        self.votar(self.usuarios[0], self.mixto, 'like')
+        self.votar(self.usuarios[1], self.mixto, 'like')
+        self.votar(self.usuarios[2], self.mixto, 'mejora')
+        self.votar(self.usuarios[2], self.mixto, 'dislike')
+        self.votar(self.usuarios[3], self.mixto, 'like')
+        self.client.force_authenticate(self.usuarios[3])
+        self.client.post('/api/recursos/remover-voto/', {'recurso_id': self.mixto.pk}, format='json')
+
+    def votar(self, usuario, recurso, tipo_voto):
+        self.client.force_authenticate(usuario)
+        self.client.post('/api/recursos/votar/', {'recurso_id': recurso.pk, 'tipo_voto': tipo_voto}, format='json')
+
+    def ranking(self, tipo):
+        return self.client.get('/api/recursos/ranking/', {'tipo': tipo}).data['results']
+
+    def test_valorados(self):
+        # 3/0 > 2/1 > 1/0: con pocos votos el límite inferior penaliza la incertidumbre
+        ranking = self.ranking('valorados')
+        self.assertEqual([r['id'] for r in ranking], [self.tres.pk, self.mixto.pk, self.uno.pk])
+        self.assertAlmostEqual(ranking[0]['puntaje'], 0.4385, places=4)
+
+    def test_tendencia_incremental_igual_a_recalculada(self):
+        esperadas = calcular_tendencias(VotoRecurso.objects.all())
+        for recurso in Recurso.objects.all():
+            self.assertAlmostEqual(recurso.tendencia / esperadas[recurso.pk], 1.0, places=9)
+
+        ranking = self.ranking('tendencia')
+        self.assertEqual(ranking[0]['id'], self.tres.pk)
+        self.assertAlmostEqual(ranking[0]['puntaje'], 3.0, places=3)
+
+        # Votos de hace un mes apenas pesan
+        VotoRecurso.objects.filter(recurso=self.tres).update(created_at=timezone.now() - timedelta(days=30))
+        call_command('recalcular_tendencias', stdout=io.StringIO())
+        self.assertEqual(self.ranking('tendencia')[-1]['id'], self.tres.pk)
+
+
+class MisVotosSincronizacionTest(TestCase):
+    """?since= devuelve solo los votos cambiados y las eliminaciones posteriores al cursor"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.usuario = Usuario.objects.create_user(correo='lector@biblioteca.co', password='clave', nombre_completo='Lector')
+        cls.recursos = [Recurso.objects.create(titulo=f'Recurso {i}', descripcion='Descripcion') for i in range(4)]
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.usuario)
+
+    def votar(self, recurso, tipo_voto):
+        self.client.post('/api/recursos/votar/', {'recurso_id': recurso.pk, 'tipo_voto': tipo_voto}, format='json')
+
+    def remover(self, recurso):
+        self.client.post('/api/recursos/remover-voto/', {'recurso_id': recurso.pk}, format='json')
+
+    def test_sincronizacion_incremental(self):
+        uno, dos, tres, cuatro = self.recursos
+        for recurso in (uno, dos, cuatro):
+            self.votar(recurso, 'like')
+        inicial = self.client.get('/api/recursos/mis-votos/').data
+        self.assertTrue(inicial['completo'])
+        self.assertEqual(len(inicial['votos']), 3)
+
+        # Los votos ya sincronizados quedan fuera del margen del cursor
+        VotoRecurso.objects.update(updated_at=timezone.now() - timedelta(minutes=1))
+        cursor = self.client.get('/api/recursos/mis-votos/').data['cursor']
+        self.votar(uno, 'dislike')
+        self.remover(dos)
+        self.votar(tres, 'like')
+
+        cambios = self.client.get('/api/recursos/mis-votos/', {'since': cursor}).data
+        self.assertFalse(cambios['completo'])
+        self.assertEqual(
+            sorted((voto['recurso'], voto['tipo_voto']) for voto in cambios['votos']),
+            [(uno.pk, 'dislike'), (tres.pk, 'like')]
+        )
+        self.assertEqual(cambios['eliminados'], [dos.pk])
+
+        # Si el usuario vuelve a votar, la lápida ya no se informa
+        self.votar(dos, 'mejora')
+        cambios = self.client.get('/api/recursos/mis-votos/', {'since': cursor}).data
+        self.assertEqual(cambios['eliminados'], [])
+
+    def test_cursor_antiguo_o_invalido(self):
+        self.votar(self.recursos[0], 'like')
+        antiguo = (timezone.now() - timedelta(days=60)).isoformat()
+        respuesta = self.client.get('/api/recursos/mis-votos/', {'since': antiguo}).data
+        self.assertTrue(respuesta['completo'])
+        self.assertEqual(len(respuesta['votos']), 1)
+
+        respuesta = self.client.get('/api/recursos/mis-votos/', {'since': 'ayer'})
+        self.assertEqual(respuesta.status_code, 400)
+
+    def test_eliminar_usuario_con_votos(self):
+        otro = Usuario.objects.create_user(correo='otro@biblioteca.co', password='clave', nombre_completo='Otro')
+        registrar_voto(otro.pk, self.recursos[0].pk, 'like')
+        otro.delete()
+        # Las lápidas del usuario eliminado no se crean: su clave foránea quedaría colgando
+        connection.check_constraints()
+        self.assertFalse(VotoRecursoEliminado.objects.exists())
+        self.recursos[0].refresh_from_db()
+        self.assertEqual(self.recursos[0].numero_likes, 0)
+
+
+class RecursoEstadisticasVotosTest(TestCase):
+    """Los resúmenes por periodo se acumulan con cada voto y el reporte agrega por rango"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.usuarios = [
+            Usuario.objects.create_user(correo=f'lector{i}@biblioteca.co', password='clave', nombre_completo='Lector')
+            for i in range(2)
+        ]
+
+    def setUp(self):
+        self.client = APIClient()
+        self.uno, self.dos = [Recurso.objects.create(titulo=titulo, descripcion='Descripcion') for titulo in ('Uno', 'Dos')]
+        self.votar(self.usuarios[0], self.uno, 'like')
+        self.votar(self.usuarios[1], self.uno, 'like')
+        self.votar(self.usuarios[1], self.uno, 'dislike')
+        self.client.post('/api/recursos/remover-voto/', {'recurso_id': self.uno.pk}, format='json')
+        self.votar(self.usuarios[0], self.dos, 'like')
+        self.votar(self.usuarios[0], self.dos, 'like')
+
+    def votar(self, usuario, recurso, tipo_voto):
+        self.client.force_authenticate(usuario)
+        self.client.post('/api/recursos/votar/', {'recurso_id': recurso.pk, 'tipo_voto': tipo_voto}, format='json')
+
+    def reporte(self, **parametros):
+        return self.client.get('/api/recursos/estadisticas-votos/', parametros)
+
+    def test_resumen_incremental(self):
+        # El usuario 1 quitó su voto sobre 'Uno' (el like del usuario 0 queda); el voto repetido no cuenta
+        desde = (timezone.now() - timedelta(hours=2)).isoformat()
+        datos = self.reporte(granularidad='hora', desde=desde).data
+        self.assertEqual(len(datos['series']), 3)
+        self.assertEqual([fila['likes'] for fila in datos['series']], [0, 0, 2])
+        self.assertEqual(datos['series'][-1]['acumulado_likes'], 2)
+        totales = {fila['recurso_id']: (fila['likes'], fila['dislikes']) for fila in datos['recursos']}
+        self.assertEqual(totales, {self.uno.pk: (1, 0), self.dos.pk: (1, 0)})
+
+        diario = self.reporte(recursos=str(self.uno.pk)).data
+        self.assertEqual(len(diario['series']), 31)
+        self.assertEqual(sum(fila['likes'] for fila in diario['series']), 1)
+
+    def test_reconstruir_igual_al_incremental(self):
+        incremental = self.reporte().data['recursos']
+        call_command('reconstruir_resumen_votos', stdout=io.StringIO())
+        self.assertEqual(self.reporte().data['recursos'], incremental)
+
+    def test_parametros_invalidos(self):
+        self.assertEqual(self.reporte(granularidad='semana').status_code, 400)
+        self.assertEqual(self.reporte(desde='ayer').status_code, 400)
+        self.assertEqual(self.reporte(granularidad='hora', desde='2020-01-01').status_code, 400)
+        self.assertEqual(self.reporte(recursos='1,dos').status_code, 400)
+
+
+@override_settings(VOTOS_CONTADORES_FRAGMENTOS=4)
+class ContadoresFragmentadosTest(TestCase):
+    """Con contadores fragmentados los votos no escriben en la fila del recurso hasta la compactación"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.usuarios = [
+            Usuario.objects.create_user(correo=f'lector{i}@biblioteca.co', password='clave', nombre_completo='Lector')
+            for i in range(3)
+        ]
+
+    def setUp(self):
+        cache.clear()
+        self.recurso = Recurso.objects.create(titulo='Recurso', descripcion='Descripcion')
+        self.client = APIClient()
+
+    def votar(self, usuario, tipo_voto):
+        self.client.force_authenticate(usuario)
+        return self.client.post('/api/recursos/votar/', {'recurso_id': self.recurso.pk, 'tipo_voto': tipo_voto}, format='json')
+
+    def test_fragmentos_y_compactacion(self):
+        for usuario in self.usuarios:
+            self.votar(usuario, 'like')
+        respuesta = self.votar(self.usuarios[0], 'dislike')
+        self.assertEqual((respuesta.data['numero_likes'], respuesta.data['numero_dislikes']), (2, 1))
+
+        # La fila del recurso no cambia; las lecturas suman los fragmentos
+        self.recurso.refresh_from_db()
+        self.assertEqual(self.recurso.numero_likes, 0)
+        self.assertEqual(self.client.get(f'/api/recursos/{self.recurso.pk}/').data['numero_likes'], 2)
+        self.assertEqual(self.client.get('/api/recursos/').data['results'][0]['numero_dislikes'], 1)
+
+        call_command('compactar_contadores', stdout=io.StringIO())
+        self.assertFalse(ContadorFragmentoRecurso.objects.exists())
+        self.recurso.refresh_from_db()
+        self.assertEqual((self.recurso.numero_likes, self.recurso.numero_dislikes), (2, 1))
+        self.assertEqual(self.client.get(f'/api/recursos/{self.recurso.pk}/').data['numero_likes'], 2)
+        resumen = ResumenVotosRecurso.objects.get(recurso=self.recurso, granularidad='dia')
+        self.assertEqual((resumen.likes, resumen.dislikes), (2, 1))
+
+    def test_eliminar_recurso_con_votos(self):
+        otro = Recurso.objects.create(titulo='Otro', descripcion='Descripcion')
+        for usuario in self.usuarios:
+            self.votar(usuario, 'like')
+        self.client.force_authenticate(self.usuarios[0])
+        self.client.post('/api/recursos/votar/', {'recurso_id': otro.pk, 'tipo_voto': 'like'}, format='json')
+
+        self.assertEqual(self.client.delete(f'/api/recursos/eliminar/{self.recurso.pk}/').status_code, 204)
+        connection.check_constraints()
+        self.assertFalse(ContadorFragmentoRecurso.objects.filter(recurso_id=self.recurso.pk).exists())
+
+        # Un delta para un recurso inexistente no crea fragmentos y la compactación sigue con los demás
+        sumar_a_fragmento(self.recurso.pk, {'like': 1})
+        self.assertEqual(compactar_fragmentos(), 1)
+        self.assertEqual(Recurso.objects.get(pk=otro.pk).numero_likes, 1)
@@ -4,7 +4,18 @@ from .views import *
 urlpatterns = [
     path('recursos/', RecursoList.as_view(), name='recursoList'),
     path('recursos/<int:pk>/', RecursoRetrieve.as_view(), name='recursoRetrieve'),
+    path('recursos/ranking/', RecursoRanking.as_view(), name='recursoRanking'),
+    path('recursos/estadisticas-votos/', RecursoEstadisticasVotos.as_view(), name='recursoEstadisticasVotos'),
+    path('recursos/buscar/', RecursoBuscar.as_view(), name='recursoBuscar'),
+    path('recursos/autocompletar/', RecursoAutocompletar.as_view(), name='recursoAutocompletar'),
+    path('recursos/exportar/', RecursoExportar.as_view(), name='recursoExportar'),
+    path('recursos/exportar/excel/', RecursoExportarExcel.as_view(), name='recursoExportarExcel'),
     path('recursos/crear/', RecursoCreate.as_view(), name='recursoCreate'),
+    path('recursos/carga-masiva/', RecursoBulkUpload.as_view(), name='recursoBulkUpload'),
+    path('recursos/carga-masiva/<int:pk>/', RecursoCargaEstado.as_view(), name='recursoCargaEstado'),
+    path('recursos/carga-masiva/sesiones/', RecursoCargaSesion.as_view(), name='recursoCargaSesion'),
+    path('recursos/carga-masiva/<int:pk>/fragmentos/<int:indice>/', RecursoCargaFragmento.as_view(), name='recursoCargaFragmento'),
+    path('recursos/carga-masiva/<int:pk>/completar/', RecursoCargaCompletar.as_view(), name='recursoCargaCompletar'),
     path('recursos/actualizar/<int:pk>/', RecursoUpdate.as_view(), name='recursoUpdate'),
     path('recursos/<int:pk>/estado/', RecursoToggleValidado.as_view(), name='recurso-toggle-status'),
     path('recursos/eliminar/<int:pk>/', RecursoDelete.as_view(), name='EliminarRecurso'),
@@ -13,6 +24,7 @@ urlpatterns = [
      # Nuevas URLs para votación
     path('recursos/mis-votos/', MisVotosRecursos.as_view(), name='mis-votos-recursos'),
     path('recursos/votar/', VotarRecurso.as_view(), name='votar-recurso'),
+    path('recursos/votar-lote/', VotarRecursosLote.as_view(), name='votar-recursos-lote'),
     path('recursos/remover-voto/', RemoverVotoRecurso.as_view(), name='remover-voto-recurso'),
     
     # URLs alternativas que incluyen información de votos
@@ -1,35 +1,198 @@
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status, permissions
+from rest_framework.exceptions import APIException, ValidationError as DRFValidationError
 from django.http import Http404
-from .models import Recurso, Contenido, VotoRecurso
-from .serializers import RecursoSerializer, ContenidoSerializer
-from django.http import JsonResponse
+from .models import Recurso, Contenido, VotoRecurso, ContadorFragmentoRecurso, CargaMasiva
+from .serializers import RecursoSerializer, RecursoConVotoSerializer, RecursoCargaSerializer, ContenidoSerializer, CargaMasivaSerializer, FragmentoCargaSerializer
+from .cache import obtener_recurso_cache, guardar_recurso_cache
+from .busqueda import busqueda_indexada, buscar_recursos
+from .autocompletar import indice_titulos
+from .exportacion import generar_csv, generar_xlsx
+from .carga import FORMATOS, CargaRecursos, ConflictoCarga, completar_carga, en_bloques, encolar_carga, procesar_fragmento
+from .votos import registrar_voto, eliminar_voto, aplicar_votos_lote, cambios_votos_usuario, lapidas_vigentes_desde
+from .contadores import buffer_contadores, contadores_diferidos, contadores_fragmentados, sumar_pendientes
+from .ranking import tendencia_actual
+from .estadisticas import FRECUENCIAS, reporte_votos
+from maestros.models import Categoria, Area
+from biblioteca.condicional import condicional
+from biblioteca.paginacion import KeysetPagination
+from django.http import JsonResponse, StreamingHttpResponse, FileResponse
+from rest_framework.utils.encoders import JSONEncoder
+import json
+import os
 from django.core.exceptions import ValidationError
-import pandas as pd
-from collections import defaultdict
-from django.db import transaction
-
-def get_recurso(pk):
+from django.db import DatabaseError, transaction
+from django.db.models import OuterRef, Prefetch, Q, Subquery
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+from datetime import datetime, time, timedelta
+
+# Campos de la proyección ligera para pantallas de listado (?view=summary)
+CAMPOS_RESUMEN = [
+    'id',
+    'titulo',
+    'subtitulo',
+    'categoria',
+    'categoria_nombre',
+    'area',
+    'area_nombre',
+    'numero_likes',
+    'numero_dislikes',
+    'numero_mejora',
+]
+
+def campos_solicitados(request):
+    """Campos pedidos con ?view=summary o ?fields=a,b,c; None significa todos"""
+    if request.query_params.get('view') == 'summary':
+        return CAMPOS_RESUMEN
+    fields = request.query_params.get('fields')
+    if not fields:
+        return None
+    campos = [campo.strip() for campo in fields.split(',')]
+    return ['id'] + [campo for campo in campos if campo in RecursoSerializer.Meta.fields and campo != 'id']
+
+def recursos_con_relaciones(campos=None):
+    """Recursos con categoria/area y contenidos (ordenados por posicion) cargados en bloque.
+
+    Si se indican campos, solo se seleccionan las columnas necesarias y el
+    contenido únicamente se precarga cuando se pide.
+    """
+    prefetch_contenido = Prefetch(
+        'contenido_set',
+        queryset=Contenido.objects.order_by('posicion'),
+        to_attr='contenidos_ordenados'
+    )
+    if campos is None:
+        return Recurso.objects.select_related('categoria', 'area').prefetch_related(prefetch_contenido)
+
+    # created_at, los contadores y los puntajes siempre se cargan porque los usa el cursor de la paginación
+    columnas = ['id', 'created_at', 'numero_likes', 'numero_dislikes', 'numero_mejora', 'puntaje_wilson', 'tendencia']
+    relaciones = []
+    queryset = Recurso.objects.all()
+    for campo in campos:
+        if campo == 'contenido':
+            queryset = queryset.prefetch_related(prefetch_contenido)
+        elif campo in ('categoria_nombre', 'area_nombre'):
+            relacion = campo.replace('_nombre', '')
+            relaciones.append(relacion)
+            columnas += [relacion, f'{relacion}__nombre']
+        else:
+            columnas.append(campo)
+    if relaciones:
+        queryset = queryset.select_related(*relaciones)
+    return queryset.only(*columnas)
+
+def get_recurso(pk, queryset=None):
+    if queryset is None:
+        queryset = Recurso.objects.all()
     try:
-        return Recurso.objects.get(pk=pk)
+        return queryset.get(pk=pk)
     except Recurso.DoesNotExist:
         raise Http404('Recurso no encontrado')
 
+def get_recurso_serializado(pk):
+    """Recurso serializado (sin datos del usuario) usando la cache por recurso.
+
+    Solo se consultan por clave primaria los updated_at del recurso y de su
+    categoría y área (sus nombres van en el JSON); el recurso completo se carga
+    y serializa únicamente cuando la entrada no existe o es de otra versión.
+    """
+    version = Recurso.objects.filter(pk=pk).values_list('updated_at', 'categoria__updated_at', 'area__updated_at').first()
+    if version is None:
+        raise Http404('Recurso no encontrado')
+
+    data = obtener_recurso_cache(pk, version)
+    if data is None:
+        recurso = get_recurso(pk, recursos_con_relaciones())
+        data = RecursoSerializer(recurso).data
+        guardar_recurso_cache(pk, version, data)
+    # Los votos aún no aplicados (contadores diferidos) se suman después de la cache
+    return sumar_pendientes([dict(data)])[0]
+
+def validadores_recursos(request, pk=None):
+    """Tablas de las que dependen las respuestas de recursos (para ETag / Last-Modified)"""
+    recursos = Recurso.objects.all() if pk is None else Recurso.objects.filter(pk=pk)
+    querysets = [recursos, Categoria.objects.all(), Area.objects.all()]
+    if contadores_fragmentados():
+        # Los votos cambian los fragmentos sin tocar el updated_at del recurso
+        fragmentos = ContadorFragmentoRecurso.objects.all()
+        querysets.append(fragmentos if pk is None else fragmentos.filter(recurso_id=pk))
+    if contadores_diferidos():
+        # Igual con los deltas pendientes del buffer hasta el flush
+        querysets.append(buffer_contadores.ultima_modificacion(pk))
+    return querysets
+
+class RecursoPagination(KeysetPagination):
+    """Paginación por cursor sobre (created_at, id) o, con ?ordering=, sobre los contadores y puntajes de votos"""
+    ordering = 'created_at'
+    ordering_fields = ('created_at', 'numero_likes', 'numero_dislikes', 'numero_mejora', 'puntaje_wilson', 'tendencia')
+
+def _booleano(valor, nombre):
+    if valor.lower() in ('true', '1', 'si'):
+        return True
+    if valor.lower() in ('false', '0', 'no'):
+        return False
+    raise DRFValidationError({nombre: "Debe ser 'true' o 'false'."})
+
+def filtrar_recursos(queryset, request):
+    """Aplica los filtros ?categoria=, ?area=, ?validado= e ?is_active= del listado"""
+    filtros = {}
+    for nombre in ('categoria', 'area'):
+        valor = request.query_params.get(nombre)
+        if valor:
+            if not valor.isdigit():
+                raise DRFValidationError({nombre: 'Debe ser un id numérico.'})
+            filtros[f'{nombre}_id'] = int(valor)
+    for nombre in ('validado', 'is_active'):
+        valor = request.query_params.get(nombre)
+        if valor:
+            filtros[nombre] = _booleano(valor, nombre)
+    return queryset.filter(**filtros)
+
+def paginacion_desactivada(request):
+    """Permite a los clientes antiguos pedir la lista completa con ?paginar=false"""
+    return request.query_params.get('paginar', '').lower() in ('false', '0', 'no')
+
 
 class MisVotosRecursos(APIView):
-    """Obtiene todos los votos del usuario logueado"""
+    """Obtiene los votos del usuario logueado.
+
+    Con ?since=<cursor> solo devuelve los votos creados o cambiados y los
+    recursos cuyo voto se eliminó desde ese cursor. Cada respuesta incluye el
+    cursor para la siguiente sincronización y 'completo' indica si la lista de
+    votos es la completa (sin since o con un cursor demasiado antiguo).
+    """
     permission_classes = [permissions.IsAuthenticated]
     
     def get(self, request):
         try:
-            votos = VotoRecurso.objects.filter(usuario=request.user).values(
-                'recurso', 'tipo_voto'
-            )
+            cursor = timezone.now()
+            desde = None
+            since = request.query_params.get('since')
+            if since:
+                desde = parse_datetime(since)
+                if desde is None:
+                    return Response({
+                        'success': False,
+                        'error': "El parámetro 'since' debe ser un cursor o una fecha ISO 8601"
+                    }, status=status.HTTP_400_BAD_REQUEST)
+                if timezone.is_naive(desde):
+                    desde = timezone.make_aware(desde)
+
+            completo = desde is None or desde < lapidas_vigentes_desde()
+            if completo:
+                votos = list(VotoRecurso.objects.filter(usuario=request.user).values('recurso', 'tipo_voto'))
+                eliminados = []
+            else:
+                votos, eliminados = cambios_votos_usuario(request.user.pk, desde)
             
             return Response({
                 'success': True,
-                'votos': list(votos)
+                'completo': completo,
+                'cursor': cursor.isoformat().replace('+00:00', 'Z'),
+                'votos': votos,
+                'eliminados': eliminados
             }, status=status.HTTP_200_OK)
             
         except Exception as e:
@@ -61,42 +224,27 @@ class VotarRecurso(APIView):
                     'error': 'Tipo de voto inválido'
                 }, status=status.HTTP_400_BAD_REQUEST)
             
-            # Obtener el recurso
             try:
-                recurso = Recurso.objects.get(id=recurso_id)
+                recurso_id = int(recurso_id)
+            except (TypeError, ValueError):
+                return Response({
+                    'success': False,
+                    'error': 'ID de recurso inválido'
+                }, status=status.HTTP_400_BAD_REQUEST)
+            
+            # Crear o actualizar el voto y obtener los contadores actualizados en la misma operación
+            try:
+                contadores = registrar_voto(request.user.pk, recurso_id, tipo_voto)
             except Recurso.DoesNotExist:
                 return Response({
                     'success': False,
                     'error': 'Recurso no encontrado'
                 }, status=status.HTTP_404_NOT_FOUND)
             
-            # Verificar si el usuario ya votó en este recurso
-            voto_existente = VotoRecurso.objects.filter(
-                usuario=request.user, 
-                recurso=recurso
-            ).first()
-            
-            if voto_existente:
-                # Si ya votó, actualizar el voto
-                voto_existente.tipo_voto = tipo_voto
-                voto_existente.save()
-            else:
-                # Si no ha votado, crear nuevo voto
-                VotoRecurso.objects.create(
-                    usuario=request.user,
-                    recurso=recurso,
-                    tipo_voto=tipo_voto
-                )
-            
-            # Refrescar el recurso para obtener los contadores actualizados
-            recurso.refresh_from_db()
-            
             return Response({
                 'success': True,
                 'message': 'Voto registrado correctamente',
-                'numero_likes': recurso.numero_likes,
-                'numero_dislikes': recurso.numero_dislikes,
-                'numero_mejora': recurso.numero_mejora
+                **contadores
             }, status=status.HTTP_200_OK)
             
         except Exception as e:
@@ -120,36 +268,27 @@ class RemoverVotoRecurso(APIView):
                     'error': 'ID de recurso requerido'
                 }, status=status.HTTP_400_BAD_REQUEST)
             
-            # Obtener el recurso
             try:
-                recurso = Recurso.objects.get(id=recurso_id)
+                recurso_id = int(recurso_id)
+            except (TypeError, ValueError):
+                return Response({
+                    'success': False,
+                    'error': 'ID de recurso inválido'
+                }, status=status.HTTP_400_BAD_REQUEST)
+            
+            # Eliminar el voto del usuario y obtener los contadores actualizados en la misma operación
+            try:
+                contadores, habia_voto = eliminar_voto(request.user.pk, recurso_id)
             except Recurso.DoesNotExist:
                 return Response({
                     'success': False,
                     'error': 'Recurso no encontrado'
                 }, status=status.HTTP_404_NOT_FOUND)
             
-            # Buscar y eliminar el voto del usuario
-            voto_existente = VotoRecurso.objects.filter(
-                usuario=request.user, 
-                recurso=recurso
-            ).first()
-            
-            if voto_existente:
-                voto_existente.delete()
-                message = 'Voto removido correctamente'
-            else:
-                message = 'No había voto previo'
-            
-            # Refrescar el recurso para obtener los contadores actualizados
-            recurso.refresh_from_db()
-            
             return Response({
                 'success': True,
-                'message': message,
-                'numero_likes': recurso.numero_likes,
-                'numero_dislikes': recurso.numero_dislikes,
-                'numero_mejora': recurso.numero_mejora
+                'message': 'Voto removido correctamente' if habia_voto else 'No había voto previo',
+                **contadores
             }, status=status.HTTP_200_OK)
             
         except Exception as e:
@@ -159,26 +298,43 @@ class RemoverVotoRecurso(APIView):
             }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 
-# Función auxiliar para agregar información de votos del usuario a los recursos
-def agregar_votos_usuario_a_recursos(recursos, usuario):
-    """Función auxiliar para agregar información de votos del usuario a los recursos"""
-    if not usuario.is_authenticated:
-        return recursos
-    
-    # Obtener todos los votos del usuario para estos recursos
-    votos_usuario = VotoRecurso.objects.filter(
-        usuario=usuario,
-        recurso__in=[r.id for r in recursos]
-    ).values('recurso', 'tipo_voto')
-    
-    # Crear un diccionario para acceso rápido
-    votos_dict = {voto['recurso']: voto['tipo_voto'] for voto in votos_usuario}
-    
-    # Agregar información de voto a cada recurso
-    for recurso in recursos:
-        recurso.voto_usuario = votos_dict.get(recurso.id, None)
-    
-    return recursos
+class VotarRecursosLote(APIView):
+    """Aplica en una transacción una lista de votos [{recurso_id, tipo_voto}] (tipo_voto null elimina el voto)"""
+    permission_classes = [permissions.IsAuthenticated]
+    max_operaciones = 500
+
+    def post(self, request):
+        operaciones = request.data.get('votos') if isinstance(request.data, dict) else request.data
+        if not isinstance(operaciones, list) or not operaciones:
+            return Response({
+                'success': False,
+                'error': 'Se requiere una lista de votos'
+            }, status=status.HTTP_400_BAD_REQUEST)
+
+        if len(operaciones) > self.max_operaciones:
+            return Response({
+                'success': False,
+                'error': f'Se permiten como máximo {self.max_operaciones} votos por lote'
+            }, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            resultados = aplicar_votos_lote(request.user.pk, operaciones)
+            return Response({
+                'success': True,
+                'resultados': resultados
+            }, status=status.HTTP_200_OK)
+
+        except Exception as e:
+            return Response({
+                'success': False,
+                'error': str(e)
+            }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
+def anotar_voto_usuario(queryset, usuario):
+    """Agrega a cada recurso el tipo de voto del usuario (o None) como subconsulta de la misma consulta"""
+    voto = VotoRecurso.objects.filter(usuario=usuario, recurso=OuterRef('pk')).values('tipo_voto')[:1]
+    return queryset.annotate(voto_usuario=Subquery(voto))
 
 
 # Modifica tu RecursoList existente para incluir información de votos
@@ -186,27 +342,31 @@ class RecursoListConVotos(APIView):
     """Lista de recursos con información de votos del usuario"""
     permission_classes = [permissions.IsAuthenticated]
 
+    @condicional(validadores_recursos, por_usuario=True)
     def get(self, request):
         try:
-            # Obtenemos todos los recursos
-            recursos = Recurso.objects.all()
-            
-            # Agregamos información de votos del usuario
-            recursos_con_votos = agregar_votos_usuario_a_recursos(recursos, request.user)
-            
-            # Serializamos los datos
-            serializer = RecursoSerializer(recursos_con_votos, many=True)
-            
-            # Agregamos manualmente la información de votos a cada recurso serializado
-            data = serializer.data
-            for i, recurso in enumerate(recursos_con_votos):
-                if hasattr(recurso, 'voto_usuario'):
-                    data[i]['voto_usuario'] = recurso.voto_usuario
-                else:
-                    data[i]['voto_usuario'] = None
-            
+            # Obtenemos la página de recursos solicitada (o todos si se desactiva la paginación),
+            # con el voto del usuario resuelto en la misma consulta
+            campos = campos_solicitados(request)
+            recursos = anotar_voto_usuario(filtrar_recursos(recursos_con_relaciones(campos), request), request.user)
+            paginator = None
+            if not paginacion_desactivada(request):
+                paginator = RecursoPagination()
+                recursos = paginator.paginate_queryset(recursos, request, view=self)
+            
+            # Serializamos los datos (voto_usuario se incluye siempre)
+            if campos is not None:
+                campos = campos + ['voto_usuario']
+            serializer = RecursoConVotoSerializer(recursos, many=True, fields=campos)
+            data = sumar_pendientes(serializer.data)
+            
+            if paginator is not None:
+                return paginator.get_paginated_response(data)
             return Response(data, status=status.HTTP_200_OK)
             
+        except APIException:
+            # Errores de parámetros (filtros, orden, cursor) con su propio código de estado
+            raise
         except Exception as e:
             return Response({
                 'error': str(e)
@@ -217,22 +377,19 @@ class RecursoRetrieveConVotos(APIView):
     """Detalle de recurso con información de voto del usuario"""
     permission_classes = [permissions.IsAuthenticated]
 
+    @condicional(validadores_recursos, por_usuario=True)
     def get(self, request, pk):
         try:
-            recurso = get_recurso(pk)
+            data = get_recurso_serializado(pk)
             
-            # Obtener voto del usuario si existe
+            # El voto del usuario se agrega después de la cache para que la entrada sea compartida
             voto_usuario = None
             if request.user.is_authenticated:
-                voto_obj = VotoRecurso.objects.filter(
+                voto_usuario = VotoRecurso.objects.filter(
                     usuario=request.user, 
-                    recurso=recurso
-                ).first()
-                if voto_obj:
-                    voto_usuario = voto_obj.tipo_voto
+                    recurso_id=pk
+                ).values_list('tipo_voto', flat=True).first()
             
-            serializer = RecursoSerializer(recurso)
-            data = serializer.data
             data['voto_usuario'] = voto_usuario
             
             return Response(data, status=status.HTTP_200_OK)
@@ -249,39 +406,218 @@ class RecursoRetrieveConVotos(APIView):
 class RecursoList(APIView):
     permission_classes = [permissions.IsAuthenticated]
 
+    @condicional(validadores_recursos)
     def get(self, request):
-        # Obtenemos todos los recursos
-        recursos = Recurso.objects.all()
-        serializer = RecursoSerializer(recursos, many=True)
-        return Response(serializer.data)
+        campos = campos_solicitados(request)
+        recursos = filtrar_recursos(recursos_con_relaciones(campos), request)
+        if paginacion_desactivada(request):
+            serializer = RecursoSerializer(recursos, many=True, fields=campos)
+            return Response(sumar_pendientes(serializer.data))
+
+        paginator = RecursoPagination()
+        page = paginator.paginate_queryset(recursos, request, view=self)
+        serializer = RecursoSerializer(page, many=True, fields=campos)
+        return paginator.get_paginated_response(sumar_pendientes(serializer.data))
 
 
 class RecursoRetrieve(APIView):
     permission_classes = [permissions.IsAuthenticated]
 
+    @condicional(validadores_recursos)
     def get(self, request, pk):
-        recurso = get_recurso(pk)
-        serializer = RecursoSerializer(recurso)
+        return Response(get_recurso_serializado(pk))
+
+
+class RecursoRanking(APIView):
+    """Recursos mejor valorados (?tipo=valorados) o en tendencia (?tipo=tendencia), paginados por cursor.
+
+    El orden lo sirven los índices de puntaje_wilson y tendencia, así que cada
+    página es un recorrido de rango sin ordenar en la consulta. 'puntaje' es el
+    límite inferior de Wilson o los votos ponderados por antigüedad a la fecha.
+    """
+    permission_classes = [permissions.IsAuthenticated]
+    campos_orden = {
+        'valorados': 'puntaje_wilson',
+        'tendencia': 'tendencia',
+    }
+
+    def get(self, request):
+        tipo = request.query_params.get('tipo', 'valorados')
+        if tipo not in self.campos_orden:
+            return Response({"error": "El tipo debe ser 'valorados' o 'tendencia'."}, status=status.HTTP_400_BAD_REQUEST)
+
+        campo = self.campos_orden[tipo]
+        paginator = RecursoPagination()
+        paginator.ordering = f'-{campo}'
+        paginator.ordering_fields = (campo,)
+
+        campos = campos_solicitados(request)
+        recursos = filtrar_recursos(recursos_con_relaciones(campos), request)
+        page = paginator.paginate_queryset(recursos, request, view=self)
+        data = sumar_pendientes(RecursoSerializer(page, many=True, fields=campos).data)
+        for recurso, dato in zip(page, data):
+            dato['puntaje'] = recurso.puntaje_wilson if tipo == 'valorados' else tendencia_actual(recurso.tendencia)
+        return paginator.get_paginated_response(data)
+
+
+def _fecha_parametro(valor, fin_del_dia=False):
+    """Fecha u hora ISO 8601 de un parámetro; una fecha sin hora es el inicio (o el fin) de ese día"""
+    if not valor:
+        return None
+    momento = parse_datetime(valor)
+    if momento is None:
+        dia = parse_date(valor)
+        if dia is None:
+            raise ValueError(valor)
+        momento = datetime.combine(dia, time.max if fin_del_dia else time.min)
+    if timezone.is_naive(momento):
+        momento = timezone.make_aware(momento)
+    return momento
+
+
+class RecursoEstadisticasVotos(APIView):
+    """Evolución de los votos por hora o por día (?granularidad=hora|dia) en un rango (?desde=, ?hasta=).
+
+    Se calcula sobre los resúmenes por periodo, para los recursos de
+    ?recursos=1,2,3 o para todo el catálogo. Por defecto, los últimos 30 días.
+    """
+    permission_classes = [permissions.IsAuthenticated]
+    max_periodos = 5000
+    max_recursos = 1000
+
+    def get(self, request):
+        granularidad = request.query_params.get('granularidad', 'dia')
+        if granularidad not in FRECUENCIAS:
+            return Response({"error": "La granularidad debe ser 'hora' o 'dia'."}, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            hasta = _fecha_parametro(request.query_params.get('hasta'), fin_del_dia=True) or timezone.now()
+            desde = _fecha_parametro(request.query_params.get('desde')) or hasta - timedelta(days=30)
+        except ValueError:
+            return Response({"error": "Las fechas 'desde' y 'hasta' deben tener formato ISO 8601."}, status=status.HTTP_400_BAD_REQUEST)
+        if desde > hasta:
+            return Response({"error": "'desde' debe ser anterior a 'hasta'."}, status=status.HTTP_400_BAD_REQUEST)
+        duracion = timedelta(hours=1) if granularidad == 'hora' else timedelta(days=1)
+        if (hasta - desde) / duracion > self.max_periodos:
+            return Response({"error": f"El rango no puede superar {self.max_periodos} periodos."}, status=status.HTTP_400_BAD_REQUEST)
+
+        recurso_ids = None
+        recursos = request.query_params.get('recursos')
+        if recursos:
+            partes = [parte.strip() for parte in recursos.split(',')]
+            if not all(parte.isdigit() for parte in partes):
+                return Response({"error": "'recursos' debe ser una lista de ids separados por comas."}, status=status.HTTP_400_BAD_REQUEST)
+            if len(partes) > self.max_recursos:
+                return Response({"error": f"Se permiten como máximo {self.max_recursos} recursos."}, status=status.HTTP_400_BAD_REQUEST)
+            recurso_ids = [int(parte) for parte in partes]
+
+        return Response(reporte_votos(granularidad, desde, hasta, recurso_ids))
+
+
+class RecursoBuscar(APIView):
+    """Búsqueda de texto completo sobre recursos y sus contenidos de texto/código (?q=)"""
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get(self, request):
+        texto = request.query_params.get('q', '').strip()
+        if not texto:
+            return Response({"error": "El parámetro 'q' es obligatorio."}, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            limite = int(request.query_params.get('page_size', RecursoPagination.page_size))
+        except ValueError:
+            return Response({"error": "El parámetro 'page_size' debe ser un número entero."}, status=status.HTTP_400_BAD_REQUEST)
+        limite = max(1, min(limite, RecursoPagination.max_page_size))
+
+        campos = campos_solicitados(request)
+        if busqueda_indexada():
+            # El índice devuelve los ids ordenados por relevancia; se cargan y se conserva ese orden
+            ids = buscar_recursos(texto, limite)
+            posiciones = {pk: i for i, pk in enumerate(ids)}
+            recursos = sorted(recursos_con_relaciones(campos).filter(pk__in=ids), key=lambda r: posiciones[r.pk])
+        else:
+            recursos = recursos_con_relaciones(campos).filter(
+                Q(titulo__icontains=texto) | Q(subtitulo__icontains=texto) | Q(descripcion__icontains=texto)
+            ).order_by('-created_at')[:limite]
+
+        serializer = RecursoSerializer(recursos, many=True, fields=campos)
         return Response(serializer.data)
 
 
+class RecursoAutocompletar(APIView):
+    """Sugerencias de títulos por prefijo (?q=), con coincidencia aproximada opcional (?fuzzy=true)"""
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get(self, request):
+        texto = request.query_params.get('q', '')
+        try:
+            limite = int(request.query_params.get('page_size', 10))
+        except ValueError:
+            return Response({"error": "El parámetro 'page_size' debe ser un número entero."}, status=status.HTTP_400_BAD_REQUEST)
+        limite = max(1, min(limite, RecursoPagination.max_page_size))
+        aproximado = request.query_params.get('fuzzy', '').lower() in ('true', '1', 'si')
+
+        sugerencias = indice_titulos.sugerir(texto, limite, aproximado)
+        return Response([{'id': pk, 'titulo': titulo} for pk, titulo in sugerencias])
+
+
+class RecursoExportar(APIView):
+    """Exporta el catálogo completo como NDJSON (un recurso con su contenido por línea) en streaming"""
+    permission_classes = [permissions.IsAuthenticated]
+    chunk_size = 500
+
+    def get(self, request):
+        recursos = filtrar_recursos(recursos_con_relaciones(), request).order_by('id')
+
+        def lineas():
+            # iterator() con prefetch_related carga los contenidos de cada bloque de chunk_size
+            # recursos, así que la memoria no depende del tamaño del catálogo
+            for recurso in recursos.iterator(chunk_size=self.chunk_size):
+                yield json.dumps(RecursoSerializer(recurso).data, cls=JSONEncoder, ensure_ascii=False) + '\n'
+
+        response = StreamingHttpResponse(lineas(), content_type='application/x-ndjson; charset=utf-8')
+        response['Content-Disposition'] = 'attachment; filename="recursos.ndjson"'
+        return response
+
+
+class RecursoExportarExcel(APIView):
+    """Exporta el catálogo con el formato de RecursoBulkUpload (?formato=xlsx|csv)"""
+    permission_classes = [permissions.IsAuthenticated]
+    chunk_size = 500
+
+    def get(self, request):
+        formato = request.query_params.get('formato', 'xlsx')
+        if formato not in ('xlsx', 'csv'):
+            return Response({"error": "El formato debe ser 'xlsx' o 'csv'."}, status=status.HTTP_400_BAD_REQUEST)
+
+        recursos = filtrar_recursos(recursos_con_relaciones(), request).order_by('id')
+        if formato == 'csv':
+            response = StreamingHttpResponse(generar_csv(recursos, self.chunk_size), content_type='text/csv; charset=utf-8')
+            response['Content-Disposition'] = 'attachment; filename="recursos.csv"'
+            return response
+
+        return FileResponse(
+            generar_xlsx(recursos, self.chunk_size),
+            as_attachment=True,
+            filename='recursos.xlsx',
+            content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+        )
+
+
 class RecursoCreate(APIView):
     permission_classes = [permissions.IsAuthenticated]
+    tamano_bloque = 500
 
     @transaction.atomic
     def post(self, request):
         # Verificar si la solicitud contiene una lista o un diccionario (un recurso o varios)
         if isinstance(request.data, list):
-            # Caso de múltiples recursos
-            created_resources = []
+            # Caso de múltiples recursos: se validan uno a uno y se crean por bloques con bulk_create
+            validos = []
             errors = []
 
             for recurso_data in request.data:
-                # Verificar duplicidad por título (opcional, adaptar según necesidades)
                 titulo = recurso_data.get('titulo')
-                if Recurso.objects.filter(titulo=titulo).exists():
-                    errors.append({"error": f"El recurso con título '{titulo}' ya existe."})
-                    continue
 
                 # Validar que se proporcionen contenidos
                 contenidos = recurso_data.get('contenido')
@@ -289,24 +625,25 @@ class RecursoCreate(APIView):
                     errors.append({"error": f"Debe incluir al menos un contenido en el recurso con título '{titulo}'."})
                     continue
 
-                # Crear el recurso y sus contenidos
-                serializer = RecursoSerializer(data=recurso_data)
+                serializer = RecursoCargaSerializer(data=recurso_data)
                 if serializer.is_valid():
-                    try:
-                        # Aquí usamos el método create del serializer (no necesitamos crear manualmente los contenidos)
-                        recurso = serializer.save()
-                        created_resources.append(serializer.data)
-                    except Exception as e:
-                        # Si cualquier parte falla, revertimos la transacción
-                        transaction.set_rollback(True)
-                        errors.append({"error": f"Error al procesar el recurso con título '{titulo}': {str(e)}"})
+                    validos.append(serializer.validated_data)
                 else:
                     errors.append({"error": f"Errores al validar el recurso con título '{titulo}': {serializer.errors}"})
 
+            # La duplicidad por título y las categorías/áreas se comprueban por bloque
+            carga = CargaRecursos()
+            for bloque in en_bloques(validos, self.tamano_bloque):
+                carga.crear(bloque)
+            errors.extend({"error": error} for error in carga.errores)
+
             # Si se generaron errores, los devolvemos, si no, devolvemos los recursos creados
             if errors:
                 return Response({"errors": errors}, status=status.HTTP_400_BAD_REQUEST)
 
+            ids = [recurso.pk for recurso in carga.creados]
+            recursos = recursos_con_relaciones().in_bulk(ids)
+            created_resources = RecursoSerializer([recursos[pk] for pk in ids], many=True).data
             return Response({"created_resources": created_resources}, status=status.HTTP_201_CREATED)
 
         elif isinstance(request.data, dict):
@@ -377,7 +714,7 @@ class RecursoDelete(APIView):
     def delete(self, request, pk):
         recurso = get_recurso(pk)
         # Borrar los contenidos antes de borrar el recurso
-        recurso.contenido.all().delete()
+        recurso.contenido_set.all().delete()
         recurso.delete()
         return Response(status=status.HTTP_204_NO_CONTENT)
 
@@ -402,115 +739,119 @@ class RecursoToggleValidado(APIView):
 
 
 class RecursoBulkUpload(APIView):
+    """Recibe un Excel, CSV o JSON Lines (formato de RecursoExportarExcel) y lo deja como carga masiva en segundo plano"""
     permission_classes = [permissions.IsAuthenticated]
     
-    @transaction.atomic
     def post(self, request):
-        excel_file = request.FILES.get('recursos')
-        if not excel_file:
+        archivo = request.FILES.get('recursos')
+        if not archivo:
             return Response(
-                {"error": "No se encontró el archivo Excel en la petición."},
+                {"error": "No se encontró el archivo en la petición."},
                 status=status.HTTP_400_BAD_REQUEST
             )
         
-        try:
-            df = pd.read_excel(excel_file)
-            
-            # Agrupar filas por título para manejar relaciones anidadas
-            recursos_dict = defaultdict(lambda: {'contenido': []})
-            
-            # Procesar todas las filas del Excel
-            for _, row in df.iterrows():
-                # Validar campos obligatorios
-                if not row.get('titulo'):
-                    return Response(
-                        {"error": "El campo 'titulo' es obligatorio en el archivo."},
-                        status=status.HTTP_400_BAD_REQUEST
-                    )
-                
-                # Extraer información básica del recurso
-                titulo = str(row['titulo'])
-                
-                # Si es la primera vez que vemos este recurso, agregar datos del recurso
-                if 'categoria' not in recursos_dict[titulo]:
-                    recursos_dict[titulo].update({
-                        'titulo': titulo,
-                        'subtitulo': row.get('subtitulo', ''),
-                        'categoria': row['categoria'],
-                        'area': row['area'],
-                        'descripcion': row.get('descripcion', ''),
-                        'validado': row.get('validado', False),
-                        'numero_likes': row.get('numero_likes', 0),
-                        'numero_dislikes': row.get('numero_dislikes', 0),
-                        'numero_mejora': row.get('numero_mejora', 0)
-                    })
-                
-                # Extraer información del contenido
-                if 'tipo_contenido' in row and pd.notna(row['tipo_contenido']):
-                    contenido_data = {
-                        'tipo_contenido': row['tipo_contenido'],
-                        'contenido_bloque': row['contenido_bloque'],
-                        'posicion': int(row.get('posicion', 0))
-                    }
-                    recursos_dict[titulo]['contenido'].append(contenido_data)
-            
-            # Crear recursos y contenidos usando las relaciones de Django
-            recursos_creados = []
-            errores = []
-            
-            for titulo, recurso_data in recursos_dict.items():
-                # Verificar si el recurso ya existe
-                if Recurso.objects.filter(titulo=titulo).exists():
-                    errores.append(f"El recurso con título '{titulo}' ya existe.")
-                    continue
-                
-                try:
-                    # Crear recurso
-                    recurso = Recurso.objects.create(
-                        titulo=recurso_data['titulo'],
-                        subtitulo=recurso_data['subtitulo'],
-                        categoria=recurso_data['categoria'],
-                        area=recurso_data['area'],
-                        descripcion=recurso_data['descripcion'],
-                        validado=recurso_data['validado'],
-                        numero_likes=recurso_data['numero_likes'],
-                        numero_dislikes=recurso_data['numero_dislikes'],
-                        numero_mejora=recurso_data['numero_mejora']
-                    )
-                    
-                    # Crear contenidos del recurso
-                    for contenido_data in recurso_data['contenido']:
-                        Contenido.objects.create(
-                            recurso=recurso,
-                            **contenido_data
-                        )
-                    
-                    recursos_creados.append(recurso.titulo)
-                
-                except Exception as e:
-                    errores.append(f"Error al crear el recurso '{titulo}': {str(e)}")
-                    transaction.set_rollback(True)
-            
-            # Retornar resultado
-            if errores:
-                return Response(
-                    {"error": "Errores durante la carga:", "detalles": errores},
-                    status=status.HTTP_400_BAD_REQUEST
-                )
-            
+        formato = FORMATOS.get(os.path.splitext(archivo.name)[1].lower())
+        if formato is None:
             return Response(
-                {"message": f"Carga masiva de recursos realizada exitosamente. Recursos creados: {len(recursos_creados)}",
-                 "recursos_creados": recursos_creados},
-                status=status.HTTP_201_CREATED
+                {"error": f"Formato no soportado. Use uno de: {', '.join(FORMATOS)}."},
+                status=status.HTTP_400_BAD_REQUEST
             )
         
-        except ValidationError as e:
+        # El archivo se procesa fuera de la petición (ver carga.py); el estado se consulta en RecursoCargaEstado
+        with transaction.atomic():
+            carga = CargaMasiva.objects.create(
+                usuario=request.user, archivo=archivo, nombre_archivo=archivo.name, formato=formato
+            )
+            encolar_carga(carga.pk)
+        
+        return Response(
+            {"message": "Carga masiva de recursos recibida.", "carga": CargaMasivaSerializer(carga).data},
+            status=status.HTTP_202_ACCEPTED
+        )
+
+
+def _carga_usuario(request, pk):
+    try:
+        return CargaMasiva.objects.get(pk=pk, usuario=request.user)
+    except CargaMasiva.DoesNotExist:
+        raise Http404
+
+
+class RecursoCargaEstado(APIView):
+    """Estado y progreso de una carga masiva del usuario (incluye los fragmentos confirmados)"""
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get(self, request, pk):
+        return Response(CargaMasivaSerializer(_carga_usuario(request, pk)).data)
+
+
+class RecursoCargaSesion(APIView):
+    """Abre una carga masiva por fragmentos; el archivo se envía después con RecursoCargaFragmento"""
+    permission_classes = [permissions.IsAuthenticated]
+
+    def post(self, request):
+        nombre_archivo = request.data.get('nombre_archivo') or ''
+        formato = FORMATOS.get(os.path.splitext(nombre_archivo)[1].lower())
+        if formato is None:
             return Response(
-                {"error": str(e)},
+                {"error": f"Indique nombre_archivo con uno de los formatos: {', '.join(FORMATOS)}."},
                 status=status.HTTP_400_BAD_REQUEST
             )
-        except Exception as e:
+        carga = CargaMasiva.objects.create(
+            usuario=request.user, nombre_archivo=nombre_archivo, formato=formato, estado='recibiendo'
+        )
+        return Response(CargaMasivaSerializer(carga).data, status=status.HTTP_201_CREATED)
+
+
+class RecursoCargaFragmento(APIView):
+    """Recibe el fragmento 'indice' de una carga (archivo 'fragmento' y su SHA-256 en 'checksum').
+
+    Cada fragmento se confirma por separado; reenviar uno ya confirmado devuelve 200 sin volver a procesarlo.
+    """
+    permission_classes = [permissions.IsAuthenticated]
+
+    def put(self, request, pk, indice):
+        carga = _carga_usuario(request, pk)
+        archivo = request.FILES.get('fragmento')
+        checksum = request.data.get('checksum')
+        if not archivo or not checksum:
+            return Response(
+                {"error": "Debe enviar el archivo 'fragmento' y su 'checksum' (SHA-256)."},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        try:
+            fragmento, nuevo = procesar_fragmento(carga.pk, indice, archivo, checksum)
+        except ValidationError as e:
+            return Response({"error": " ".join(e.messages)}, status=status.HTTP_400_BAD_REQUEST)
+        except ConflictoCarga as e:
+            return Response({"error": str(e)}, status=status.HTTP_409_CONFLICT)
+        except DatabaseError as e:
             return Response(
-                {"error": "Error procesando el archivo: " + str(e)},
+                {"error": f"No se pudo confirmar el fragmento {indice}, puede reenviarse: {str(e)}"},
                 status=status.HTTP_400_BAD_REQUEST
-            )
\ No newline at end of file
+            )
+
+        carga.refresh_from_db()
+        return Response(
+            {"fragmento": FragmentoCargaSerializer(fragmento).data, "carga": CargaMasivaSerializer(carga).data},
+            status=status.HTTP_201_CREATED if nuevo else status.HTTP_200_OK
+        )
+
+
+class RecursoCargaCompletar(APIView):
+    """Cierra una carga por fragmentos comprobando que se confirmaron los fragmentos 0..total_fragmentos-1"""
+    permission_classes = [permissions.IsAuthenticated]
+
+    def post(self, request, pk):
+        carga = _carga_usuario(request, pk)
+        try:
+            total_fragmentos = int(request.data.get('total_fragmentos'))
+        except (TypeError, ValueError):
+            return Response({"error": "total_fragmentos debe ser un número."}, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            carga = completar_carga(carga.pk, total_fragmentos)
+        except ConflictoCarga as e:
+            return Response({"error": str(e)}, status=status.HTTP_409_CONFLICT)
+        return Response(CargaMasivaSerializer(carga).data)
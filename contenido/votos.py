@@ -0,0 +1,404 @@
+from collections import defaultdict
+from datetime import timedelta
+from itertools import islice
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Count, Exists, OuterRef
+from django.utils import timezone
+from .cache import invalidar_recurso_cache
+from .contadores import buffer_contadores, compactar_fragmentos, contadores_diferidos, contadores_fragmentados, sumar_pendientes
+from .models import (
+    CONTADORES_VOTO, Recurso, VotoRecurso, VotoRecursoEliminado,
+    ajustar_contadores_recurso, recontar_contadores_recurso, registrar_votos_eliminados
+)
+from .ranking import delta_tendencia, parametros_tendencia, sql_peso_tendencia
+from .estadisticas import parametros_resumen, sql_acumular_resumen
+
+# Registro de votos en una sola sentencia.
+#
+# En PostgreSQL el voto se inserta o actualiza con INSERT ... ON CONFLICT
+# (usuario, recurso) DO UPDATE y, en la misma sentencia, se ajustan los
+# contadores del recurso (y su resumen por periodo) con el delta entre el tipo
+# anterior y el nuevo y se devuelven los contadores resultantes. En otros motores se usa el ORM dentro
+# de una transacción (las señales de VotoRecurso ajustan los contadores).
+
+CAMPOS_CONTADORES = list(CONTADORES_VOTO.values())
+
+def _delta_sql(tipo, campo):
+    # Suma 1 si el voto nuevo es de este tipo y resta 1 si el anterior lo era
+    return (
+        f"{campo} = recursos.{campo}"
+        f" + (CASE WHEN %(tipo)s = '{tipo}' THEN 1 ELSE 0 END)"
+        f" - (CASE WHEN voto.anterior = '{tipo}' THEN 1 ELSE 0 END)"
+    )
+
+SQL_VOTAR = f"""
+WITH voto AS (
+    INSERT INTO votos_recursos (usuario_id, recurso_id, tipo_voto, created_at, updated_at, is_active)
+    SELECT %(usuario)s, id, %(tipo)s, now(), now(), true FROM recursos WHERE id = %(recurso)s
+    ON CONFLICT (usuario_id, recurso_id)
+    DO UPDATE SET tipo_voto = EXCLUDED.tipo_voto, updated_at = EXCLUDED.updated_at
+    RETURNING (xmax = 0) AS insertado,
+        (SELECT v.tipo_voto FROM votos_recursos v WHERE v.id = votos_recursos.id) AS anterior,
+        votos_recursos.created_at AS creado
+),
+resumen AS (
+    {sql_acumular_resumen(
+        {tipo: f"(CASE WHEN %(tipo)s = '{tipo}' THEN 1 ELSE 0 END) - (CASE WHEN voto.anterior = '{tipo}' THEN 1 ELSE 0 END)" for tipo in CONTADORES_VOTO},
+        'voto',
+        'voto.anterior IS DISTINCT FROM %(tipo)s'
+    )}
+)
+UPDATE recursos SET
+    {', '.join(_delta_sql(tipo, campo) for tipo, campo in CONTADORES_VOTO.items())},
+    tendencia = recursos.tendencia
+        + {sql_peso_tendencia('%(tipo)s', 'voto.creado')}
+        - {sql_peso_tendencia('voto.anterior', 'voto.creado')},
+    updated_at = CASE WHEN voto.anterior IS DISTINCT FROM %(tipo)s THEN now() ELSE recursos.updated_at END
+FROM voto
+WHERE recursos.id = %(recurso)s
+RETURNING {', '.join(f'recursos.{campo}' for campo in CAMPOS_CONTADORES)}, voto.insertado, voto.anterior
+"""
+
+SQL_REMOVER = f"""
+WITH voto AS (
+    DELETE FROM votos_recursos
+    WHERE usuario_id = %(usuario)s AND recurso_id = %(recurso)s
+    RETURNING tipo_voto, created_at
+),
+lapida AS (
+    INSERT INTO votos_recursos_eliminados (usuario_id, recurso_id, created_at, updated_at, is_active)
+    SELECT %(usuario)s, %(recurso)s, now(), now(), true FROM voto
+    ON CONFLICT (usuario_id, recurso_id) DO UPDATE SET updated_at = EXCLUDED.updated_at
+),
+resumen AS (
+    {sql_acumular_resumen({tipo: f"-(CASE WHEN voto.tipo_voto = '{tipo}' THEN 1 ELSE 0 END)" for tipo in CONTADORES_VOTO}, 'voto')}
+)
+UPDATE recursos SET
+    {', '.join(f"{campo} = recursos.{campo} - (SELECT count(*) FROM voto WHERE tipo_voto = '{tipo}')" for tipo, campo in CONTADORES_VOTO.items())},
+    tendencia = recursos.tendencia - COALESCE((SELECT {sql_peso_tendencia('tipo_voto', 'created_at')} FROM voto), 0),
+    updated_at = CASE WHEN EXISTS (SELECT 1 FROM voto) THEN now() ELSE recursos.updated_at END
+WHERE recursos.id = %(recurso)s
+RETURNING {', '.join(f'recursos.{campo}' for campo in CAMPOS_CONTADORES)}, (SELECT count(*) FROM voto)
+"""
+
+# Variantes para contadores diferidos o fragmentados: solo se escribe el voto y
+# se leen los contadores persistidos; el delta va al buffer o a un fragmento
+SQL_VOTAR_DIFERIDO = f"""
+WITH voto AS (
+    INSERT INTO votos_recursos (usuario_id, recurso_id, tipo_voto, created_at, updated_at, is_active)
+    SELECT %(usuario)s, id, %(tipo)s, now(), now(), true FROM recursos WHERE id = %(recurso)s
+    ON CONFLICT (usuario_id, recurso_id)
+    DO UPDATE SET tipo_voto = EXCLUDED.tipo_voto, updated_at = EXCLUDED.updated_at
+    RETURNING (xmax = 0) AS insertado,
+        (SELECT v.tipo_voto FROM votos_recursos v WHERE v.id = votos_recursos.id) AS anterior,
+        votos_recursos.created_at AS creado
+)
+SELECT {', '.join(f'recursos.{campo}' for campo in CAMPOS_CONTADORES)}, voto.insertado, voto.anterior, voto.creado
+FROM recursos, voto
+WHERE recursos.id = %(recurso)s
+"""
+
+SQL_REMOVER_DIFERIDO = f"""
+WITH voto AS (
+    DELETE FROM votos_recursos
+    WHERE usuario_id = %(usuario)s AND recurso_id = %(recurso)s
+    RETURNING tipo_voto, created_at
+),
+lapida AS (
+    INSERT INTO votos_recursos_eliminados (usuario_id, recurso_id, created_at, updated_at, is_active)
+    SELECT %(usuario)s, %(recurso)s, now(), now(), true FROM voto
+    ON CONFLICT (usuario_id, recurso_id) DO UPDATE SET updated_at = EXCLUDED.updated_at
+)
+SELECT {', '.join(f'recursos.{campo}' for campo in CAMPOS_CONTADORES)}, (SELECT tipo_voto FROM voto), (SELECT created_at FROM voto)
+FROM recursos
+WHERE recursos.id = %(recurso)s
+"""
+
+
+def _con_pendientes(recurso_id, contadores):
+    dato = sumar_pendientes([{'id': recurso_id, **contadores}])[0]
+    return {campo: dato[campo] for campo in CAMPOS_CONTADORES}
+
+
+def _contadores(recurso_id):
+    contadores = Recurso.objects.filter(pk=recurso_id).values(*CAMPOS_CONTADORES).first()
+    if contadores is None:
+        raise Recurso.DoesNotExist('Recurso no encontrado')
+    return contadores
+
+
+def registrar_voto(usuario_id, recurso_id, tipo_voto):
+    """Crea o cambia el voto del usuario y devuelve los contadores actualizados del recurso"""
+    if connection.vendor != 'postgresql':
+        with transaction.atomic():
+            if not Recurso.objects.filter(pk=recurso_id).exists():
+                raise Recurso.DoesNotExist('Recurso no encontrado')
+            voto = VotoRecurso.objects.select_for_update().filter(usuario_id=usuario_id, recurso_id=recurso_id).first()
+            if voto is None:
+                VotoRecurso.objects.create(usuario_id=usuario_id, recurso_id=recurso_id, tipo_voto=tipo_voto)
+            elif voto.tipo_voto != tipo_voto:
+                voto.tipo_voto = tipo_voto
+                voto.save()
+            contadores = _contadores(recurso_id)
+        return _con_pendientes(recurso_id, contadores)
+
+    diferido = contadores_diferidos() or contadores_fragmentados()
+    # Si el recurso no existe no se inserta nada y la sentencia no devuelve filas
+    with connection.cursor() as cursor:
+        cursor.execute(
+            SQL_VOTAR_DIFERIDO if diferido else SQL_VOTAR,
+            {'usuario': usuario_id, 'recurso': recurso_id, 'tipo': tipo_voto, **parametros_tendencia(), **parametros_resumen()}
+        )
+        fila = cursor.fetchone()
+    if fila is None:
+        raise Recurso.DoesNotExist('Recurso no encontrado')
+
+    if diferido:
+        *valores, insertado, anterior, creado = fila
+    else:
+        *valores, insertado, anterior = fila
+    if not insertado and anterior is None:
+        # Otro voto concurrente del mismo usuario se insertó después de tomar la foto de la
+        # sentencia, así que no se conoce el tipo anterior: se recalcula este recurso
+        recontar_contadores_recurso(recurso_id)
+        return _con_pendientes(recurso_id, _contadores(recurso_id))
+
+    if diferido:
+        if anterior != tipo_voto:
+            deltas = {tipo_voto: 1}
+            if anterior:
+                deltas[anterior] = -1
+            ajustar_contadores_recurso(recurso_id, deltas, delta_tendencia(anterior, tipo_voto, creado))
+    else:
+        invalidar_recurso_cache(recurso_id)
+    return _con_pendientes(recurso_id, dict(zip(CAMPOS_CONTADORES, valores)))
+
+
+def eliminar_voto(usuario_id, recurso_id):
+    """Elimina el voto del usuario; devuelve (contadores actualizados, si había voto)"""
+    if connection.vendor != 'postgresql':
+        with transaction.atomic():
+            if not Recurso.objects.filter(pk=recurso_id).exists():
+                raise Recurso.DoesNotExist('Recurso no encontrado')
+            voto = VotoRecurso.objects.select_for_update().filter(usuario_id=usuario_id, recurso_id=recurso_id).first()
+            if voto is not None:
+                voto.delete()
+            contadores = _contadores(recurso_id)
+        return _con_pendientes(recurso_id, contadores), voto is not None
+
+    diferido = contadores_diferidos() or contadores_fragmentados()
+    with connection.cursor() as cursor:
+        cursor.execute(
+            SQL_REMOVER_DIFERIDO if diferido else SQL_REMOVER,
+            {'usuario': usuario_id, 'recurso': recurso_id, **parametros_tendencia(), **parametros_resumen()}
+        )
+        fila = cursor.fetchone()
+    if fila is None:
+        raise Recurso.DoesNotExist('Recurso no encontrado')
+
+    if diferido:
+        *valores, eliminado, creado = fila
+    else:
+        *valores, eliminado = fila
+    if eliminado and diferido:
+        ajustar_contadores_recurso(recurso_id, {eliminado: -1}, delta_tendencia(eliminado, None, creado))
+    elif eliminado:
+        invalidar_recurso_cache(recurso_id)
+    return _con_pendientes(recurso_id, dict(zip(CAMPOS_CONTADORES, valores))), bool(eliminado)
+
+
+def aplicar_votos_lote(usuario_id, operaciones):
+    """Aplica una lista de operaciones {recurso_id, tipo_voto|None} del usuario en una transacción.
+
+    Si un recurso aparece varias veces gana la última operación (el orden en
+    que el cliente las registró). Los votos se crean, cambian y eliminan en
+    bloque y los contadores se ajustan con un solo UPDATE por recurso afectado.
+    Devuelve un resultado por operación, con los contadores finales del recurso.
+    """
+    resultados = []
+    finales = {}
+    for indice, operacion in enumerate(operaciones):
+        recurso_id = operacion.get('recurso_id') if isinstance(operacion, dict) else None
+        tipo_voto = operacion.get('tipo_voto') if isinstance(operacion, dict) else None
+        resultado = {'recurso_id': recurso_id, 'tipo_voto': tipo_voto, 'success': False}
+        resultados.append(resultado)
+        try:
+            recurso_id = int(recurso_id)
+        except (TypeError, ValueError):
+            resultado['error'] = 'ID de recurso inválido'
+            continue
+        # Un tipo_voto que no es texto (lista, objeto) no se puede buscar en CONTADORES_VOTO
+        if tipo_voto is not None and (not isinstance(tipo_voto, str) or tipo_voto not in CONTADORES_VOTO):
+            resultado['error'] = 'Tipo de voto inválido'
+            continue
+        resultado['recurso_id'] = recurso_id
+        finales[recurso_id] = tipo_voto
+
+    with transaction.atomic():
+        existentes = set(Recurso.objects.filter(pk__in=finales).values_list('id', flat=True))
+        finales = {recurso_id: tipo for recurso_id, tipo in finales.items() if recurso_id in existentes}
+
+        votos = {
+            voto.recurso_id: voto
+            for voto in VotoRecurso.objects.select_for_update().filter(usuario_id=usuario_id, recurso_id__in=finales)
+        }
+
+        nuevos, cambiados, eliminados = [], [], []
+        deltas = defaultdict(lambda: defaultdict(int))
+        tendencias = defaultdict(float)
+        ahora = timezone.now()
+        for recurso_id, tipo_voto in finales.items():
+            voto = votos.get(recurso_id)
+            anterior = voto.tipo_voto if voto else None
+            if anterior == tipo_voto:
+                continue
+            if anterior:
+                deltas[recurso_id][anterior] -= 1
+            if tipo_voto:
+                deltas[recurso_id][tipo_voto] += 1
+
+            if voto is None:
+                nuevos.append(VotoRecurso(usuario_id=usuario_id, recurso_id=recurso_id, tipo_voto=tipo_voto))
+                continue
+            tendencias[recurso_id] += delta_tendencia(anterior, tipo_voto, voto.created_at)
+            if tipo_voto is None:
+                eliminados.append(voto)
+            else:
+                voto.tipo_voto = tipo_voto
+                voto.updated_at = ahora
+                cambiados.append(voto)
+
+        # bulk_create/bulk_update y el DELETE directo no disparan las señales de VotoRecurso,
+        # así que los contadores y las lápidas de los votos eliminados solo se registran aquí.
+        # Un voto creado por otra petición después del SELECT FOR UPDATE se actualiza en vez de fallar
+        VotoRecurso.objects.bulk_create(
+            nuevos, update_conflicts=True, unique_fields=['usuario', 'recurso'], update_fields=['tipo_voto', 'updated_at']
+        )
+        creados = dict(
+            VotoRecurso.objects.filter(usuario_id=usuario_id, recurso_id__in=[voto.recurso_id for voto in nuevos])
+            .values_list('recurso_id', 'created_at')
+        )
+        # Si el created_at escrito no es el del lote, el voto ya existía con un tipo que no se conoce:
+        # esos recursos se recuentan desde sus votos en vez de aplicarles deltas
+        recontar = set()
+        for voto in nuevos:
+            if creados.get(voto.recurso_id) != voto.created_at:
+                recontar.add(voto.recurso_id)
+                deltas.pop(voto.recurso_id, None)
+                continue
+            tendencias[voto.recurso_id] += delta_tendencia(None, voto.tipo_voto, voto.created_at)
+        VotoRecurso.objects.bulk_update(cambiados, ['tipo_voto', 'updated_at'])
+        if eliminados:
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    f"DELETE FROM {VotoRecurso._meta.db_table} WHERE id IN ({', '.join(['%s'] * len(eliminados))})",
+                    [voto.pk for voto in eliminados]
+                )
+            registrar_votos_eliminados(usuario_id, [voto.recurso_id for voto in eliminados])
+        for recurso_id, delta in deltas.items():
+            ajustar_contadores_recurso(recurso_id, delta, tendencias[recurso_id])
+        for recurso_id in recontar:
+            recontar_contadores_recurso(recurso_id)
+
+        filas = sumar_pendientes(list(Recurso.objects.filter(pk__in=finales).values('id', *CAMPOS_CONTADORES)))
+        contadores = {fila.pop('id'): fila for fila in filas}
+
+    for resultado in resultados:
+        if 'error' in resultado:
+            continue
+        if resultado['recurso_id'] not in contadores:
+            resultado['error'] = 'Recurso no encontrado'
+            continue
+        resultado['success'] = True
+        resultado.update(contadores[resultado['recurso_id']])
+    return resultados
+
+
+def reconciliar_contadores(batch_size=1000, aplicar=True):
+    """Recalcula los contadores de todos los recursos desde VotoRecurso.
+
+    Los votos se agregan con una sola consulta GROUP BY recurso, tipo_voto; los
+    recursos se recorren por bloques y solo los que difieren se actualizan con
+    bulk_update. Con aplicar=False solo se lee y se informa la deriva. Conviene
+    ejecutarlo en horas de poco tráfico: un voto que llegue entre la lectura y
+    la escritura de un bloque puede requerir otra pasada.
+
+    Los contadores observados son los persistidos más los deltas pendientes
+    (del buffer de todos los procesos y de los fragmentos). Al aplicar se
+    persiste el valor esperado menos esos pendientes, que se sumarán cuando
+    cada proceso haga flush o se compacten los fragmentos.
+    """
+    if aplicar:
+        # Los deltas pendientes de este proceso y los fragmentos se aplican antes de comparar
+        buffer_contadores.flush()
+        while compactar_fragmentos():
+            pass
+
+    conteos = defaultdict(dict)
+    agregados = VotoRecurso.objects.order_by().values_list('recurso_id', 'tipo_voto').annotate(total=Count('id'))
+    for recurso_id, tipo_voto, total in agregados:
+        conteos[recurso_id][CONTADORES_VOTO[tipo_voto]] = total
+
+    reporte = {
+        'recursos_revisados': 0,
+        'recursos_corregidos': 0,
+        'deriva': {campo: 0 for campo in CAMPOS_CONTADORES},
+    }
+    ahora = timezone.now()
+    corregidos = []
+
+    def guardar():
+        if aplicar and corregidos:
+            Recurso.objects.bulk_update(corregidos, CAMPOS_CONTADORES + ['updated_at'], batch_size=batch_size)
+        corregidos.clear()
+
+    filas = Recurso.objects.values('id', *CAMPOS_CONTADORES).iterator(chunk_size=batch_size)
+    while bloque := list(islice(filas, batch_size)):
+        persistidos = {fila['id']: [fila[campo] for campo in CAMPOS_CONTADORES] for fila in bloque}
+        for fila in sumar_pendientes(bloque):
+            recurso_id = fila['id']
+            reporte['recursos_revisados'] += 1
+            observados = [fila[campo] for campo in CAMPOS_CONTADORES]
+            esperados = [conteos.get(recurso_id, {}).get(campo, 0) for campo in CAMPOS_CONTADORES]
+            if esperados == observados:
+                continue
+
+            reporte['recursos_corregidos'] += 1
+            for campo, observado, esperado in zip(CAMPOS_CONTADORES, observados, esperados):
+                reporte['deriva'][campo] += abs(observado - esperado)
+            valores = {
+                campo: esperado - (observado - persistido)
+                for campo, observado, esperado, persistido
+                in zip(CAMPOS_CONTADORES, observados, esperados, persistidos[recurso_id])
+            }
+            corregidos.append(Recurso(pk=recurso_id, updated_at=ahora, **valores))
+        guardar()
+    return reporte
+
+
+# Los cambios se leen desde un poco antes del cursor para no perder los de
+# transacciones que seguían abiertas cuando se generó; el cliente los aplica
+# de forma idempotente, así que repetirlos no tiene efecto
+MARGEN_SINCRONIZACION = timedelta(seconds=5)
+
+
+def cambios_votos_usuario(usuario_id, desde):
+    """Votos creados o cambiados después de 'desde' y recursos cuyo voto se eliminó después de 'desde'"""
+    desde = desde - MARGEN_SINCRONIZACION
+    votos = VotoRecurso.objects.filter(usuario_id=usuario_id, updated_at__gt=desde).values('recurso', 'tipo_voto')
+    # Una lápida deja de valer si el usuario volvió a votar el recurso
+    eliminados = VotoRecursoEliminado.objects.filter(usuario_id=usuario_id, updated_at__gt=desde).exclude(
+        Exists(VotoRecurso.objects.filter(usuario_id=usuario_id, recurso_id=OuterRef('recurso_id')))
+    ).values_list('recurso_id', flat=True)
+    return list(votos), list(eliminados)
+
+
+def lapidas_vigentes_desde():
+    """Fecha desde la que se conservan las lápidas; un cursor anterior requiere sincronización completa"""
+    return timezone.now() - timedelta(days=settings.VOTOS_LAPIDAS_DIAS)
+
+
+def purgar_votos_eliminados():
+    """Elimina las lápidas más antiguas que VOTOS_LAPIDAS_DIAS; devuelve cuántas se eliminaron"""
+    return VotoRecursoEliminado.objects.filter(updated_at__lt=lapidas_vigentes_desde()).delete()[0]
@@ -1,3 +1,24 @@
 from django.test import TestCase
+from rest_framework.test import APIClient
+from usuarios.models import Usuario
+from .models import Area
 
-# Create your tests here.
+
+class AreaGetCondicionalTest(TestCase):
+    """El listado de areas responde 304 mientras no cambie la tabla"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.usuario = Usuario.objects.create_user(correo='lector@biblioteca.co', password='clave', nombre_completo='Lector')
+        cls.area = Area.objects.create(nombre='Sistemas', descripcion='Area')
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.usuario)
+
+    def test_listado_304_hasta_que_cambia(self):
+        etag = self.client.get('/api/areas/')['ETag']
+        self.assertEqual(self.client.get('/api/areas/', HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+        Area.objects.create(nombre='Matemáticas', descripcion='Area')
+        self.assertEqual(self.client.get('/api/areas/', HTTP_IF_NONE_MATCH=etag).status_code, 200)
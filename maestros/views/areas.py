@@ -2,6 +2,7 @@ from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status, permissions
 from django.http import Http404
+from biblioteca.condicional import condicional
 from ..models import Area
 from ..serializers import AreaSerializer
 
@@ -14,6 +15,7 @@ def get_area(pk):
 class AreaList(APIView):
     permission_classes = [permissions.IsAuthenticated]
 
+    @condicional(lambda request: [Area.objects.all()])
     def get(self, request):
         areas = Area.objects.all()
         serializer = AreaSerializer(areas, many=True)
@@ -22,6 +24,7 @@ class AreaList(APIView):
 class AreaRetrieve(APIView):
     permission_classes = [permissions.IsAuthenticated]
 
+    @condicional(lambda request, pk: [Area.objects.filter(pk=pk)])
     def get(self, request, pk):
         area = get_area(pk)
         serializer = AreaSerializer(area)
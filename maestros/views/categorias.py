@@ -2,6 +2,7 @@ from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status, permissions
 from django.http import Http404
+from biblioteca.condicional import condicional
 from ..models import Categoria
 from ..serializers import CategoriaSerializer
 
@@ -14,6 +15,7 @@ def get_categoria(pk):
 class CategoriaList(APIView):
     permission_classes = [permissions.IsAuthenticated]
 
+    @condicional(lambda request: [Categoria.objects.all()])
     def get(self, request):
         categorias = Categoria.objects.all()
         serializer = CategoriaSerializer(categorias, many=True)
@@ -22,6 +24,7 @@ class CategoriaList(APIView):
 class CategoriaRetrieve(APIView):
     permission_classes = [permissions.IsAuthenticated]
 
+    @condicional(lambda request, pk: [Categoria.objects.filter(pk=pk)])
     def get(self, request, pk):
         categoria = get_categoria(pk)
         serializer = CategoriaSerializer(categoria)